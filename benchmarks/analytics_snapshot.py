@@ -0,0 +1,89 @@
+"""Compare loading the tutor CSV export with loading the analytics snapshot.
+
+Builds the same synthetic tutors into a CSV (through database.export.write_csv)
+and into Parquet and Feather snapshots (through database.analytics), then
+times how long pandas takes to read each file back. The CSV load includes
+the parsing an analyst would otherwise redo: splitting subjects into
+one-hot columns and converting registration dates.
+Run with: python benchmarks/analytics_snapshot.py [tutor count]
+"""
+import datetime
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+from bson.objectid import ObjectId
+
+from catalog import catalog_service
+from database.analytics import build_snapshot, subject_columns, write_snapshot
+from database.export import write_csv
+
+DEFAULT_COUNT = 1_000_000
+COLUMNS = ['university', 'department', 'year', 'subjects', 'grades', 'method',
+           'location', 'status', 'registration_date']
+
+
+def make_documents(count):
+    catalog = catalog_service.current
+    start = datetime.datetime(2023, 1, 1)
+    for i in range(count):
+        yield {
+            '_id': ObjectId(),
+            'university': random.choice(['Addis Ababa University', 'Jimma University', 'Bahir Dar University']),
+            'department': random.choice(['Engineering', 'Medicine', 'Law', 'Education']),
+            'year': random.choice(['1st Year', '2nd Year', '3rd Year', '4th Year']),
+            'subjects': random.sample(catalog.subjects, random.randint(1, 4)),
+            'grades': random.choice(catalog.grades),
+            'method': random.choice(catalog.methods),
+            'location': random.choice(['Bole', 'Piassa', 'Megenagna', 'Kazanchis']),
+            'status': random.choice(['pending', 'approved', 'rejected']),
+            'registration_date': start + datetime.timedelta(minutes=i),
+        }
+
+
+def load_csv(data):
+    frame = pd.read_csv(io.BytesIO(data))
+    subjects = frame['subjects'].fillna('').str.split(', ')
+    for subject, column in subject_columns(catalog_service.current).items():
+        frame[column] = subjects.apply(lambda items, subject=subject: subject in items)
+    frame['registration_date'] = pd.to_datetime(frame['registration_date'], utc=True)
+    return frame
+
+
+def timed(label, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{label:>28}: {time.perf_counter() - started:7.2f}s")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    print(f"{count} tutors")
+    documents = list(make_documents(count))
+
+    csv_file = io.BytesIO()
+    timed('write csv', write_csv, documents, COLUMNS, csv_file)
+    snapshot = timed('build snapshot', build_snapshot, documents)
+    files = {'csv': csv_file.getvalue()}
+    for fmt in ('parquet', 'feather'):
+        buffer = io.BytesIO()
+        timed(f'write {fmt}', write_snapshot, snapshot, buffer, fmt)
+        files[fmt] = buffer.getvalue()
+
+    print()
+    for fmt, data in files.items():
+        print(f"{fmt + ' size':>28}: {len(data) / 1024 / 1024:7.1f} MB")
+    print()
+    timed('load csv + parse', load_csv, files['csv'])
+    timed('load parquet', pd.read_parquet, io.BytesIO(files['parquet']))
+    timed('load feather', pd.read_feather, io.BytesIO(files['feather']))
+
+
+if __name__ == '__main__':
+    main()
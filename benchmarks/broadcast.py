@@ -0,0 +1,92 @@
+"""Measure broadcast throughput against a fake Bot.
+
+The fake Bot answers each send_message after SEND_MS of simulated network
+latency and, once every FLOOD_EVERY sends, raises RetryAfter the way
+Telegram does when the global limit is exceeded. The sequential loop the
+admin handler used before is compared with the rate-limited sender pool.
+"peak" is the most sends in any one-second window, which must stay at or
+below the limit.
+Run with: python benchmarks/broadcast.py [recipients]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram.error import RetryAfter
+
+from messaging.broadcast import BroadcastEngine
+
+RECIPIENTS = 600
+SEND_MS = 80
+RATE = 25
+FLOOD_EVERY = 0
+RETRY_AFTER = 1
+
+
+class FakeBot:
+    """Stand-in for telegram.Bot that only simulates send latency."""
+
+    def __init__(self, flood_every=FLOOD_EVERY):
+        self.flood_every = flood_every
+        self.calls = 0
+        self.sent = 0
+        self.sent_at = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.calls += 1
+        await asyncio.sleep(SEND_MS / 1000)
+        if self.flood_every and self.calls % self.flood_every == 0:
+            raise RetryAfter(RETRY_AFTER)
+        self.sent += 1
+        self.sent_at.append(time.monotonic())
+
+    def peak(self):
+        """Most sends completed within any one second."""
+        stamps, start, best = self.sent_at, 0, 0
+        for end, stamp in enumerate(stamps):
+            while stamp - stamps[start] >= 1:
+                start += 1
+            best = max(best, end - start + 1)
+        return best
+
+
+async def sequential(bot, chat_ids):
+    for chat_id in chat_ids:
+        await bot.send_message(chat_id=chat_id, text="hello")
+
+
+async def pooled(bot, chat_ids, edits):
+    async def on_progress(progress):
+        edits.append(progress.done)
+
+    engine = BroadcastEngine(bot, rate=RATE)
+    return await engine.run(chat_ids, len(chat_ids), "hello", on_progress=on_progress)
+
+
+async def main(recipients):
+    chat_ids = list(range(100000, 100000 + recipients))
+    print(f"{recipients} recipients, {SEND_MS}ms per send, limit {RATE} msg/s")
+
+    bot = FakeBot()
+    started = time.perf_counter()
+    await sequential(bot, chat_ids)
+    elapsed = time.perf_counter() - started
+    print(f"sequential      {elapsed:7.2f}s {bot.sent / elapsed:7.1f} msg/s")
+
+    for label, flood_every in (("pool", 0), ("pool + flood", 200)):
+        bot = FakeBot(flood_every=flood_every)
+        edits = []
+        started = time.perf_counter()
+        result = await pooled(bot, chat_ids, edits)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{label:<15} {elapsed:7.2f}s {result.sent / elapsed:7.1f} msg/s "
+            f"peak={bot.peak()}/s sent={result.sent} failed={result.failed} progress_edits={len(edits)}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else RECIPIENTS))
@@ -0,0 +1,136 @@
+"""Measure the cost of finding the handler for a callback query.
+
+The "regex" side rebuilds the CallbackQueryHandlers main.py registered
+before routing, in registration order, with the conversation state
+handlers flattened in where their conversation was, and tests each update
+against them until one matches, like PTB does for a handler group. The
+"router" side is one routing.CallbackRouter holding the same buttons;
+dispatch is a parse of the callback data and one dict lookup.
+
+Both sides get the same buttons in their own callback data format, drawn
+from the admin, search and registration keyboards. A button that matches
+late in the old chain (or nothing, like the info-only buttons) costs the
+regex side the most.
+Run with: python benchmarks/callback_routing.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram import CallbackQuery, Update, User
+from telegram.ext import CallbackQueryHandler
+
+from routing import CallbackRouter, parse_callback_data
+from search_session import SearchSession
+
+UPDATES = 200_000
+TUTOR_ID = '65a1b2c3d4e5f6a7b8c9d0e1'
+
+OLD_PATTERNS = [
+    # tutor profile update conversation
+    '^update_profile$', '^update_', '^cancel_update$', '^cancel$',
+    # registration conversation
+    '^subject_|subjects_done$', '^grade_', '^method_', '^cancel$',
+    # student handlers
+    '^student$', '^search_tutors$', '^(search_|show_)', '^subject_', '^grade_',
+    '^(next_page|prev_page)_', '^back_to_',
+    # admin conversation
+    '^admin$', '^(approve|reject)_', '^show_phone_', '^all_tutors$', '^tutors_(next|prev)_',
+    '^export_(data|changes)$', '^export_analytics$', '^broadcast$', '^broadcast_jobs$',
+    '^view_tutor_', '^pending_approvals$', '^cancel$',
+    # broadcast conversation
+    '^broadcast$', '^broadcast_role_', '^admin$',
+    # main menu and global duplicates
+    '^tutor$', '^student$', '^admin$', '^subject_|subjects_done$', '^grade_', '^method_',
+    '^pending_approvals$', '^(approve|reject)_',
+]
+
+# (old callback data, new callback data) for the same button
+BUTTONS = [
+    ('admin', 'adm:panel'),
+    ('pending_approvals', 'adm:pending'),
+    (f'approve_{TUTOR_ID}', f'adm:review:approve:{TUTOR_ID}'),
+    (f'tutors_next_1_{TUTOR_ID}', f'adm:tutors:next:1:{TUTOR_ID}'),
+    (f'view_tutor_{TUTOR_ID}', f'adm:view:{TUTOR_ID}'),
+    ('broadcast_jobs', 'adm:jobs'),
+    ('search_subject', 'find:by:subject'),
+    ('subject_Physics', 'find:subject:Physics'),
+    ('grade_5-8', 'find:grade:5-8'),
+    (f'next_page_{TUTOR_ID}', SearchSession.start({'subjects': 'Physics'}).next_page(TUTOR_ID).button_data()),
+    ('back_to_search', 'find:start'),
+    ('student', 'menu:student'),
+    ('tutor', 'menu:tutor'),
+    ('no_phone', 'info:phone'),
+]
+
+NEW_ROUTES = [
+    'adm:panel', 'adm:pending', 'adm:review', 'adm:tutors', 'adm:view', 'adm:phone', 'adm:export',
+    'adm:snapshot', 'adm:jobs', 'find:start', 'find:by', 'find:subject', 'find:grade', 'find:page',
+    'menu:student', 'menu:help', 'menu:tutor', 'profile:show',
+]
+
+
+async def noop(update, context):
+    return None
+
+
+def make_update(data):
+    user = User(1, 'Bench', False)
+    return Update(1, callback_query=CallbackQuery('1', user, 'bench', data=data))
+
+
+def regex_dispatch(handlers, update):
+    for handler in handlers:
+        check = handler.check_update(update)
+        if check is not None and check is not False:
+            return handler
+    return None
+
+
+def router_dispatch(router, update):
+    return router.check_update(update)
+
+
+def bench(label, dispatch, target, updates):
+    started = time.perf_counter()
+    for update in updates:
+        dispatch(target, update)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>8}: {elapsed / len(updates) * 1e6:6.2f} µs/update")
+    return elapsed
+
+
+def main():
+    random.seed(1)
+    picks = [random.randrange(len(BUTTONS)) for _ in range(UPDATES)]
+    old_updates = [make_update(BUTTONS[i][0]) for i in picks]
+    new_updates = [make_update(BUTTONS[i][1]) for i in picks]
+
+    regex_handlers = [CallbackQueryHandler(noop, pattern=pattern) for pattern in OLD_PATTERNS]
+    router = CallbackRouter({key: noop for key in NEW_ROUTES})
+
+    print(f"{UPDATES} callback queries over {len(BUTTONS)} buttons, "
+          f"{len(regex_handlers)} regex handlers vs {len(NEW_ROUTES)} routes")
+    regex_time = bench('regex', regex_dispatch, regex_handlers, old_updates)
+    parse_callback_data.cache_clear()
+    router_time = bench('router', router_dispatch, router, new_updates)
+    print(f"{'speedup':>8}: {regex_time / router_time:6.1f}x")
+
+    print("\nper button (µs/update):")
+    for old_data, new_data in BUTTONS:
+        old_update, new_update = make_update(old_data), make_update(new_data)
+        timings = []
+        for dispatch, target, update in ((regex_dispatch, regex_handlers, old_update),
+                                         (router_dispatch, router, new_update)):
+            started = time.perf_counter()
+            for _ in range(20_000):
+                dispatch(target, update)
+            timings.append((time.perf_counter() - started) / 20_000 * 1e6)
+        print(f"  {new_data.split(':' + TUTOR_ID)[0][:24]:>24} regex {timings[0]:6.2f}  router {timings[1]:5.2f}")
+
+
+if __name__ == '__main__':
+    main()
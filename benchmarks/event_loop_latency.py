@@ -0,0 +1,68 @@
+"""Compare update latency with blocking pymongo calls against the executor-backed repository.
+
+Each simulated update performs one "query" against a fake collection that
+sleeps for QUERY_MS, the way a slow regex search holds a pymongo socket.
+Run with: python benchmarks/event_loop_latency.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.repository import TutorRepository
+
+CONCURRENT_UPDATES = 200
+QUERY_MS = 20
+
+
+class SlowCollection:
+    """Stand-in for a pymongo collection whose queries block the calling thread."""
+
+    def count_documents(self, query):
+        time.sleep(QUERY_MS / 1000)
+        return 0
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def blocking_update(collection, finished):
+    collection.count_documents({"status": "approved"})
+    finished.append(time.perf_counter())
+
+
+async def executor_update(repository, finished):
+    await repository.count({"status": "approved"})
+    finished.append(time.perf_counter())
+
+
+async def run(label, make_update):
+    finished = []
+    # Latency is measured from the moment every update is queued on the loop
+    queued_at = time.perf_counter()
+    await asyncio.gather(*(make_update(finished) for _ in range(CONCURRENT_UPDATES)))
+    total = time.perf_counter() - queued_at
+    end_to_end = [done - queued_at for done in finished]
+    print(
+        f"{label:<10} total={total * 1000:8.1f}ms "
+        f"p50={statistics.median(end_to_end) * 1000:8.1f}ms "
+        f"p99={percentile(end_to_end, 99) * 1000:8.1f}ms"
+    )
+
+
+async def main():
+    collection = SlowCollection()
+    repository = TutorRepository(collection_getter=lambda: collection)
+
+    print(f"{CONCURRENT_UPDATES} concurrent updates, {QUERY_MS}ms per query")
+    await run("blocking", lambda finished: blocking_update(collection, finished))
+    await run("executor", lambda finished: executor_update(repository, finished))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
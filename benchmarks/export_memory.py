@@ -0,0 +1,121 @@
+"""Compare peak RSS of the old in-memory CSV export with the streaming one.
+
+Each (mode, size) pair runs in its own subprocess so ru_maxrss only covers
+that export. The "list" mode is the old path: every document in a list,
+the whole CSV in a StringIO and then encoded to bytes. The "stream" mode
+writes the same documents through database.export.write_csv into a
+spooled temporary file. Documents come from a generator standing in for
+a batched cursor; pass --mongo to export a seeded collection on MONGO_URI
+through export_csv() instead.
+Run with: python benchmarks/export_memory.py [--mongo]
+"""
+import csv
+import datetime
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import GRADE_RANGES, SUBJECTS_LIST, TEACHING_METHODS
+
+SIZES = [10_000, 1_000_000]
+COLUMNS = ['name', 'university', 'department', 'year', 'subjects', 'grades', 'method',
+           'location', 'contact', 'status', 'registration_date', 'bio']
+
+
+def make_documents(count):
+    for i in range(count):
+        yield {
+            'name': f'Tutor {i}',
+            'university': 'Addis Ababa University',
+            'department': 'Engineering',
+            'year': '3rd Year',
+            'subjects': random.sample(SUBJECTS_LIST, 3),
+            'grades': random.choice(GRADE_RANGES),
+            'method': random.choice(TEACHING_METHODS),
+            'location': 'Bole',
+            'contact': f'+2519{i:08d}',
+            'status': 'approved',
+            'registration_date': datetime.datetime(2024, 1, 1),
+            'bio': 'Patient tutor with five years of experience. ' * 3,
+        }
+
+
+def run_list(count):
+    tutor_list = list(make_documents(count))
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=tutor_list[0].keys())
+    writer.writeheader()
+    writer.writerows(tutor_list)
+    return len(output.getvalue().encode('utf-8'))
+
+
+def run_stream(count):
+    from database.export import write_csv
+
+    with tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024) as spool:
+        write_csv(make_documents(count), COLUMNS, spool)
+        return spool.tell()
+
+
+def run_mongo(count):
+    from pymongo import MongoClient
+    from config import settings
+    from database.export import export_csv
+
+    collection = MongoClient(settings.mongo_uri)[settings.db_name + '_bench'].export_tutors
+    collection.drop()
+    batch = []
+    for document in make_documents(count):
+        batch.append(document)
+        if len(batch) == 10_000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+
+    # Only the export itself should count towards the peak
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    export_file, _ = export_csv(collection, {})
+    size = export_file.seek(0, os.SEEK_END)
+    export_file.close()
+    collection.drop()
+    print(f"(rss before export {start_rss / 1024:.0f} MB)", end=' ', file=sys.stderr)
+    return size
+
+
+def child(mode, count):
+    started = time.perf_counter()
+    size = {'list': run_list, 'stream': run_stream, 'mongo': run_mongo}[mode](count)
+    elapsed = time.perf_counter() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{peak_mb:.0f} {elapsed:.2f} {size / 1024 / 1024:.1f}")
+
+
+def main():
+    modes = ['list', 'stream'] + (['mongo'] if '--mongo' in sys.argv else [])
+    print(f"{'tutors':>10} {'mode':>7} {'peak RSS':>10} {'time':>8} {'csv size':>9}")
+    for count in SIZES:
+        for mode in modes:
+            result = subprocess.run(
+                [sys.executable, __file__, '--child', mode, str(count)],
+                capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                print(f"{count:>10} {mode:>7} failed: {result.stderr.strip().splitlines()[-1:]}")
+                continue
+            peak, elapsed, size = result.stdout.split()
+            print(f"{count:>10} {mode:>7} {peak:>7} MB {elapsed:>7}s {size:>6} MB")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3 and sys.argv[1] == '--child':
+        child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
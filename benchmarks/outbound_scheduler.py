@@ -0,0 +1,109 @@
+"""Measure how the outbound scheduler treats interactive replies during a broadcast.
+
+A fake Bot API call takes API_MS. A broadcast queues BROADCAST_SIZE bulk
+sends to distinct chats while users keep searching, each search reply
+being REPLY_BURST messages to one chat. The interactive wait is compared
+with bulk priority on and off, and a burst of progress edits to one
+message shows how many calls edit coalescing saves.
+Run with: python benchmarks/outbound_scheduler.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from messaging.scheduler import BULK, INTERACTIVE, OutboundScheduler
+
+API_MS = 40
+BROADCAST_SIZE = 300
+SEARCHES = 20
+SEARCH_INTERVAL = 0.25
+REPLY_BURST = 6
+EDITS = 50
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = 0
+
+    async def call(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(API_MS / 1000)
+        return True
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def request(scheduler, api, endpoint, data, priority):
+    return await scheduler.process_request(
+        api.call, (), data, endpoint, data, {'priority': priority}
+    )
+
+
+async def broadcast_with_searches(broadcast_priority):
+    scheduler = OutboundScheduler()
+    api = FakeApi()
+    await scheduler.initialize()
+    started = time.perf_counter()
+
+    bulk = [
+        asyncio.create_task(request(scheduler, api, 'sendMessage', {'chat_id': 1000 + i}, broadcast_priority))
+        for i in range(BROADCAST_SIZE)
+    ]
+
+    latencies = []
+
+    async def search(chat_id):
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            request(scheduler, api, 'sendMessage', {'chat_id': chat_id}, INTERACTIVE)
+            for _ in range(REPLY_BURST)
+        ))
+        latencies.append(time.perf_counter() - started)
+
+    searches = []
+    for i in range(SEARCHES):
+        searches.append(asyncio.create_task(search(500 + i)))
+        await asyncio.sleep(SEARCH_INTERVAL)
+    await asyncio.gather(*searches)
+    await asyncio.gather(*bulk)
+    elapsed = time.perf_counter() - started
+    await scheduler.shutdown()
+
+    label = 'bulk priority' if broadcast_priority == BULK else 'single queue'
+    print(
+        f"{label:<14} search reply p50={statistics.median(latencies) * 1000:7.0f}ms "
+        f"p95={percentile(latencies, 95) * 1000:7.0f}ms  "
+        f"overall {scheduler.sent / elapsed:5.1f} req/s"
+    )
+
+
+async def coalesced_edits():
+    scheduler = OutboundScheduler()
+    api = FakeApi()
+    await scheduler.initialize()
+    # A chat already at its limit, so edits queue up behind it
+    data = {'chat_id': 42, 'message_id': 7}
+    await asyncio.gather(*(
+        request(scheduler, api, 'editMessageText', dict(data, text=f"{i}%"), INTERACTIVE)
+        for i in range(EDITS)
+    ))
+    await scheduler.shutdown()
+    print(f"{EDITS} progress edits to one message -> {api.calls} API calls (coalesced {scheduler.coalesced})")
+
+
+async def main():
+    print(f"{BROADCAST_SIZE} broadcast sends, {SEARCHES} searches of {REPLY_BURST} messages, {API_MS}ms per call")
+    await broadcast_with_searches(INTERACTIVE)
+    await broadcast_with_searches(BULK)
+    await coalesced_edits()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
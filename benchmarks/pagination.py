@@ -0,0 +1,76 @@
+"""Compare per-page latency of skip/limit and keyset pagination.
+
+Seeds a throwaway collection with SEED_TUTORS approved tutors on the
+server from MONGO_URI, then times fetching pages at increasing depth.
+Run with: python benchmarks/pagination.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient
+
+from database.search import keyset_page
+
+load_dotenv()
+
+SEED_TUTORS = 100_000
+PER_PAGE = 5
+PAGE_DEPTHS = [0, 10, 100, 1_000, 10_000, 19_999]
+NAMES = ["Abebe", "Almaz", "Bekele", "Chaltu", "Dawit", "Hanna", "Kebede", "Meron", "Selam", "Yonas"]
+
+
+def seed(collection):
+    collection.drop()
+    batch = []
+    for i in range(SEED_TUTORS):
+        batch.append({
+            'name': f"{random.choice(NAMES)} {i:06d}",
+            'status': 'approved',
+            'subjects': random.sample(["Mathematics", "Physics", "Biology", "English"], 2),
+        })
+        if len(batch) == 10_000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+    collection.create_index([("status", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)])
+
+
+def time_ms(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/'))
+    collection = client['tutor_connect_bench']['tutors']
+    query = {'status': 'approved'}
+    sort = [('name', ASCENDING), ('_id', ASCENDING)]
+
+    print(f"Seeding {SEED_TUTORS} tutors...")
+    seed(collection)
+
+    # Resolve the keyset cursor for each depth once, the way the Next button carries it
+    ordered_ids = [doc['_id'] for doc in collection.find(query, {'_id': 1}).sort(sort)]
+
+    print(f"{'page':>8} {'skip/limit':>12} {'keyset':>10}")
+    for page in PAGE_DEPTHS:
+        skip_ms = time_ms(lambda: list(collection.find(query).sort(sort).skip(page * PER_PAGE).limit(PER_PAGE)))
+        after = ordered_ids[page * PER_PAGE - 1] if page else None
+        keyset_ms = time_ms(lambda: keyset_page(collection, query, ['name', '_id'], PER_PAGE, after=after))
+        print(f"{page:>8} {skip_ms:>10.2f}ms {keyset_ms:>8.2f}ms")
+
+    collection.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Load test for sizing the MongoDB connection pool.
+
+Runs CONCURRENT_UPDATES simulated updates, each issuing one indexed
+find_one from DB_EXECUTOR_WORKERS executor threads, against the server
+from MONGO_URI at several maxPoolSize values. Reports throughput plus the
+pool monitor's checkout waits: the smallest pool whose p99 wait stays near
+zero is large enough for that concurrency.
+Run with: python benchmarks/pool_sizing.py [workers]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pymongo import MongoClient
+
+from config import settings
+from database.monitoring import PoolMonitor
+
+POOL_SIZES = [2, 4, 8, 16, 32]
+CONCURRENT_UPDATES = 5000
+
+
+def run(pool_size: int, workers: int):
+    monitor = PoolMonitor()
+    client = MongoClient(settings.mongo_uri, maxPoolSize=pool_size, event_listeners=[monitor])
+    collection = client['tutor_connect_bench']['tutors']
+    collection.insert_one({'telegram_id': 1, 'status': 'approved'})
+    collection.create_index('telegram_id')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda _: collection.find_one({'telegram_id': 1}), range(CONCURRENT_UPDATES)))
+    elapsed = time.perf_counter() - start
+
+    collection.drop()
+    client.close()
+    return CONCURRENT_UPDATES / elapsed, monitor.stats()
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else settings.db_executor_workers
+    print(f"{workers} executor workers, {CONCURRENT_UPDATES} queries")
+    print(f"{'pool':>5} {'ops/s':>9} {'max in use':>11} {'wait p99':>10} {'wait max':>10}")
+    for pool_size in POOL_SIZES:
+        throughput, stats = run(pool_size, workers)
+        print(
+            f"{pool_size:>5} {throughput:>9.0f} {stats['max_checked_out']:>11} "
+            f"{stats['wait_p99_ms']:>8.2f}ms {stats['wait_max_ms']:>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
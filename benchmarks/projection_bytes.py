@@ -0,0 +1,79 @@
+"""Measure BSON bytes and decode time per page, with and without view projections.
+
+Uses representative tutor documents (including a long bio) and applies
+each view's field list the way the server-side projection would.
+Run with: python benchmarks/projection_bytes.py
+"""
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bson
+from bson.objectid import ObjectId
+
+from database.views import BIO_PREVIEW_LENGTH, AdminListRow, ApprovalCard, ProfileView, SearchCard
+
+# View name -> (record class, documents per page)
+VIEWS = {
+    'search card': (SearchCard, 5),
+    'admin list row': (AdminListRow, 5),
+    'approval card': (ApprovalCard, 1),
+    'profile view': (ProfileView, 1),
+}
+
+
+def make_tutor(i):
+    return {
+        '_id': ObjectId(),
+        'telegram_id': 100000000 + i,
+        'name': f"Tutor Number {i}",
+        'university': "Addis Ababa University",
+        'department': "Electrical Engineering",
+        'year': "3rd Year",
+        'subjects': ["Mathematics", "Physics", "Chemistry"],
+        'grades': "9-10",
+        'method': "Home",
+        'location': "Bole Atlas",
+        'location_key': ["bole", "atlas"],
+        'contact': "+251911000000",
+        'profile_photo': "AgACAgQAAxkBAAIBY2X" + "x" * 60,
+        'status': 'approved',
+        'username': f"tutor_{i}",
+        'registration_date': datetime.datetime(2024, 1, 1),
+        'updated_at': datetime.datetime(2024, 6, 1),
+        'bio': "I love teaching. " * 200,
+    }
+
+
+def project(document, view):
+    projected = {field: document[field] for field in view.__slots__ if field in document}
+    if view is AdminListRow and 'bio' in projected:
+        projected['bio'] = projected['bio'][:BIO_PREVIEW_LENGTH + 1]
+    return projected
+
+
+def decode_ms(payloads, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for payload in payloads:
+            bson.decode(payload)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    print(f"{'view':<16} {'full bytes':>11} {'view bytes':>11} {'full decode':>12} {'view decode':>12}")
+    for name, (view, per_page) in VIEWS.items():
+        page = [make_tutor(i) for i in range(per_page)]
+        full = [bson.encode(doc) for doc in page]
+        projected = [bson.encode(project(doc, view)) for doc in page]
+        print(
+            f"{name:<16} {sum(map(len, full)):>11} {sum(map(len, projected)):>11} "
+            f"{decode_ms(full):>10.3f}ms {decode_ms(projected):>10.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
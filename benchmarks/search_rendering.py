@@ -0,0 +1,81 @@
+"""Compare the latency of sending one search results page per card and as an album.
+
+A fake chat message answers every reply_* call after RTT_MS, the way each
+Bot API request waits for Telegram. A page of TUTORS_PER_PAGE tutors is
+sent with and without profile photos in both rendering modes.
+Run with: python benchmarks/search_rendering.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram import InlineKeyboardMarkup
+
+from handlers.student import TUTORS_PER_PAGE, send_tutor_cards, send_tutor_page
+
+RTT_MS = 120
+RUNS = 5
+
+
+class FakeMessage:
+    """Stand-in for telegram.Message that counts and delays API calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def _call(self, *args, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(RTT_MS / 1000)
+
+    reply_text = reply_photo = reply_media_group = _call
+
+
+def make_page(with_photos):
+    return [
+        {
+            '_id': f"{i:024x}",
+            'name': f"Tutor {i}",
+            'university': "Addis Ababa University",
+            'subjects': ["Mathematics", "Physics"],
+            'grades': "9-10",
+            'location': "Bole",
+            'registration_date': "2024-01-01",
+            'profile_photo': f"photo-{i}" if with_photos else None,
+        }
+        for i in range(TUTORS_PER_PAGE)
+    ]
+
+
+async def cards_mode(target, page):
+    await send_tutor_cards(target, page)
+    await target.reply_text("Showing tutors", reply_markup=InlineKeyboardMarkup([]))
+
+
+async def album_mode(target, page):
+    await send_tutor_page(target, page, "Showing tutors", InlineKeyboardMarkup([]))
+
+
+async def measure(label, render, page):
+    timings = []
+    for _ in range(RUNS):
+        target = FakeMessage()
+        started = time.perf_counter()
+        await render(target, page)
+        timings.append(time.perf_counter() - started)
+    print(f"{label:<22} {target.calls:2d} calls {sum(timings) / RUNS * 1000:8.1f}ms per page")
+
+
+async def main():
+    print(f"{TUTORS_PER_PAGE} tutors per page, {RTT_MS}ms per API call")
+    for photos in (True, False):
+        page = make_page(photos)
+        suffix = "photos" if photos else "text"
+        await measure(f"cards ({suffix})", cards_mode, page)
+        await measure(f"album ({suffix})", album_mode, page)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,221 @@
+"""A local stand-in for the Telegram Bot API, for benchmarks.
+
+Point an Application at it with ``Application.builder().base_url(stub.base_url)``.
+It answers ``getMe``, ``getUpdates`` (long polling over the updates given to
+:meth:`StubBotApi.push`), ``sendMessage`` and any other method with ``true``.
+Every ``sendMessage`` is recorded with its arrival time so a benchmark can
+tell when the bot answered an update. ``delay`` holds each answer back to
+model the round trip to Telegram's servers.
+
+:class:`StubThread` runs the stub, and the webhook deliveries "Telegram"
+makes, on their own event loop in a thread, so only the bot's own work
+runs on the loop a benchmark measures.
+"""
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+TOKEN = '123456:stub'
+
+
+class StubBotApi:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.updates: List[dict] = []
+        self.sent: List[dict] = []
+        self.port: Optional[int] = None
+        self._new_update = asyncio.Event()
+        self._new_message = asyncio.Event()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def push(self, update: dict):
+        """Make ``update`` available to the next getUpdates call."""
+        self.updates.append(update)
+        self._new_update.set()
+
+    async def wait_for_messages(self, count: int, timeout: float = 30.0):
+        """Wait until ``count`` messages have been sent in total."""
+        deadline = time.perf_counter() + timeout
+        while len(self.sent) < count:
+            self._new_message.clear()
+            await asyncio.wait_for(self._new_message.wait(), deadline - time.perf_counter())
+
+    # -- Bot API methods -----------------------------------------------------
+
+    async def _call(self, method: str, params: Dict[str, str]):
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Stub', 'username': 'stub_bot'}
+        if method == 'getUpdates':
+            return await self._get_updates(int(params.get('offset', 0)), float(params.get('timeout', 0)))
+        if method == 'sendMessage':
+            chat_id = int(params['chat_id'])
+            self.sent.append({'chat_id': chat_id, 'text': params.get('text', ''), 'at': time.perf_counter()})
+            self._new_message.set()
+            return {
+                'message_id': len(self.sent), 'date': int(time.time()), 'text': params.get('text', ''),
+                'chat': {'id': chat_id, 'type': 'private'},
+            }
+        return True
+
+    async def _get_updates(self, offset: int, timeout: float):
+        deadline = time.perf_counter() + timeout
+        while True:
+            pending = [update for update in self.updates if update['update_id'] >= offset]
+            remaining = deadline - time.perf_counter()
+            if pending or remaining <= 0:
+                return pending[:100]
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(self._new_update.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    # -- HTTP ----------------------------------------------------------------
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                path = request_line.split()[1].decode()
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b''):
+                    name, _, value = line.decode().partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                method = path.rsplit('/', 1)[-1]
+                if headers.get('content-type', '').startswith('application/json'):
+                    params = json.loads(body or b'{}')
+                else:
+                    params = dict(parse_qsl(body.decode()))
+                result = await self._call(method, params)
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                payload = json.dumps({'ok': True, 'result': result}).encode()
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    b'Content-Length: ' + str(len(payload)).encode() + b'\r\n\r\n' + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Cancelled when the stub's loop shuts down under a pending getUpdates
+            pass
+        finally:
+            writer.close()
+
+
+class WebhookSender:
+    """Telegram's side of webhook delivery: POSTs over a pool of keep-alive connections.
+
+    Hand-written rather than httpx so the sender costs the benchmark process
+    as little CPU (and GIL) as possible.
+    """
+
+    def __init__(self, url: str, max_connections: int, delay: float = 0.0):
+        parts = urlsplit(url)
+        self.host, self.port, self.path = parts.hostname, parts.port, parts.path
+        self.max_connections = max_connections
+        self.delay = delay
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._opened = 0
+
+    async def _connection(self):
+        if self._idle.empty() and self._opened < self.max_connections:
+            self._opened += 1
+            return await asyncio.open_connection(self.host, self.port)
+        return await self._idle.get()
+
+    async def post(self, update: dict, headers: Dict[str, str]) -> int:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        body = json.dumps(update).encode()
+        head = [f"POST {self.path} HTTP/1.1", f"Host: {self.host}", 'Content-Type: application/json',
+                f"Content-Length: {len(body)}"] + [f"{name}: {value}" for name, value in headers.items()]
+        reader, writer = await self._connection()
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode().partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        await reader.readexactly(length)
+        self._idle.put_nowait((reader, writer))
+        return status
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait()[1].close()
+
+
+class StubThread:
+    """A :class:`StubBotApi` and a webhook sender on their own event loop."""
+
+    def __init__(self, delay: float = 0.0, max_connections: int = 100):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='stub-bot-api', daemon=True)
+        self.max_connections = max_connections
+        self.stub = StubBotApi(delay)
+        self._senders: Dict[str, WebhookSender] = {}
+
+    @property
+    def base_url(self) -> str:
+        return self.stub.base_url
+
+    @property
+    def sent(self) -> List[dict]:
+        return self.stub.sent
+
+    def run(self, coro):
+        """Run ``coro`` on the stub loop and return an awaitable for its result."""
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    async def start(self):
+        self._thread.start()
+        await self.run(self.stub.start())
+
+    async def stop(self):
+        await self.run(self._stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    async def _stop(self):
+        for sender in self._senders.values():
+            sender.close()
+        await self.stub.stop()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def push(self, update: dict):
+        self.loop.call_soon_threadsafe(self.stub.push, update)
+
+    async def post(self, url: str, update: dict, headers: Optional[Dict[str, str]] = None) -> int:
+        """Deliver ``update`` to a webhook after the stub delay; returns the HTTP status."""
+        return await self.run(self._post(url, update, headers or {}))
+
+    async def _post(self, url, update, headers):
+        if url not in self._senders:
+            self._senders[url] = WebhookSender(url, self.max_connections, self.stub.delay)
+        return await self._senders[url].post(update, headers)
+
+    async def wait_for_messages(self, count: int, timeout: float = 30.0):
+        await self.run(self.stub.wait_for_messages(count, timeout))
@@ -0,0 +1,138 @@
+"""Compare the bitmap index with the MongoDB path for combined tutor filters.
+
+Times one "Physics + 9-10 + Bole" page at 10k, 100k and 1M tutors, and
+the same search through search_page() on a throwaway collection seeded on
+MONGO_URI (shown as n/a when MongoDB is not reachable; --no-mongo skips
+it). Also measures the memory one cached tutor takes, which sizes the
+tutor cache (TUTOR_CACHE_BYTES_PER_ENTRY in database/tutor_cache.py).
+Run with: python benchmarks/tutor_index.py [--no-mongo]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson.objectid import ObjectId
+
+from config import GRADE_RANGES, SUBJECTS_LIST
+from database.location import location_query, location_tokens
+from database.views import SearchCard
+from database.tutor_index import TutorBitmapIndex
+
+SIZES = [10_000, 100_000, 1_000_000]
+LOCATIONS = ["Bole", "Bole Atlas", "Mexico", "Piassa", "Sar Bet", "Megenagna", "CMC", "Ayat"]
+FILTERS = {'subjects': 'Physics', 'grades': '9-10', 'location': 'Bole'}
+PER_PAGE = 5
+
+
+def make_documents(count):
+    for i in range(count):
+        location = random.choice(LOCATIONS)
+        yield {
+            '_id': ObjectId(),
+            'name': f'Tutor {i}',
+            'university': 'Addis Ababa University',
+            'profile_photo': f'AgACAgQAAxkBAAI{i:08d}' + 'x' * 50,
+            'status': 'approved',
+            'subjects': random.sample(SUBJECTS_LIST, 3),
+            'grades': random.choice(GRADE_RANGES),
+            'location': location,
+            'location_key': location_tokens(location),
+        }
+
+
+def time_ms(func, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_index(documents):
+    records = [SearchCard(document) for document in documents]
+    index = TutorBitmapIndex()
+    start = time.perf_counter()
+    index.rebuild(records)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    tokens = location_tokens(FILTERS['location'])
+
+    def query():
+        bits = index.match(FILTERS, tokens)
+        return index.page(bits, PER_PAGE)
+
+    ids, _, _, total = query()
+    return build_ms, time_ms(query), total
+
+
+def bytes_per_tutor(count=10_000):
+    """Memory held per tutor by the cache records and the index, strings included."""
+    tracemalloc.start()
+    documents = list(make_documents(count))
+    records = [SearchCard(document) for document in documents]
+    del documents
+    index = TutorBitmapIndex()
+    index.rebuild(records)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held / count
+
+
+def connect_mongo():
+    """The benchmark collection, or None when MongoDB is not reachable."""
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    load_dotenv()
+    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/'), serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command('ping')
+    except PyMongoError as e:
+        print(f"MongoDB is not reachable, skipping the mongo column: {e}")
+        return None
+    return client['tutor_connect_bench']['tutors']
+
+
+def bench_mongo(collection, documents):
+    from pymongo import ASCENDING
+    from database.search import search_page, totals_cache
+
+    collection.drop()
+    for i in range(0, len(documents), 10_000):
+        collection.insert_many(documents[i:i + 10_000])
+    collection.create_index([("status", ASCENDING), ("subjects", ASCENDING), ("_id", ASCENDING)])
+    collection.create_index([("status", ASCENDING), ("location_key", ASCENDING), ("_id", ASCENDING)])
+
+    query = {'status': 'approved', 'subjects': FILTERS['subjects'], 'grades': FILTERS['grades']}
+    query.update(location_query(FILTERS['location']))
+
+    def search():
+        # Drop cached totals so each run pays for the count, as on a first search
+        totals_cache.invalidate()
+        return search_page(collection, query, ['_id'], PER_PAGE)
+
+    elapsed = time_ms(search, repeat=5)
+    collection.drop()
+    return elapsed
+
+
+def main():
+    collection = None if '--no-mongo' in sys.argv else connect_mongo()
+    print(f"memory per cached tutor: {bytes_per_tutor():.0f} bytes")
+
+    print(f"{'tutors':>10} {'build':>10} {'index':>10} {'matches':>8} {'mongo':>10}")
+    for size in SIZES:
+        documents = list(make_documents(size))
+        build_ms, query_ms, total = bench_index(documents)
+        mongo = f"{bench_mongo(collection, documents):>8.2f}ms" if collection is not None else 'n/a'
+        print(f"{size:>10} {build_ms:>8.0f}ms {query_ms:>8.3f}ms {total:>8} {mongo:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Load test update processing: throughput and per-chat ordering.
+
+CHATS chats each send MESSAGES numbered messages in a quick burst, the
+way a user taps through a keyboard, and all bursts are queued at once. The
+handler stands in for a typical one: a short, random "database" wait and
+one reply through a stub Bot API (benchmarks/stub_bot_api.py) that takes
+STUB_DELAY_MS to answer. Three processors handle the same load:
+
+* sequential: PTB's default, one update at a time
+* concurrent: PTB's ``concurrent_updates(LIMIT)``, no ordering
+* chat-ordered: update_processor.ChatOrderedUpdateProcessor(LIMIT)
+
+A chat is out of order when its messages were not handled, or its
+replies did not reach the Bot API, in the order the chat sent them.
+Run with: python benchmarks/update_concurrency.py
+"""
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram import Update
+from telegram.ext import Application, MessageHandler, filters
+
+from stub_bot_api import TOKEN, StubThread
+from update_processor import ChatOrderedUpdateProcessor
+
+CHATS = 200
+MESSAGES = 10
+LIMIT = 32
+STUB_DELAY_MS = 20
+DB_WAIT_MS = (0, 20)
+
+
+def make_update(update_id: int, chat_id: int, seq: int) -> dict:
+    user = {'id': chat_id, 'is_bot': False, 'first_name': 'Load'}
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': seq, 'date': 1760600000, 'text': str(seq),
+            'from': user, 'chat': {'id': chat_id, 'type': 'private'},
+        },
+    }
+
+
+async def run(label: str, concurrent_updates):
+    stub = StubThread(delay=STUB_DELAY_MS / 1000)
+    await stub.start()
+    builder = Application.builder().token(TOKEN).base_url(stub.base_url).updater(None)
+    if concurrent_updates is not None:
+        builder = builder.concurrent_updates(concurrent_updates)
+    application = builder.build()
+
+    handled = defaultdict(list)
+    queued_at = {}
+    rng = random.Random(1)
+
+    async def step(update, context):
+        chat_id = update.effective_chat.id
+        handled[chat_id].append(int(update.message.text))
+        await asyncio.sleep(rng.uniform(*DB_WAIT_MS) / 1000)
+        await update.message.reply_text(update.message.text)
+
+    application.add_handler(MessageHandler(filters.TEXT, step))
+    await application.initialize()
+    await application.start()
+
+    updates = []
+    for chat in range(CHATS):
+        for seq in range(MESSAGES):
+            updates.append(make_update(len(updates) + 1, 10_000 + chat, seq))
+
+    started = time.perf_counter()
+    for data in updates:
+        queued_at[(data['message']['chat']['id'], data['message']['message_id'])] = time.perf_counter()
+        application.update_queue.put_nowait(Update.de_json(data, application.bot))
+    await stub.wait_for_messages(len(updates), timeout=600)
+    elapsed = time.perf_counter() - started
+
+    replies = defaultdict(list)
+    latencies = []
+    for message in stub.sent:
+        seq = int(message['text'])
+        replies[message['chat_id']].append(seq)
+        latencies.append(message['at'] - queued_at[(message['chat_id'], seq)])
+    in_order = list(range(MESSAGES))
+    handled_wrong = sum(1 for seqs in handled.values() if seqs != in_order)
+    replied_wrong = sum(1 for seqs in replies.values() if seqs != in_order)
+
+    await application.stop()
+    await application.shutdown()
+    await stub.stop()
+
+    ms = sorted(latency * 1000 for latency in latencies)
+    print(f"{label:>13}: {len(updates) / elapsed:7.0f} updates/s   "
+          f"latency p50 {statistics.median(ms):7.0f} ms  p95 {ms[int(len(ms) * 0.95)]:7.0f} ms   "
+          f"chats out of order: {handled_wrong} handled, {replied_wrong} replied")
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    print(f"{CHATS} chats x {MESSAGES} messages, limit {LIMIT}, Bot API delay {STUB_DELAY_MS} ms")
+    await run('sequential', None)
+    await run('concurrent', LIMIT)
+    await run('chat-ordered', ChatOrderedUpdateProcessor(LIMIT))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
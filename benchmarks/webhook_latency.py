@@ -0,0 +1,136 @@
+"""Compare end-to-end update latency of webhook mode against long polling.
+
+Both modes run the real /help handler from main.py against a stub Bot API
+on localhost (benchmarks/stub_bot_api.py). Latency is measured from the
+moment "Telegram" has an update to the moment the stub receives the
+bot's sendMessage answer:
+
+* polling: the update is handed to the stub's pending getUpdates call,
+  after the simulated network delay the Application's updater receives it
+* webhook: after the same delay the update is POSTed to the embedded
+  ingress.webhook.WebhookServer with the secret token header, the way
+  Telegram delivers it
+
+Each mode runs a sequential phase (one update at a time) and a burst
+phase (BURST updates from different chats at once; Telegram delivers
+webhooks over parallel connections, polling fetches them in one batch).
+STUB_DELAY_MS models the round trip to Telegram's servers. The stub and
+the webhook deliveries run on their own thread, so the bot's event loop
+only does the bot's work.
+Run with: python benchmarks/webhook_latency.py
+"""
+import asyncio
+import copy
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram.ext import Application, CommandHandler
+
+from ingress.webhook import WebhookServer
+from main import help_command
+from stub_bot_api import TOKEN, StubThread
+
+SEQUENTIAL = 200
+BURST = 50
+STUB_DELAY_MS = [0, 25]
+SECRET = 'benchmark-secret'
+RECORDED_UPDATE = os.path.join(os.path.dirname(__file__), 'updates', 'help_command.json')
+
+with open(RECORDED_UPDATE) as f:
+    TEMPLATE = json.load(f)
+
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    update = copy.deepcopy(TEMPLATE)
+    update['update_id'] = update_id
+    update['message']['chat']['id'] = update['message']['from']['id'] = chat_id
+    return update
+
+
+def build_application(stub: StubThread, webhook: bool) -> Application:
+    builder = Application.builder().token(TOKEN).base_url(stub.base_url)
+    if webhook:
+        builder = builder.updater(None).update_queue(asyncio.Queue(maxsize=1000))
+    application = builder.build()
+    application.add_handler(CommandHandler('help', help_command))
+    return application
+
+
+async def run_mode(webhook: bool, delay: float):
+    stub = StubThread(delay=delay, max_connections=BURST)
+    await stub.start()
+    application = build_application(stub, webhook)
+    injected = {}
+
+    await application.initialize()
+    if webhook:
+        server = WebhookServer(application, SECRET, host='127.0.0.1', port=0)
+        await server.start()
+        url = f"http://127.0.0.1:{server.port}{server.path}"
+    else:
+        await application.updater.start_polling(poll_interval=0, timeout=10)
+    await application.start()
+
+    async def deliver(update):
+        injected[update['message']['chat']['id']] = time.perf_counter()
+        if not webhook:
+            stub.push(update)
+            return
+        status = await stub.post(url, update, {'X-Telegram-Bot-Api-Secret-Token': SECRET})
+        assert status == 200, f"webhook answered {status}"
+
+    update_id = 1
+    # Sequential phase
+    for i in range(SEQUENTIAL):
+        await deliver(make_update(update_id, 1_000 + i))
+        update_id += 1
+        await stub.wait_for_messages(update_id - 1)
+    sequential = [message['at'] - injected[message['chat_id']] for message in stub.sent]
+
+    # Burst phase
+    burst_start = len(stub.sent)
+    await asyncio.gather(*(deliver(make_update(update_id + i, 100_000 + i)) for i in range(BURST)))
+    await stub.wait_for_messages(burst_start + BURST)
+    burst = [message['at'] - injected[message['chat_id']] for message in stub.sent[burst_start:]]
+
+    await application.stop()
+    if webhook:
+        await server.stop()
+    else:
+        await application.updater.stop()
+    await application.shutdown()
+    await stub.stop()
+    return sequential, burst
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, samples):
+    ms = [sample * 1000 for sample in samples]
+    print(f"  {label:<18} p50 {statistics.median(ms):7.2f} ms   p95 {percentile(ms, 95):7.2f} ms   "
+          f"max {max(ms):7.2f} ms")
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    print(f"{SEQUENTIAL} sequential updates, then a burst of {BURST}, answered by /help")
+    for delay_ms in STUB_DELAY_MS:
+        print(f"\nstub Bot API delay {delay_ms} ms:")
+        for webhook in (False, True):
+            mode = 'webhook' if webhook else 'polling'
+            sequential, burst = await run_mode(webhook, delay_ms / 1000)
+            report(f"{mode} sequential", sequential)
+            report(f"{mode} burst", burst)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""Measure updates/sec of the sharded deployment against the worker count.
+
+For each worker count the real ingress pieces run: a WorkerPool of
+spawned processes, each running every handler from main.register_handlers,
+and a ShardPoller fetching from a stub Bot API (benchmarks/stub_bot_api.py)
+and sharding by chat. CHATS chats send /help MESSAGES times each, all
+waiting in getUpdates at once, and the clock stops when the stub has
+received every reply. The outbound rate limiter is left out, so the
+numbers show how much handling the processes do, not Telegram's limits.
+
+Workers only add throughput with a free core each; the script prints
+how many cores it may use.
+Run with: python benchmarks/worker_scaling.py
+"""
+import asyncio
+import copy
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram.ext import Application
+
+from ingress.sharding import ShardPoller, WorkerPool, serve_worker
+from main import register_handlers
+from stub_bot_api import TOKEN, StubThread
+from update_processor import ChatOrderedUpdateProcessor
+
+WORKERS = [1, 2, 4]
+CHATS = 1000
+MESSAGES = 4
+STUB_DELAY_MS = 5
+RECORDED_UPDATE = os.path.join(os.path.dirname(__file__), 'updates', 'help_command.json')
+
+
+def bench_worker(index, workers, shard_queue, base_url):
+    """Worker process: the bot's handlers on one shard, without rate limiting."""
+    logging.disable(logging.WARNING)
+    application = (
+        Application.builder().token(TOKEN).base_url(base_url).updater(None)
+        .update_queue(asyncio.Queue(maxsize=1000))
+        .concurrent_updates(ChatOrderedUpdateProcessor(32))
+        .build()
+    )
+    register_handlers(application)
+    asyncio.run(serve_worker(application, shard_queue))
+
+
+def make_update(template, update_id, chat_id):
+    update = copy.deepcopy(template)
+    update['update_id'] = update_id
+    update['message']['chat']['id'] = update['message']['from']['id'] = chat_id
+    return update
+
+
+async def run(workers, template):
+    stub = StubThread(delay=STUB_DELAY_MS / 1000)
+    await stub.start()
+    pool = WorkerPool(workers, bench_worker, 1000, args=(stub.base_url,))
+    pool.start()
+    stop_event = asyncio.Event()
+    poller = asyncio.create_task(ShardPoller(pool, stub.base_url + TOKEN, poll_timeout=1).run(stop_event))
+
+    # Warm up: one update per worker, so every process has started
+    for shard in range(workers):
+        stub.push(make_update(template, shard + 1, shard))
+    await stub.wait_for_messages(workers, timeout=120)
+
+    update_id = workers + 1
+    started = time.perf_counter()
+    for _ in range(MESSAGES):
+        for chat in range(CHATS):
+            stub.push(make_update(template, update_id, 10_000 + chat))
+            update_id += 1
+    await stub.wait_for_messages(workers + CHATS * MESSAGES, timeout=600)
+    elapsed = time.perf_counter() - started
+
+    stop_event.set()
+    await poller
+    await asyncio.to_thread(pool.stop)
+    await stub.stop()
+    return CHATS * MESSAGES / elapsed
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    with open(RECORDED_UPDATE) as f:
+        template = json.load(f)
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f"{CHATS * MESSAGES} /help updates from {CHATS} chats, {cores} usable cores")
+    baseline = None
+    for workers in WORKERS:
+        rate = await run(workers, template)
+        baseline = baseline or rate
+        print(f"  {workers} worker{'s' if workers > 1 else ' '}: {rate:7.0f} updates/s  ({rate / baseline:4.2f}x)")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
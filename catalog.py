@@ -0,0 +1,171 @@
+"""Subject, grade and teaching-method catalog with prebuilt keyboards.
+
+The catalog starts from the lists in ``config.py``. Every keyboard built
+from it is created once per catalog version and handed out as the same
+frozen ``InlineKeyboardMarkup``, instead of being rebuilt on every tap.
+
+The lists can be changed without a restart by writing a ``catalog``
+document with a higher ``version``:
+
+    {"_id": "catalog", "version": 2, "subjects": [...], "grades": [...], "methods": [...]}
+
+A background thread polls for it. When the version changes, the new
+keyboards replace the old ones in one swap and the listeners run, so the
+tutor search index and cached totals are invalidated at the same time.
+A document that cannot be turned into keyboards (a list that is not a
+list of strings, or a label that does not fit in ``callback_data``) is
+logged once and ignored; the bot keeps the catalog it has.
+"""
+import logging
+import threading
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from pymongo.errors import PyMongoError
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from config import GRADE_RANGES, SUBJECTS_LIST, TEACHING_METHODS, settings
+from routing import callback_data
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DOCUMENT_ID = 'catalog'
+
+
+def _labels(document: dict, field: str, fallback: Tuple[str, ...]) -> Sequence[str]:
+    """Get a list of labels from a catalog document, or ``fallback`` when it is missing."""
+    values = document.get(field)
+    if not values:
+        return fallback
+    if not isinstance(values, list) or not all(isinstance(value, str) and value.strip() for value in values):
+        raise ValueError(f"Catalog {field} must be a list of non-empty strings")
+    return values
+
+
+def _rows(buttons: List[InlineKeyboardButton], width: int) -> List[List[InlineKeyboardButton]]:
+    return [buttons[i:i + width] for i in range(0, len(buttons), width)]
+
+
+class Catalog:
+    """One immutable version of the catalog and its keyboards."""
+
+    __slots__ = ('version', 'subjects', 'grades', 'methods', 'search_subjects_keyboard',
+                 'search_grades_keyboard', 'register_subjects_keyboard', 'register_grades_keyboard',
+                 'register_methods_keyboard')
+
+    def __init__(self, version: int, subjects: Sequence[str], grades: Sequence[str], methods: Sequence[str]):
+        self.version = version
+        self.subjects: Tuple[str, ...] = tuple(subjects)
+        self.grades: Tuple[str, ...] = tuple(grades)
+        self.methods: Tuple[str, ...] = tuple(methods)
+
+        # Search and registration buttons show the same labels but route to different namespaces
+        back = [InlineKeyboardButton("🔙 Back", callback_data=callback_data('find', 'start'))]
+
+        self.search_subjects_keyboard = InlineKeyboardMarkup(_rows([
+            InlineKeyboardButton(subject, callback_data=callback_data('find', 'subject', subject))
+            for subject in self.subjects
+        ], 2) + [back])
+        self.search_grades_keyboard = InlineKeyboardMarkup([[
+            InlineKeyboardButton(grade, callback_data=callback_data('find', 'grade', grade))
+            for grade in self.grades
+        ], back])
+        self.register_subjects_keyboard = InlineKeyboardMarkup(_rows([
+            InlineKeyboardButton(subject, callback_data=callback_data('reg', 'subject', subject))
+            for subject in self.subjects
+        ], 2) + [[InlineKeyboardButton("Done", callback_data=callback_data('reg', 'done'))]])
+        self.register_grades_keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton(grade, callback_data=callback_data('reg', 'grade', grade))]
+            for grade in self.grades
+        ])
+        self.register_methods_keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton(method, callback_data=callback_data('reg', 'method', method))]
+            for method in self.methods
+        ])
+
+    @classmethod
+    def from_config(cls) -> 'Catalog':
+        return cls(0, SUBJECTS_LIST, GRADE_RANGES, TEACHING_METHODS)
+
+
+class CatalogService:
+    """Holds the current catalog and reloads it from MongoDB when its version changes."""
+
+    def __init__(self, poll_interval: float = settings.catalog_poll_interval):
+        self.poll_interval = poll_interval
+        self.current = Catalog.from_config()
+        self._listeners: List[Callable[[Catalog], None]] = []
+        self._rejected_version = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> int:
+        return self.current.version
+
+    def add_listener(self, listener: Callable[[Catalog], None]):
+        """Call ``listener`` with the new catalog after every version change."""
+        self._listeners.append(listener)
+
+    def reload(self, collection) -> bool:
+        """Load the catalog document and swap it in if its version changed."""
+        document = collection.find_one({'_id': CATALOG_DOCUMENT_ID})
+        if not document:
+            return False
+        version = document.get('version', 0)
+        if version in (self.current.version, self._rejected_version):
+            return False
+
+        current = self.current
+        try:
+            if not isinstance(version, int):
+                raise ValueError(f"Catalog version must be an integer, got {version!r}")
+            catalog = Catalog(
+                version,
+                _labels(document, 'subjects', current.subjects),
+                _labels(document, 'grades', current.grades),
+                _labels(document, 'methods', current.methods),
+            )
+        except ValueError as e:
+            self._rejected_version = version
+            logger.error(f"Ignoring catalog version {version!r}, keeping version {current.version}: {e}")
+            return False
+        self.current = catalog
+        logger.info(f"Loaded catalog version {catalog.version}")
+
+        for listener in self._listeners:
+            try:
+                listener(catalog)
+            except Exception as e:
+                logger.error(f"Catalog listener failed: {e}")
+        return True
+
+    # -- background refresh ------------------------------------------------
+
+    def start(self, collection_getter):
+        """Poll for catalog changes in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(collection_getter,), name='catalog', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling."""
+        self._stop.set()
+        self._thread = None
+
+    def _run(self, collection_getter):
+        while not self._stop.is_set():
+            try:
+                self.reload(collection_getter())
+            except PyMongoError as e:
+                logger.error(f"Catalog refresh failed: {e}")
+            except Exception as e:
+                # A surprise in one document must not end hot reloading for good
+                logger.error(f"Catalog refresh failed: {e}", exc_info=True)
+            self._stop.wait(self.poll_interval)
+
+
+catalog_service = CatalogService()
@@ -1,3 +1,13 @@
+import os
+import secrets
+from dataclasses import dataclass
+from typing import FrozenSet, Sequence
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
 # Conversation states
 REGISTER, NAME, UNIVERSITY, DEPARTMENT, YEAR, SUBJECTS, GRADES, METHOD, LOCATION, CONTACT, PROFILE_PIC = range(11)
 
@@ -9,3 +19,219 @@ SUBJECTS_LIST = [
 
 GRADE_RANGES = ["KG-4", "5-8", "9-10"]
 TEACHING_METHODS = ["Home"]
+
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    raw = os.getenv(name, str(default)).strip()
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {raw!r}") from None
+    if value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}, got {value}")
+    return value
+
+
+def _env_float(name: str, default: float, minimum: float = 0.0, exclusive: bool = True) -> float:
+    raw = os.getenv(name, str(default)).strip()
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {raw!r}") from None
+    if value < minimum or (exclusive and value == minimum):
+        raise ValueError(f"{name} must be {'above' if exclusive else 'at least'} {minimum}, got {value}")
+    return value
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name, '1' if default else '0').strip()
+    if raw not in ('0', '1'):
+        raise ValueError(f"{name} must be 0 or 1, got {raw!r}")
+    return raw == '1'
+
+
+def _env_choice(name: str, default: str, choices: Sequence[str]) -> str:
+    value = os.getenv(name, default).strip().lower()
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Environment settings, parsed and validated once at import.
+
+    A malformed or out-of-range value raises ``ValueError`` naming the
+    variable, so a bad deployment fails at startup instead of at first use.
+    """
+    bot_token: str
+    # Bot API endpoint the token is appended to; point it at a local Bot API server if one is used
+    bot_api_url: str
+    admin_ids: FrozenSet[int]
+    admin_number: str
+    mongo_uri: str
+    db_name: str
+    # MongoClient pool settings; keep max_pool_size at or above db_executor_workers
+    # plus the background threads (tutor cache, startup) so executor calls never queue
+    mongo_max_pool_size: int
+    mongo_min_pool_size: int
+    mongo_wait_queue_timeout_ms: int
+    mongo_server_selection_timeout_ms: int
+    mongo_compressors: str
+    # How a page of search results is sent: 'album' batches the page into one
+    # media group or text message, 'cards' sends one message per tutor
+    search_results_mode: str
+    # File format of the admin analytics snapshot: 'parquet' or 'feather'
+    analytics_format: str
+    # How updates arrive: 'polling' long-polls getUpdates, 'webhook' runs the
+    # embedded HTTP server in ingress/webhook.py behind WEBHOOK_URL
+    update_mode: str
+    webhook_url: str
+    webhook_listen: str
+    webhook_port: int
+    webhook_path: str
+    # Sent by Telegram in X-Telegram-Bot-Api-Secret-Token; a random one is
+    # generated per start when unset, which is fine because setWebhook is
+    # called again on every start
+    webhook_secret: str
+    # Updates accepted but not yet handled; when full the server answers 503
+    webhook_queue_size: int
+    webhook_max_connections: int
+    # Updates of different chats handled at the same time; each chat's own
+    # updates are always handled one after the other (update_processor.py)
+    max_concurrent_updates: int
+    # Worker processes; above 1 this process only receives updates and hands
+    # each chat's updates to one worker (ingress/sharding.py). The queue and
+    # concurrency limits above then apply per worker.
+    update_workers: int
+    # Ingress: request body limit, how long a delivery waits for room in a
+    # full backlog before the webhook answers 503, and how long an idle
+    # keep-alive connection is held open
+    webhook_max_body: int
+    webhook_enqueue_timeout: float
+    webhook_idle_timeout: float
+    # Sharded deployment: how long a stopping worker gets to drain its queue,
+    # the getUpdates long-poll timeout, and how often dead workers are checked for
+    worker_stop_timeout: float
+    poll_timeout: int
+    worker_check_interval: float
+    # Longest wait between attempts to reach MongoDB at startup
+    db_connect_max_backoff: float
+    # Bounded pool that runs the blocking pymongo calls off the event loop
+    db_executor_workers: int
+    # In-process cache of approved tutors (database/tutor_cache.py); it holds as
+    # many tutors as fit in tutor_cache_memory_mb unless tutor_cache_max_entries
+    # (0 = sized from memory) sets the count directly
+    tutor_cache_enabled: bool
+    tutor_cache_memory_mb: int
+    tutor_cache_max_entries: int
+    tutor_cache_poll_interval: float
+    # Cached search match counts (database/search.py)
+    search_totals_ttl: int
+    search_totals_max_entries: int
+    # Rendered tutor cards kept in the LRU cache (messaging/cards.py)
+    card_cache_size: int
+    # How often the catalog document is checked for a new version
+    catalog_poll_interval: float
+    # Broadcasts: messages per second, concurrent senders, seconds between
+    # progress reports and recipients recorded per checkpoint
+    broadcast_rate: float
+    broadcast_workers: int
+    broadcast_progress_interval: float
+    broadcast_checkpoint_size: int
+    # Outbound scheduler limits (messaging/scheduler.py); rates are per second
+    outbound_global_rate: float
+    outbound_chat_rate: float
+    outbound_chat_burst: float
+    outbound_group_rate: float
+    outbound_max_retries: int
+    # CSV export: cursor batch size, bytes kept in memory before spooling to
+    # disk, gzip on/off, and seconds a delta export reaches back past the last one
+    export_batch_size: int
+    export_spool_size: int
+    export_gzip: bool
+    export_watermark_overlap: float
+    # Analytics snapshot: tutors per typed chunk and bytes kept in memory
+    analytics_chunk_size: int
+    analytics_spool_size: int
+
+    @classmethod
+    def from_env(cls) -> 'Settings':
+        mongo_max_pool_size = _env_int('MONGO_MAX_POOL_SIZE', 20)
+        mongo_min_pool_size = _env_int('MONGO_MIN_POOL_SIZE', 0, minimum=0)
+        if mongo_min_pool_size > mongo_max_pool_size:
+            raise ValueError(f"MONGO_MIN_POOL_SIZE ({mongo_min_pool_size}) is above "
+                             f"MONGO_MAX_POOL_SIZE ({mongo_max_pool_size})")
+
+        return cls(
+            bot_token=os.getenv('BOT_TOKEN', ''),
+            bot_api_url=os.getenv('BOT_API_URL', 'https://api.telegram.org/bot').strip(),
+            admin_ids=frozenset(
+                int(id_str.strip()) for id_str in os.getenv('ADMIN_IDS', '').split(',') if id_str.strip()
+            ),
+            admin_number=os.getenv('ADMIN_NUMBER', '').strip(),
+            mongo_uri=os.getenv('MONGO_URI', 'mongodb://localhost:27017/'),
+            db_name=os.getenv('DB_NAME', 'tutor_connect'),
+            mongo_max_pool_size=mongo_max_pool_size,
+            mongo_min_pool_size=mongo_min_pool_size,
+            mongo_wait_queue_timeout_ms=_env_int('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000),
+            mongo_server_selection_timeout_ms=_env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+            mongo_compressors=os.getenv('MONGO_COMPRESSORS', '').strip(),
+            search_results_mode=_env_choice('SEARCH_RESULTS_MODE', 'album', ('album', 'cards')),
+            analytics_format=_env_choice('ANALYTICS_FORMAT', 'parquet', ('parquet', 'feather')),
+            update_mode=_env_choice('UPDATE_MODE', 'polling', ('polling', 'webhook')),
+            webhook_url=os.getenv('WEBHOOK_URL', '').strip(),
+            webhook_listen=os.getenv('WEBHOOK_LISTEN', '0.0.0.0'),
+            webhook_port=_env_int('WEBHOOK_PORT', 8443),
+            webhook_path='/' + os.getenv('WEBHOOK_PATH', '/telegram').strip().strip('/'),
+            webhook_secret=os.getenv('WEBHOOK_SECRET', '').strip() or secrets.token_urlsafe(32),
+            webhook_queue_size=_env_int('WEBHOOK_QUEUE_SIZE', 1000),
+            webhook_max_connections=_env_int('WEBHOOK_MAX_CONNECTIONS', 40),
+            max_concurrent_updates=_env_int('MAX_CONCURRENT_UPDATES', 32),
+            update_workers=_env_int('UPDATE_WORKERS', 1),
+            webhook_max_body=_env_int('WEBHOOK_MAX_BODY', 1024 * 1024),
+            webhook_enqueue_timeout=_env_float('WEBHOOK_ENQUEUE_TIMEOUT', 0.5),
+            webhook_idle_timeout=_env_float('WEBHOOK_IDLE_TIMEOUT', 75),
+            worker_stop_timeout=_env_float('WORKER_STOP_TIMEOUT', 30),
+            poll_timeout=_env_int('POLL_TIMEOUT', 10, minimum=0),
+            worker_check_interval=_env_float('WORKER_CHECK_INTERVAL', 1),
+            db_connect_max_backoff=_env_float('DB_CONNECT_MAX_BACKOFF', 60),
+            db_executor_workers=_env_int('DB_EXECUTOR_WORKERS', 8),
+            tutor_cache_enabled=_env_flag('TUTOR_CACHE_ENABLED', True),
+            tutor_cache_memory_mb=_env_int('TUTOR_CACHE_MEMORY_MB', 256),
+            tutor_cache_max_entries=_env_int('TUTOR_CACHE_MAX_ENTRIES', 0, minimum=0),
+            tutor_cache_poll_interval=_env_float('TUTOR_CACHE_POLL_INTERVAL', 10),
+            search_totals_ttl=_env_int('SEARCH_TOTALS_TTL', 300, minimum=0),
+            search_totals_max_entries=_env_int('SEARCH_TOTALS_MAX_ENTRIES', 1024),
+            card_cache_size=_env_int('CARD_CACHE_SIZE', 2000),
+            catalog_poll_interval=_env_float('CATALOG_POLL_INTERVAL', 60),
+            broadcast_rate=_env_float('BROADCAST_RATE', 25),
+            broadcast_workers=_env_int('BROADCAST_WORKERS', 10),
+            broadcast_progress_interval=_env_float('BROADCAST_PROGRESS_INTERVAL', 2),
+            broadcast_checkpoint_size=_env_int('BROADCAST_CHECKPOINT_SIZE', 100),
+            outbound_global_rate=_env_float('OUTBOUND_GLOBAL_RATE', 30),
+            outbound_chat_rate=_env_float('OUTBOUND_CHAT_RATE', 1),
+            outbound_chat_burst=_env_float('OUTBOUND_CHAT_BURST', 6, minimum=1, exclusive=False),
+            outbound_group_rate=_env_float('OUTBOUND_GROUP_RATE', 20 / 60),
+            outbound_max_retries=_env_int('OUTBOUND_MAX_RETRIES', 2, minimum=0),
+            export_batch_size=_env_int('EXPORT_BATCH_SIZE', 1000),
+            export_spool_size=_env_int('EXPORT_SPOOL_SIZE', 4 * 1024 * 1024, minimum=0),
+            export_gzip=_env_flag('EXPORT_GZIP', False),
+            export_watermark_overlap=_env_float('EXPORT_WATERMARK_OVERLAP', 5, exclusive=False),
+            analytics_chunk_size=_env_int('ANALYTICS_CHUNK_SIZE', 50000),
+            analytics_spool_size=_env_int('ANALYTICS_SPOOL_SIZE', 8 * 1024 * 1024, minimum=0),
+        )
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self.admin_ids
+
+    @property
+    def admin_whatsapp_url(self) -> str:
+        """WhatsApp link for the admin number, or '' when no number is set."""
+        if not self.admin_number:
+            return ''
+        # Format the number for display (remove + and any non-digit characters)
+        return f"https://wa.me/{''.join(filter(str.isdigit, self.admin_number))}"
+
+
+settings = Settings.from_env()
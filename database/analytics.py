@@ -0,0 +1,138 @@
+"""Columnar analytics snapshot of the tutors collection.
+
+The snapshot is a pandas DataFrame with one row per tutor and fixed
+column types, written as Parquet or Feather so analysts can load it
+without re-parsing CSV. Subjects are exploded into one boolean
+``subject_<name>`` column per subject of the current catalog (see
+``catalog.py``), dates become ``datetime64[ns, UTC]`` and the
+low-cardinality text fields become categoricals. The subject columns and
+the grade and method categories are taken from the catalog when the
+snapshot is built, so a hot-reloaded catalog shows up in the next one.
+
+Documents are read from a batched cursor and turned into a small frame
+every ``ANALYTICS_CHUNK_SIZE`` tutors, so the raw documents never pile up
+in one list; the typed chunks are concatenated once at the end. Contact
+details and names are left out, the snapshot is for aggregate analysis.
+"""
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from catalog import Catalog, catalog_service
+from config import settings
+
+SNAPSHOT_FORMATS = ('parquet', 'feather')
+
+STATUSES = ['pending', 'approved', 'rejected']
+DATE_COLUMNS = ('registration_date', 'created_at', 'updated_at')
+DATE_DTYPE = 'datetime64[ns, UTC]'
+# Free-text fields are made categorical once all chunks are joined
+TEXT_CATEGORIES = ('university', 'department', 'year', 'location')
+
+PROJECTION = {
+    'university': 1, 'department': 1, 'year': 1, 'subjects': 1, 'grades': 1, 'method': 1,
+    'location': 1, 'status': 1, 'rating': 1, 'reviews_count': 1,
+    'registration_date': 1, 'created_at': 1, 'updated_at': 1,
+}
+
+
+def _chunks(documents: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def fixed_categories(catalog: Catalog) -> Dict[str, pd.CategoricalDtype]:
+    """Categoricals with a known vocabulary, so every chunk gets the same dtype."""
+    return {
+        'status': pd.CategoricalDtype(STATUSES),
+        'grades': pd.CategoricalDtype(catalog.grades),
+        'method': pd.CategoricalDtype(catalog.methods),
+    }
+
+
+def subject_columns(catalog: Catalog) -> Dict[str, str]:
+    """The boolean column of each catalog subject."""
+    return {subject: f"subject_{subject.lower()}" for subject in catalog.subjects}
+
+
+def chunk_frame(documents: List[Dict[str, Any]], catalog: Catalog) -> pd.DataFrame:
+    """Build the typed snapshot rows for one chunk of tutor documents."""
+    subjects = [set(document.get('subjects') or ()) for document in documents]
+    columns = {
+        'tutor_id': pd.array([str(document['_id']) for document in documents], dtype='string'),
+    }
+    for field in TEXT_CATEGORIES:
+        columns[field] = pd.array([document.get(field) for document in documents], dtype='string')
+    for field, dtype in fixed_categories(catalog).items():
+        columns[field] = pd.Categorical([document.get(field) for document in documents], dtype=dtype)
+    for field in DATE_COLUMNS:
+        dates = pd.to_datetime([document.get(field) for document in documents], utc=True)
+        columns[field] = dates.astype(DATE_DTYPE)
+    columns['rating'] = pd.array([document.get('rating') for document in documents], dtype='Float64')
+    columns['reviews_count'] = pd.array([document.get('reviews_count') for document in documents], dtype='Int32')
+    columns['subject_count'] = pd.array([len(tutor_subjects) for tutor_subjects in subjects], dtype='int8')
+    for subject, column in subject_columns(catalog).items():
+        columns[column] = pd.array([subject in tutor_subjects for tutor_subjects in subjects], dtype='bool')
+    return pd.DataFrame(columns)
+
+
+def build_snapshot(documents: Iterable[Dict[str, Any]], chunk_size: int = settings.analytics_chunk_size,
+                   catalog: Optional[Catalog] = None) -> pd.DataFrame:
+    """Build the analytics snapshot from tutor documents, ``chunk_size`` at a time."""
+    # One catalog for every chunk, so a reload during the export cannot change the columns
+    catalog = catalog or catalog_service.current
+    frames = [chunk_frame(chunk, catalog) for chunk in _chunks(documents, chunk_size)]
+    if not frames:
+        return chunk_frame([], catalog)
+    snapshot = pd.concat(frames, ignore_index=True)
+    for field in TEXT_CATEGORIES:
+        snapshot[field] = snapshot[field].astype('category')
+    return snapshot
+
+
+def write_snapshot(snapshot: pd.DataFrame, binary_file, fmt: str):
+    """Write a snapshot to a binary file as Parquet or Feather."""
+    if fmt == 'parquet':
+        snapshot.to_parquet(binary_file, index=False, compression='zstd')
+    elif fmt == 'feather':
+        snapshot.to_feather(binary_file, compression='zstd')
+    else:
+        raise ValueError(f"Unknown analytics format {fmt!r}, expected one of {SNAPSHOT_FORMATS}")
+
+
+def export_snapshot(collection, query: Optional[Dict[str, Any]] = None,
+                    fmt: Optional[str] = None) -> Tuple[Optional[tempfile.SpooledTemporaryFile], int]:
+    """Export the tutors matching a query to a spooled Parquet or Feather file.
+
+    Returns the file rewound to its start and the number of rows, or
+    ``(None, 0)`` when nothing matches. The caller closes the file.
+    """
+    fmt = fmt or settings.analytics_format
+    if fmt not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unknown analytics format {fmt!r}, expected one of {SNAPSHOT_FORMATS}")
+
+    cursor = collection.find(query or {}, PROJECTION).batch_size(min(settings.analytics_chunk_size, 10000))
+    try:
+        snapshot = build_snapshot(cursor)
+    finally:
+        cursor.close()
+
+    if snapshot.empty:
+        return None, 0
+
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.analytics_spool_size)
+    try:
+        write_snapshot(snapshot, spool, fmt)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, len(snapshot)
+
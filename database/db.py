@@ -1,43 +1,76 @@
-import os
+import threading
+import time
 from pymongo import MongoClient
 from pymongo.database import Database
 from typing import Optional
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from config import settings
+from database.monitoring import PoolMonitor, ServerMonitor
 
 class DatabaseManager:
+    """Lazily connected MongoDB client.
+
+    Nothing touches the network at import. The client is created on first
+    use (pymongo connects in the background), and ``ping()`` checks the
+    server and records readiness.
+    """
     _instance = None
     _client: Optional[MongoClient] = None
     _db: Optional[Database] = None
+    _ready: bool = False
+    _lock = threading.Lock()
+    pool_monitor = PoolMonitor()
+    server_monitor = ServerMonitor()
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(DatabaseManager, cls).__new__(cls)
-            cls._instance._initialize_db()
         return cls._instance
 
     def _initialize_db(self):
-        """Initialize the MongoDB connection and database."""
-        mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
-        db_name = os.getenv('DB_NAME', 'tutor_connect')
-        
+        """Create the MongoDB client and database handle without waiting for the server."""
+        options = {
+            'maxPoolSize': settings.mongo_max_pool_size,
+            'minPoolSize': settings.mongo_min_pool_size,
+            'waitQueueTimeoutMS': settings.mongo_wait_queue_timeout_ms,
+            'serverSelectionTimeoutMS': settings.mongo_server_selection_timeout_ms,
+            'event_listeners': [self.pool_monitor, self.server_monitor],
+        }
+        if settings.mongo_compressors:
+            options['compressors'] = settings.mongo_compressors
+        self._client = MongoClient(settings.mongo_uri, **options)
+        self._db = self._client[settings.db_name]
+
+    @property
+    def ready(self) -> bool:
+        """Whether the last ping reached the server."""
+        return self._ready
+
+    def ping(self) -> float:
+        """Check the connection and return the round-trip time in seconds."""
+        start = time.perf_counter()
         try:
-            self._client = MongoClient(mongo_uri)
-            self._db = self._client[db_name]
-            # Test the connection
-            self._client.admin.command('ping')
-            print("Successfully connected to MongoDB!")
+            self.db.client.admin.command('ping')
         except Exception as e:
+            self._ready = False
             print(f"Error connecting to MongoDB: {e}")
             raise
+        self._ready = True
+        print("Successfully connected to MongoDB!")
+        return time.perf_counter() - start
+
+    def pool_stats(self) -> dict:
+        """Get connection pool and server counters."""
+        return dict(self.pool_monitor.stats(), **self.server_monitor.stats())
 
     @property
     def db(self) -> Database:
         """Get the database instance."""
         if self._db is None:
-            self._initialize_db()
+            # Executor threads may race to make the first query
+            with self._lock:
+                if self._db is None:
+                    self._initialize_db()
         return self._db
 
     @property
@@ -51,8 +84,9 @@ class DatabaseManager:
             self._client.close()
             self._client = None
             self._db = None
+            self._ready = False
 
-# Create a singleton instance
+# Create a singleton instance (no connection is made until first use)
 db_manager = DatabaseManager()
 
 def get_db() -> Database:
@@ -66,3 +100,19 @@ def get_tutors_collection():
 def get_users_collection():
     """Get the users collection."""
     return get_db().users
+
+def get_broadcast_jobs_collection():
+    """Get the broadcast jobs collection."""
+    return get_db().broadcast_jobs
+
+def get_broadcast_recipients_collection():
+    """Get the per-recipient broadcast status collection."""
+    return get_db().broadcast_recipients
+
+def get_catalog_collection():
+    """Get the collection holding the hot-reloadable subject/grade catalog."""
+    return get_db().catalog
+
+def get_export_watermarks_collection():
+    """Get the per-admin export watermark collection."""
+    return get_db().export_watermarks
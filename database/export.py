@@ -0,0 +1,143 @@
+"""Streaming CSV export of the tutors collection.
+
+Documents are read from a batched cursor and written one row at a time
+into a ``SpooledTemporaryFile``, optionally through gzip. The file stays
+in memory while it is small and moves to disk once it passes
+``EXPORT_SPOOL_SIZE`` bytes, so memory use does not grow with the collection.
+
+The columns are discovered up front with one aggregation over the
+matching documents, so a field that only some tutors have still gets a
+column instead of breaking the writer.
+
+Every tutor carries ``created_at`` and ``updated_at``. A delta export
+selects ``updated_at`` greater than the admin's last export through the
+``updated_at`` index. The window starts ``EXPORT_WATERMARK_OVERLAP``
+seconds early so a write stamped just before the previous export but
+committed after it is not lost; such a tutor is exported twice instead.
+"""
+import csv
+import datetime
+import gzip
+import io
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from config import settings
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Internal fields that never go into an export
+EXCLUDED_FIELDS = ('_id', 'profile_photo', 'telegram_id', 'location_key')
+
+# Columns listed first, in this order, when present; the rest follow alphabetically
+PREFERRED_COLUMNS = (
+    'name', 'university', 'department', 'year', 'subjects', 'grades', 'method',
+    'location', 'contact', 'status', 'registration_date', 'created_at', 'updated_at',
+)
+
+
+def discover_columns(collection, query: Dict[str, Any]) -> List[str]:
+    """Get every top-level field used by the documents matching a query."""
+    pipeline = [
+        {'$match': query},
+        {'$project': {'fields': {'$objectToArray': '$$ROOT'}}},
+        {'$unwind': '$fields'},
+        {'$group': {'_id': '$fields.k'}},
+    ]
+    fields = {field['_id'] for field in collection.aggregate(pipeline, allowDiskUse=True)}
+    fields.difference_update(EXCLUDED_FIELDS)
+
+    columns = [column for column in PREFERRED_COLUMNS if column in fields]
+    columns.extend(sorted(fields.difference(PREFERRED_COLUMNS)))
+    return columns
+
+
+def changed_since_query(since: Optional[datetime.datetime]) -> Dict[str, Any]:
+    """Build the filter for tutors changed after an export watermark; every tutor when there is none."""
+    if since is None:
+        return {}
+    return {'updated_at': {'$gt': since - datetime.timedelta(seconds=settings.export_watermark_overlap)}}
+
+
+def backfill_tutor_timestamps(collection) -> int:
+    """Stamp ``created_at`` and ``updated_at`` on tutors registered before they existed."""
+    updated = 0
+    batch = []
+    query = {'$or': [{'created_at': {'$exists': False}}, {'updated_at': {'$exists': False}}]}
+    cursor = collection.find(query, {'created_at': 1, 'updated_at': 1})
+
+    for tutor in cursor.batch_size(BACKFILL_BATCH_SIZE):
+        # The ObjectId holds the insert time, in UTC like the other stamps
+        created_at = tutor.get('created_at') or tutor['_id'].generation_time.replace(tzinfo=None)
+        batch.append(UpdateOne(
+            {'_id': tutor['_id']},
+            {'$set': {'created_at': created_at, 'updated_at': tutor.get('updated_at') or created_at}}
+        ))
+        if len(batch) == BACKFILL_BATCH_SIZE:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+
+def _cell(value) -> Any:
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(item) for item in value)
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def write_csv(documents: Iterable[Dict[str, Any]], columns: List[str], binary_file) -> int:
+    """Write documents as UTF-8 CSV rows to a binary file and return the row count."""
+    text = io.TextIOWrapper(binary_file, encoding='utf-8', newline='', write_through=True)
+    writer = csv.DictWriter(text, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    rows = 0
+    for document in documents:
+        writer.writerow({column: _cell(document.get(column)) for column in columns})
+        rows += 1
+    text.flush()
+    # Leave the underlying file open for the caller
+    text.detach()
+    return rows
+
+
+def export_csv(collection, query: Optional[Dict[str, Any]] = None,
+               compress: bool = settings.export_gzip) -> Tuple[Optional[tempfile.SpooledTemporaryFile], int]:
+    """Export the documents matching a query to a spooled CSV file.
+
+    Returns the file rewound to its start and the number of rows, or
+    ``(None, 0)`` when nothing matches. The caller closes the file.
+    """
+    query = query or {}
+    columns = discover_columns(collection, query)
+    if not columns:
+        return None, 0
+
+    projection = {column: 1 for column in columns}
+    projection['_id'] = 0
+    cursor = collection.find(query, projection).batch_size(settings.export_batch_size)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.export_spool_size)
+    try:
+        if compress:
+            with gzip.GzipFile(fileobj=spool, mode='wb') as compressed:
+                rows = write_csv(cursor, columns, compressed)
+        else:
+            rows = write_csv(cursor, columns, spool)
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        cursor.close()
+
+    if not rows:
+        spool.close()
+        return None, 0
+    spool.seek(0)
+    return spool, rows
@@ -0,0 +1,337 @@
+"""Versioned index migrations for the bot's collections.
+
+Run at startup through ``apply_migrations()`` or from the command line:
+
+    python -m database.indexes apply       # create declared indexes
+    python -m database.indexes report      # list missing, unused and redundant indexes
+    python -m database.indexes explain     # check handler queries use an index
+    python -m database.indexes duplicates  # list values that block a unique index
+"""
+import datetime
+import logging
+import sys
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import OperationFailure, PyMongoError
+
+from database.db import get_db
+from database.export import backfill_tutor_timestamps
+from database.location import backfill_location_keys
+from database.recipients import backfill_tutor_recipients
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_COLLECTION = 'schema_migrations'
+
+# Indexes a later migration made redundant. They are no longer created on
+# startup, and the migration that retired them drops them.
+RETIRED_INDEXES = {
+    'tutors': {'status_subjects', 'status_grades', 'status_name'},
+}
+
+
+def drop_retired_indexes(collection: Collection) -> int:
+    """Drop the retired indexes of a collection; returns how many existed."""
+    dropped = 0
+    for name in sorted(RETIRED_INDEXES.get(collection.name, ())):
+        try:
+            collection.drop_index(name)
+            dropped += 1
+        except OperationFailure as e:
+            # IndexNotFound: never created, or already dropped by hand
+            if e.code != 27:
+                raise
+    return dropped
+
+
+# Each migration is (version, collection name, indexes[, backfill]). The
+# optional backfill is called with the collection once, when the version is
+# first applied. Append new migrations with a higher version instead of
+# editing applied ones.
+INDEX_MIGRATIONS = [
+    (1, 'tutors', [
+        IndexModel([("telegram_id", ASCENDING)], name="telegram_id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("subjects", ASCENDING)], name="status_subjects"),
+        IndexModel([("status", ASCENDING), ("grades", ASCENDING)], name="status_grades"),
+        IndexModel([("status", ASCENDING), ("name", ASCENDING)], name="status_name"),
+        IndexModel([("status", ASCENDING), ("_id", ASCENDING)], name="status_id"),
+    ]),
+    # Keyset pagination sorts every filtered listing by _id (or name, _id)
+    (2, 'tutors', [
+        IndexModel([("status", ASCENDING), ("subjects", ASCENDING), ("_id", ASCENDING)], name="status_subjects_id"),
+        IndexModel([("status", ASCENDING), ("grades", ASCENDING), ("_id", ASCENDING)], name="status_grades_id"),
+        IndexModel([("status", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)], name="status_name_id"),
+    ]),
+    # Location search matches token prefixes instead of a regex over free text
+    (3, 'tutors', [
+        IndexModel([("status", ASCENDING), ("location_key", ASCENDING), ("_id", ASCENDING)], name="status_location_key_id"),
+    ], backfill_location_keys),
+    # The tutor cache polls for changes by updated_at when change streams are unavailable
+    (4, 'tutors', [
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ]),
+    # Broadcast jobs resume by status and stream their pending recipients by chat_id
+    (5, 'broadcast_jobs', [
+        IndexModel([("status", ASCENDING)], name="status"),
+    ]),
+    (6, 'broadcast_recipients', [
+        IndexModel([("job_id", ASCENDING), ("chat_id", ASCENDING)], name="job_chat_unique", unique=True),
+        IndexModel([("job_id", ASCENDING), ("status", ASCENDING), ("chat_id", ASCENDING)], name="job_status_chat"),
+    ]),
+    # Recipient registry; partial so legacy user documents without a chat_id do not collide
+    (7, 'users', [
+        IndexModel([("chat_id", ASCENDING)], name="chat_id_unique", unique=True,
+                   partialFilterExpression={"chat_id": {"$exists": True}}),
+    ], backfill_tutor_recipients),
+    # Delta exports select tutors by updated_at, so every tutor needs the stamps
+    (8, 'tutors', [
+        IndexModel([("created_at", ASCENDING)], name="created_at"),
+    ], backfill_tutor_timestamps),
+    # The v1 status_* indexes are prefixes of the v2 status_*_id ones, which
+    # serve the same queries; keeping both only costs writes and memory
+    (9, 'tutors', [], drop_retired_indexes),
+]
+
+# Queries issued by the handlers, used by explain_handler_queries().
+# Each entry is (label, collection name, filter, sort).
+HANDLER_QUERIES = [
+    ("tutor.find_by_telegram_id", 'tutors', {"telegram_id": 0}, None),
+    ("admin.pending_count", 'tutors', {"status": "pending"}, None),
+    ("admin.pending_approvals", 'tutors', {"status": "pending"}, [("_id", DESCENDING)]),
+    ("admin.all_tutors", 'tutors', {"status": "approved"}, [("name", ASCENDING), ("_id", ASCENDING)]),
+    ("student.show_all", 'tutors', {"status": "approved"}, [("_id", ASCENDING)]),
+    ("student.by_subject", 'tutors', {"status": "approved", "subjects": "Mathematics"}, [("_id", ASCENDING)]),
+    ("student.by_grade", 'tutors', {"status": "approved", "grades": "5-8"}, [("_id", ASCENDING)]),
+    ("student.by_location", 'tutors', {"status": "approved", "location_key": {"$regex": "^bol"}}, [("_id", ASCENDING)]),
+    ("broadcast.recipients", 'users', {"chat_id": {"$exists": True}, "blocked": {"$ne": True}, "role": "tutor"},
+     [("chat_id", ASCENDING)]),
+    ("admin.export_changes", 'tutors', {"updated_at": {"$gt": datetime.datetime(2024, 1, 1)}}, None),
+    ("broadcast.unfinished_jobs", 'broadcast_jobs', {"status": {"$in": ["pending", "running"]}}, None),
+    ("broadcast.abandoned_jobs", 'broadcast_jobs',
+     {"status": "creating", "updated_at": {"$lt": datetime.datetime(2024, 1, 1)}}, None),
+    ("broadcast.pending_recipients", 'broadcast_recipients',
+     {"job_id": None, "status": "pending", "chat_id": {"$gt": 0}}, [("chat_id", ASCENDING)]),
+]
+
+
+def applied_versions(db: Optional[Database] = None) -> List[int]:
+    """Get the migration versions already recorded in the database."""
+    db = db if db is not None else get_db()
+    return sorted(doc['_id'] for doc in db[MIGRATIONS_COLLECTION].find({}, {'_id': 1}))
+
+
+def _current_indexes(collection_name: str, indexes: List[IndexModel]) -> List[IndexModel]:
+    retired = RETIRED_INDEXES.get(collection_name, set())
+    return [index for index in indexes if index.document['name'] not in retired]
+
+
+def find_duplicates(collection: Collection, index: IndexModel, limit: int = 20) -> List[dict]:
+    """Find key values that occur more than once among the documents a unique index covers.
+
+    Returns up to ``limit`` entries of ``{'key': ..., 'count': ..., 'ids': [...]}``,
+    most repeated first.
+    """
+    fields = list(index.document['key'])
+    pipeline = []
+    if 'partialFilterExpression' in index.document:
+        pipeline.append({"$match": index.document['partialFilterExpression']})
+    pipeline.extend([
+        {"$group": {"_id": {field: f"${field}" for field in fields},
+                    "count": {"$sum": 1}, "ids": {"$push": "$_id"}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+    ])
+    return [{'key': doc['_id'], 'count': doc['count'], 'ids': doc['ids'][:10]}
+            for doc in collection.aggregate(pipeline, allowDiskUse=True)]
+
+
+def report_duplicates(db: Optional[Database] = None) -> Dict[str, List[dict]]:
+    """Report the duplicates blocking each declared unique index, keyed by index name."""
+    db = db if db is not None else get_db()
+    report = {}
+    for _, collection_name, indexes, *_ in INDEX_MIGRATIONS:
+        for index in indexes:
+            if index.document.get('unique'):
+                report[index.document['name']] = find_duplicates(db[collection_name], index)
+    return report
+
+
+def apply_migrations(db: Optional[Database] = None) -> List[int]:
+    """Create every declared index and record newly applied versions.
+
+    ``create_indexes`` is a no-op for indexes that already exist with the same
+    definition, so this is safe to run on every startup. A migration that
+    fails is logged, left unrecorded and retried on the next run; the ones
+    after it are still applied. When a unique index fails, the duplicate
+    values blocking it are logged as well.
+    """
+    db = db if db is not None else get_db()
+    done = set(applied_versions(db))
+    newly_applied = []
+
+    for version, collection_name, indexes, *backfill in INDEX_MIGRATIONS:
+        indexes = _current_indexes(collection_name, indexes)
+        try:
+            names = db[collection_name].create_indexes(indexes) if indexes else []
+        except PyMongoError as e:
+            logger.error(f"Index migration {version} on {collection_name} failed: {e}")
+            _log_duplicates(db[collection_name], indexes)
+            continue
+        if version in done:
+            continue
+        try:
+            for step in backfill:
+                updated = step(db[collection_name])
+                logger.info(f"Migration {version} ran {step.__name__} on {collection_name}: {updated} changed")
+            db[MIGRATIONS_COLLECTION].insert_one({
+                '_id': version,
+                'collection': collection_name,
+                'indexes': names,
+                'applied_at': datetime.datetime.utcnow()
+            })
+        except PyMongoError as e:
+            logger.error(f"Backfill for migration {version} on {collection_name} failed: {e}")
+            continue
+        newly_applied.append(version)
+        logger.info(f"Applied index migration {version} on {collection_name}: {', '.join(names) or '-'}")
+
+    return newly_applied
+
+
+def _log_duplicates(collection: Collection, indexes: List[IndexModel]):
+    """Log the duplicate values behind a failed unique index, so they can be cleaned up."""
+    for index in indexes:
+        if not index.document.get('unique'):
+            continue
+        try:
+            duplicates = find_duplicates(collection, index)
+        except PyMongoError as e:
+            logger.warning(f"Could not look for duplicates of {index.document['name']}: {e}")
+            continue
+        for duplicate in duplicates:
+            logger.error(f"{index.document['name']} blocked by {duplicate['count']} documents with "
+                         f"{duplicate['key']} in {collection.name}: {duplicate['ids']}")
+
+
+def declared_indexes() -> Dict[str, List[str]]:
+    """Get the declared index names grouped by collection."""
+    declared: Dict[str, List[str]] = {}
+    for _, collection_name, indexes, *_ in INDEX_MIGRATIONS:
+        declared.setdefault(collection_name, []).extend(
+            index.document['name'] for index in _current_indexes(collection_name, indexes)
+        )
+    return declared
+
+
+def redundant_indexes(index_information: Dict[str, dict]) -> List[str]:
+    """Find indexes whose keys are a strict prefix of another index's keys.
+
+    The longer index serves every query the shorter one does. Unique, sparse
+    and partial indexes are left out, since they do more than speed up reads.
+    """
+    def plain(info):
+        return not any(info.get(option) for option in ('unique', 'sparse', 'partialFilterExpression'))
+
+    redundant = []
+    for name, info in sorted(index_information.items()):
+        if name == '_id_' or not plain(info):
+            continue
+        key = list(info['key'])
+        for other_name, other in sorted(index_information.items()):
+            other_key = list(other['key'])
+            if len(other_key) > len(key) and other_key[:len(key)] == key and plain(other):
+                redundant.append(f"{name} (prefix of {other_name})")
+                break
+    return redundant
+
+
+def report_indexes(db: Optional[Database] = None) -> Dict[str, Dict[str, List[str]]]:
+    """Report declared indexes that are missing, and existing indexes that are unused or redundant."""
+    db = db if db is not None else get_db()
+    report = {}
+
+    for collection_name, names in declared_indexes().items():
+        collection = db[collection_name]
+        existing = set(collection.index_information())
+        unused = []
+        try:
+            for stats in collection.aggregate([{"$indexStats": {}}]):
+                if stats['name'] != '_id_' and stats['accesses']['ops'] == 0:
+                    unused.append(stats['name'])
+        except Exception as e:
+            logger.warning(f"Could not read index stats for {collection_name}: {e}")
+
+        report[collection_name] = {
+            'missing': [name for name in names if name not in existing],
+            'unused': sorted(unused),
+            'redundant': redundant_indexes(collection.index_information()),
+        }
+
+    return report
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    """Collect the stage names of a query plan tree."""
+    stages = [plan.get('stage', '')]
+    if 'inputStage' in plan:
+        stages.extend(_plan_stages(plan['inputStage']))
+    for child in plan.get('inputStages', []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def explain_handler_queries(db: Optional[Database] = None) -> Dict[str, List[str]]:
+    """Explain each handler query and return the winning plan's stages."""
+    db = db if db is not None else get_db()
+    plans = {}
+
+    for label, collection_name, query, sort in HANDLER_QUERIES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = cursor.explain()
+        plans[label] = _plan_stages(explanation['queryPlanner']['winningPlan'])
+
+    return plans
+
+
+def main(argv: List[str]) -> int:
+    command = argv[1] if len(argv) > 1 else 'apply'
+
+    if command == 'apply':
+        applied = apply_migrations()
+        print(f"Applied migrations: {applied or 'none (already up to date)'}")
+    elif command == 'report':
+        for collection_name, result in report_indexes().items():
+            print(f"{collection_name}:")
+            print(f"  missing: {', '.join(result['missing']) or '-'}")
+            print(f"  unused:  {', '.join(result['unused']) or '-'}")
+            print(f"  redundant: {', '.join(result['redundant']) or '-'}")
+    elif command == 'explain':
+        failed = False
+        for label, stages in explain_handler_queries().items():
+            uses_index = 'IXSCAN' in stages and 'COLLSCAN' not in stages
+            failed = failed or not uses_index
+            print(f"{'OK  ' if uses_index else 'SCAN'} {label}: {' <- '.join(stages)}")
+        return 1 if failed else 0
+    elif command == 'duplicates':
+        found = False
+        for name, duplicates in report_duplicates().items():
+            found = found or bool(duplicates)
+            print(f"{name}: {len(duplicates) or 'no'} duplicated values")
+            for duplicate in duplicates:
+                print(f"  {duplicate['key']} x{duplicate['count']}: {duplicate['ids']}")
+        return 1 if found else 0
+    else:
+        print(f"Unknown command: {command}. Use apply, report, explain or duplicates.")
+        return 2
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
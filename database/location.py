@@ -0,0 +1,63 @@
+"""Normalized location keys and indexed location lookups.
+
+Tutors store ``location_key``, the lower-cased word tokens of their free
+text location. Searches match each token of the user's input as an
+escaped, anchored prefix so MongoDB can answer them from an index.
+"""
+import re
+from typing import Any, Dict, List
+
+from pymongo import UpdateOne
+
+# Cap the tokens taken from user input so one search stays a handful of index scans
+MAX_QUERY_TOKENS = 5
+BACKFILL_BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def location_tokens(text: str) -> List[str]:
+    """Split a location into lower-cased, de-duplicated word tokens."""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or '').strip().lower()):
+        if token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def location_query(text: str) -> Dict[str, Any]:
+    """Build the filter matching tutors whose location has a token starting with each input word."""
+    tokens = location_tokens(text)[:MAX_QUERY_TOKENS]
+    if not tokens:
+        # Nothing searchable in the input, so nothing can match
+        return {'location_key': {'$in': []}}
+
+    clauses = [{'location_key': {'$regex': f'^{re.escape(token)}'}} for token in tokens]
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+
+def with_location_key(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Add ``location_key`` to a tutor write that sets ``location``."""
+    if 'location' in data:
+        data = dict(data, location_key=location_tokens(data['location']))
+    return data
+
+
+def backfill_location_keys(collection) -> int:
+    """Store ``location_key`` on every tutor that does not have one yet."""
+    updated = 0
+    batch = []
+    cursor = collection.find({'location_key': {'$exists': False}}, {'location': 1})
+
+    for tutor in cursor.batch_size(BACKFILL_BATCH_SIZE):
+        batch.append(UpdateOne(
+            {'_id': tutor['_id']},
+            {'$set': {'location_key': location_tokens(tutor.get('location'))}}
+        ))
+        if len(batch) == BACKFILL_BATCH_SIZE:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
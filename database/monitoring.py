@@ -0,0 +1,142 @@
+"""Connection pool and server monitoring for the MongoDB client.
+
+The listeners are registered on the client in ``DatabaseManager`` and keep
+counters that ``pool_stats()`` reports: connections in use, checkout wait
+times, checkout failures, pool clears and reconnects. The admin panel shows
+a summary and the webhook's ``/readyz`` includes them all.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Checkout waits kept for percentile reporting
+WAIT_SAMPLES = 1000
+
+
+def _percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Track checked-out connections and how long checkouts wait."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = list(self._waits)
+            return {
+                'open_connections': self.open_connections,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'pool_clears': self.pool_clears,
+                'wait_p50_ms': _percentile(waits, 50) * 1000,
+                'wait_p99_ms': _percentile(waits, 99) * 1000,
+                'wait_max_ms': max(waits, default=0.0) * 1000,
+            }
+
+    # Checkouts happen on the calling thread, so the start time is thread-local
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = time.perf_counter() - getattr(self._local, 'started', time.perf_counter())
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self._waits.append(waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+        logger.warning(f"MongoDB connection checkout failed on {event.address}: {event.reason}")
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+        logger.warning(f"MongoDB connection pool cleared for {event.address}")
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+class ServerMonitor(monitoring.ServerListener):
+    """Track server availability and count reconnects."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.available = False
+        self.disconnects = 0
+        self.reconnects = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'server_available': self.available,
+                'disconnects': self.disconnects,
+                'reconnects': self.reconnects,
+            }
+
+    def description_changed(self, event):
+        was_available = event.previous_description.is_server_type_known
+        is_available = event.new_description.is_server_type_known
+        if was_available == is_available:
+            return
+        with self._lock:
+            self.available = is_available
+            if is_available:
+                # The first successful contact is a connect, not a reconnect
+                if self.disconnects:
+                    self.reconnects += 1
+                    logger.info(f"Reconnected to MongoDB server {event.server_address}")
+            else:
+                self.disconnects += 1
+                logger.warning(f"Lost contact with MongoDB server {event.server_address}")
+
+    def opened(self, event):
+        pass
+
+    def closed(self, event):
+        pass
@@ -0,0 +1,55 @@
+"""Registry of the chats the bot can message.
+
+Every chat that starts the bot is upserted into ``users`` as
+``{chat_id, role, last_seen, blocked}``. Broadcasts stream their recipients
+from this collection through the ``chat_id`` index instead of scanning
+``users`` and ``tutors`` for anything that looks like a Telegram ID.
+"""
+import datetime
+from typing import Any, Dict, Iterator, Optional
+
+from pymongo import UpdateOne
+
+ROLE_USER = 'user'
+ROLE_TUTOR = 'tutor'
+ROLES = (ROLE_USER, ROLE_TUTOR)
+BATCH_SIZE = 1000
+
+
+def recipient_query(role: Optional[str] = None) -> Dict[str, Any]:
+    """Build the filter for the chats a broadcast may reach, optionally of one role."""
+    query = {'chat_id': {'$exists': True}, 'blocked': {'$ne': True}}
+    if role:
+        query['role'] = role
+    return query
+
+
+def iter_recipient_chat_ids(collection, role: Optional[str] = None) -> Iterator[int]:
+    """Stream recipient chat IDs in ``chat_id`` order, one batch per round trip."""
+    cursor = collection.find(recipient_query(role), {'chat_id': 1, '_id': 0}).sort('chat_id', 1)
+    for user in cursor.batch_size(BATCH_SIZE):
+        yield user['chat_id']
+
+
+def backfill_tutor_recipients(collection) -> int:
+    """Register every tutor's chat, marking it with the tutor role."""
+    now = datetime.datetime.utcnow()
+    updated = 0
+    batch = []
+    cursor = collection.database.tutors.find({'telegram_id': {'$exists': True}}, {'telegram_id': 1})
+
+    for tutor in cursor.batch_size(BATCH_SIZE):
+        batch.append(UpdateOne(
+            {'chat_id': tutor['telegram_id']},
+            {'$set': {'role': ROLE_TUTOR}, '$setOnInsert': {'last_seen': now, 'blocked': False}},
+            upsert=True
+        ))
+        if len(batch) == BATCH_SIZE:
+            result = collection.bulk_write(batch, ordered=False)
+            updated += result.modified_count + result.upserted_count
+            batch = []
+
+    if batch:
+        result = collection.bulk_write(batch, ordered=False)
+        updated += result.modified_count + result.upserted_count
+    return updated
@@ -0,0 +1,417 @@
+import asyncio
+import datetime
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from database.db import (
+    get_broadcast_jobs_collection, get_broadcast_recipients_collection,
+    get_export_watermarks_collection, get_tutors_collection, get_users_collection
+)
+from config import settings
+from database.export import export_csv
+from database.search import SEARCHABLE_FIELDS, Page, search_page, totals_cache
+from database.location import location_query, with_location_key
+from database.recipients import ROLE_USER, iter_recipient_chat_ids
+from database.tutor_cache import tutor_cache
+from database.views import ProfileView, SearchCard
+
+# Bounded pool that runs the blocking pymongo calls off the event loop
+_executor = ThreadPoolExecutor(max_workers=settings.db_executor_workers, thread_name_prefix='mongo')
+
+
+async def run_in_db_executor(func, *args, **kwargs):
+    """Run a blocking database call in the bounded executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor(wait: bool = True):
+    """Stop the database executor threads."""
+    _executor.shutdown(wait=wait)
+
+
+class TutorRepository:
+    """Async access to the tutors collection."""
+
+    def __init__(self, collection_getter=get_tutors_collection):
+        self._collection_getter = collection_getter
+
+    @property
+    def collection(self):
+        """Get the underlying pymongo collection."""
+        return self._collection_getter()
+
+    async def find_by_telegram_id(self, telegram_id: int, view=None):
+        """Get a tutor by their Telegram user ID, as a ``view`` record when one is given."""
+        projection = view.PROJECTION if view else None
+        tutor = await run_in_db_executor(self.collection.find_one, {"telegram_id": telegram_id}, projection)
+        return view.from_document(tutor) if view else tutor
+
+    async def find_by_id(self, tutor_id, view=None):
+        """Get a tutor by their document ID, as a ``view`` record when one is given."""
+        projection = view.PROJECTION if view else None
+        tutor = await run_in_db_executor(self.collection.find_one, {"_id": ObjectId(tutor_id)}, projection)
+        return view.from_document(tutor) if view else tutor
+
+    async def is_registered(self, telegram_id: int) -> bool:
+        """Check whether a Telegram user already has a tutor profile."""
+        tutor = await run_in_db_executor(self.collection.find_one, {"telegram_id": telegram_id}, {"_id": 1})
+        return tutor is not None
+
+    async def count(self, query: Dict[str, Any]) -> int:
+        """Count the tutors matching a query."""
+        return await run_in_db_executor(self.collection.count_documents, query)
+
+    async def find_page(self, query: Dict[str, Any], skip: int = 0, limit: int = 0,
+                        sort: Optional[list] = None, view=None) -> list:
+        """Get one page of tutors matching a query, as ``view`` records when one is given."""
+        def _fetch():
+            cursor = self.collection.find(query, view.PROJECTION if view else None)
+            if sort:
+                cursor = cursor.sort(sort)
+            return list(cursor.skip(skip).limit(limit))
+        tutors = await run_in_db_executor(_fetch)
+        return [view(tutor) for tutor in tutors] if view else tutors
+
+    async def search(self, query: Dict[str, Any], sort_keys: List[str], limit: int,
+                     after=None, before=None, view=None) -> Page:
+        """Get the page of tutors after or before a cursor ``_id``, with the match total."""
+        page = await run_in_db_executor(
+            search_page, self.collection, query, sort_keys, limit,
+            after=after, before=before, projection=view.PROJECTION if view else None
+        )
+        if view:
+            page = page._replace(items=[view(tutor) for tutor in page.items])
+        return page
+
+    async def search_approved(self, filters: Dict[str, str], limit: int, after=None, before=None) -> Page:
+        """Search approved tutors by subject, grade and location, ordered by ``_id``.
+
+        Served from the in-process tutor cache when it is loaded, otherwise
+        from MongoDB.
+        """
+        if settings.tutor_cache_enabled:
+            page = tutor_cache.search(filters, limit, after=after, before=before)
+            if page is not None:
+                return page
+
+        query = {'status': 'approved'}
+        if 'subjects' in filters:
+            query['subjects'] = filters['subjects']
+        if 'grades' in filters:
+            query['grades'] = filters['grades']
+        if 'location' in filters:
+            query.update(location_query(filters['location']))
+        return await self.search(query, ['_id'], limit, after=after, before=before, view=SearchCard)
+
+    async def find_all(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Get every tutor matching a query."""
+        return await run_in_db_executor(lambda: list(self.collection.find(query, projection)))
+
+    async def export_csv(self, query: Optional[Dict[str, Any]] = None, compress: bool = settings.export_gzip):
+        """Stream matching tutors into a spooled CSV file; returns (file or None, row count)."""
+        return await run_in_db_executor(export_csv, self.collection, query, compress)
+
+    async def export_snapshot(self, query: Optional[Dict[str, Any]] = None, fmt: Optional[str] = None):
+        """Build a columnar analytics snapshot of matching tutors; returns (file or None, row count)."""
+        # Imported here so pandas only loads when an admin asks for a snapshot
+        from database.analytics import export_snapshot
+        return await run_in_db_executor(export_snapshot, self.collection, query, fmt)
+
+    async def insert(self, tutor_data: Dict[str, Any]):
+        """Insert a new tutor document."""
+        tutor_data = with_location_key(tutor_data)
+        tutor_data['created_at'] = tutor_data['updated_at'] = datetime.datetime.utcnow()
+        tutor_data['version'] = 1
+        totals_cache.invalidate()
+        result = await run_in_db_executor(self.collection.insert_one, tutor_data)
+        tutor_cache.apply(tutor_data)
+        return result
+
+    async def update_by_telegram_id(self, telegram_id: int, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Set fields on a tutor and return the profile and search-card fields of the result."""
+        update_data = dict(with_location_key(update_data), updated_at=datetime.datetime.utcnow())
+
+        tutor = await run_in_db_executor(
+            self.collection.find_one_and_update,
+            {"telegram_id": telegram_id},
+            {"$set": update_data, "$inc": {"version": 1}},
+            projection=dict(ProfileView.PROJECTION, **SearchCard.PROJECTION),
+            return_document=ReturnDocument.AFTER
+        )
+        if SEARCHABLE_FIELDS.intersection(update_data):
+            totals_cache.invalidate()
+        tutor_cache.apply(tutor)
+        return tutor
+
+    async def set_status(self, tutor_id, status: str) -> Optional[Dict[str, Any]]:
+        """Change a tutor's approval status.
+
+        Returns the updated tutor, or None when the tutor does not exist or
+        already has that status.
+        """
+        tutor = await run_in_db_executor(
+            self.collection.find_one_and_update,
+            {"_id": ObjectId(tutor_id), "status": {"$ne": status}},
+            {"$set": {"status": status, "updated_at": datetime.datetime.utcnow()}, "$inc": {"version": 1}},
+            projection=dict(SearchCard.PROJECTION, telegram_id=1),
+            return_document=ReturnDocument.AFTER
+        )
+        totals_cache.invalidate()
+        tutor_cache.apply(tutor)
+        return tutor
+
+
+class UserRepository:
+    """Async access to the users collection."""
+
+    def __init__(self, collection_getter=get_users_collection):
+        self._collection_getter = collection_getter
+
+    @property
+    def collection(self):
+        """Get the underlying pymongo collection."""
+        return self._collection_getter()
+
+    async def find_all(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Get every user matching a query."""
+        return await run_in_db_executor(lambda: list(self.collection.find(query, projection)))
+
+    async def register(self, chat_id: int, role: Optional[str] = None):
+        """Record that a chat used the bot, keeping its role unless a new one is given."""
+        update = {'$set': {'last_seen': datetime.datetime.utcnow(), 'blocked': False}}
+        if role:
+            update['$set']['role'] = role
+        else:
+            update['$setOnInsert'] = {'role': ROLE_USER}
+        await run_in_db_executor(self.collection.update_one, {'chat_id': chat_id}, update, upsert=True)
+
+    def recipient_chat_ids(self, role: Optional[str] = None) -> Iterator[int]:
+        """Lazily stream the chats a broadcast may reach.
+
+        This is a plain generator over a pymongo cursor; iterate it in the
+        database executor, not on the event loop.
+        """
+        return iter_recipient_chat_ids(self.collection, role)
+
+    async def mark_blocked(self, chat_ids: List[int]):
+        """Flag chats that refused a message so broadcasts skip them."""
+        if chat_ids:
+            await run_in_db_executor(
+                self.collection.update_many, {'chat_id': {'$in': chat_ids}}, {'$set': {'blocked': True}}
+            )
+
+
+class BroadcastJobRepository:
+    """Async access to broadcast jobs and their per-recipient status.
+
+    A job document carries the message, running ``sent``/``failed`` totals
+    and a ``cursor``: every recipient with a ``chat_id`` at or below it has
+    been checkpointed. Recipients live in their own collection so a job
+    with many thousands of chats stays a small document.
+    """
+
+    RECIPIENT_BATCH_SIZE = 1000
+    # Seconds a 'creating' job may go without storing a batch of recipients
+    # before it counts as abandoned by a crash or an error
+    CREATING_TIMEOUT = 300
+
+    def __init__(self, jobs_getter=get_broadcast_jobs_collection,
+                 recipients_getter=get_broadcast_recipients_collection):
+        self._jobs_getter = jobs_getter
+        self._recipients_getter = recipients_getter
+
+    @property
+    def jobs(self):
+        """Get the underlying jobs collection."""
+        return self._jobs_getter()
+
+    @property
+    def recipients(self):
+        """Get the underlying recipients collection."""
+        return self._recipients_getter()
+
+    async def create(self, text: str, chat_ids: Iterable[int], parse_mode: Optional[str] = None,
+                     created_by: Optional[int] = None, role: Optional[str] = None) -> Dict[str, Any]:
+        """Store a new job and one pending status entry per recipient.
+
+        ``chat_ids`` may be a lazy cursor; it is consumed in the database
+        executor one batch at a time. ``updated_at`` moves with every batch
+        so :meth:`fail_abandoned` can tell a slow snapshot from a dead one.
+        """
+        now = datetime.datetime.utcnow()
+        job = {
+            'text': text,
+            'parse_mode': parse_mode,
+            'role': role,
+            # Not resumable until every recipient is stored
+            'status': 'creating',
+            'total': 0,
+            'sent': 0,
+            'failed': 0,
+            'cursor': None,
+            'created_by': created_by,
+            'status_chat_id': None,
+            'status_message_id': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+
+        def _insert_batch(batch):
+            self.recipients.insert_many(
+                [{'job_id': job['_id'], 'chat_id': chat_id, 'status': 'pending'} for chat_id in batch],
+                ordered=False
+            )
+
+        def _insert():
+            job['_id'] = self.jobs.insert_one(job).inserted_id
+            batch = []
+            for chat_id in chat_ids:
+                batch.append(chat_id)
+                if len(batch) == self.RECIPIENT_BATCH_SIZE:
+                    _insert_batch(batch)
+                    job['total'] += len(batch)
+                    batch = []
+                    self.jobs.update_one({'_id': job['_id']}, {'$set': {'updated_at': datetime.datetime.utcnow()}})
+            if batch:
+                _insert_batch(batch)
+                job['total'] += len(batch)
+            result = self.jobs.update_one(
+                {'_id': job['_id'], 'status': 'creating'},
+                {'$set': {'total': job['total'], 'status': 'pending', 'updated_at': datetime.datetime.utcnow()}}
+            )
+            if not result.modified_count:
+                raise RuntimeError(f"Broadcast job {job['_id']} was marked abandoned while its recipients were stored")
+            job['status'] = 'pending'
+            return job
+        return await run_in_db_executor(_insert)
+
+    async def set_status_message(self, job_id, chat_id: int, message_id: int):
+        """Remember the admin message that shows a job's progress."""
+        await run_in_db_executor(
+            self.jobs.update_one,
+            {'_id': ObjectId(job_id)},
+            {'$set': {'status_chat_id': chat_id, 'status_message_id': message_id}}
+        )
+
+    async def find_by_id(self, job_id) -> Optional[Dict[str, Any]]:
+        """Get a job by its ID."""
+        return await run_in_db_executor(self.jobs.find_one, {'_id': ObjectId(job_id)})
+
+    async def find_unfinished(self) -> List[Dict[str, Any]]:
+        """Get the jobs that were pending or running when the bot stopped."""
+        return await run_in_db_executor(
+            lambda: list(self.jobs.find({'status': {'$in': ['pending', 'running']}}).sort('_id', 1))
+        )
+
+    async def fail_abandoned(self) -> List[Any]:
+        """Mark jobs whose recipient snapshot was cut short as failed.
+
+        Such a job has only part of its recipients and was never handed to
+        a sender, so it cannot be resumed; its recipient entries are
+        dropped. Returns the IDs of the jobs marked failed.
+        """
+        def _fail():
+            now = datetime.datetime.utcnow()
+            stale = {'status': 'creating',
+                     'updated_at': {'$lt': now - datetime.timedelta(seconds=self.CREATING_TIMEOUT)}}
+            job_ids = []
+            for job in self.jobs.find(stale, {'_id': 1}):
+                # Matched on the stale filter again, so a snapshot that just finished is left alone
+                result = self.jobs.update_one(
+                    dict(stale, _id=job['_id']),
+                    {'$set': {'status': 'failed', 'updated_at': now, 'finished_at': now}}
+                )
+                if result.modified_count:
+                    self.recipients.delete_many({'job_id': job['_id']})
+                    job_ids.append(job['_id'])
+            return job_ids
+        return await run_in_db_executor(_fail)
+
+    async def recent(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Get the newest jobs without their message text."""
+        return await run_in_db_executor(
+            lambda: list(self.jobs.find({}, {'text': 0}).sort('_id', -1).limit(limit))
+        )
+
+    async def pending_recipients(self, job_id, after: Optional[int] = None, limit: int = 500) -> List[int]:
+        """Get the next chat IDs still waiting for the message, in ``chat_id`` order."""
+        query = {'job_id': ObjectId(job_id), 'status': 'pending'}
+        if after is not None:
+            query['chat_id'] = {'$gt': after}
+
+        def _fetch():
+            cursor = self.recipients.find(query, {'chat_id': 1, '_id': 0}).sort('chat_id', 1).limit(limit)
+            return [doc['chat_id'] for doc in cursor]
+        return await run_in_db_executor(_fetch)
+
+    async def set_status(self, job_id, status: str):
+        """Change a job's status."""
+        now = datetime.datetime.utcnow()
+        update = {'status': status, 'updated_at': now}
+        if status in ('done', 'failed'):
+            update['finished_at'] = now
+        await run_in_db_executor(self.jobs.update_one, {'_id': ObjectId(job_id)}, {'$set': update})
+
+    async def checkpoint(self, job_id, results: List[tuple], cursor: Optional[int] = None):
+        """Record a batch of ``(chat_id, outcome)`` results with one bulk write.
+
+        The outcome is ``'sent'``, ``'failed'`` or ``'blocked'``; blocked
+        chats count as failed in the job totals.
+        """
+        if not results and cursor is None:
+            return
+        job_id = ObjectId(job_id)
+        now = datetime.datetime.utcnow()
+        sent = sum(1 for _, outcome in results if outcome == 'sent')
+        job_update = {
+            '$inc': {'sent': sent, 'failed': len(results) - sent},
+            '$set': {'updated_at': now},
+        }
+        if cursor is not None:
+            job_update['$set']['cursor'] = cursor
+
+        def _write():
+            if results:
+                self.recipients.bulk_write([
+                    UpdateOne(
+                        {'job_id': job_id, 'chat_id': chat_id},
+                        {'$set': {'status': outcome, 'updated_at': now}}
+                    )
+                    for chat_id, outcome in results
+                ], ordered=False)
+            self.jobs.update_one({'_id': job_id}, job_update)
+        await run_in_db_executor(_write)
+
+
+class ExportWatermarkRepository:
+    """Async access to the time of each admin's last tutor export."""
+
+    def __init__(self, collection_getter=get_export_watermarks_collection):
+        self._collection_getter = collection_getter
+
+    @property
+    def collection(self):
+        """Get the underlying pymongo collection."""
+        return self._collection_getter()
+
+    async def get(self, admin_id: int) -> Optional[datetime.datetime]:
+        """Get when an admin last exported, or None if they never did."""
+        watermark = await run_in_db_executor(self.collection.find_one, {'_id': admin_id})
+        return watermark['exported_at'] if watermark else None
+
+    async def set(self, admin_id: int, exported_at: datetime.datetime):
+        """Record an admin's export time."""
+        await run_in_db_executor(
+            self.collection.update_one, {'_id': admin_id}, {'$set': {'exported_at': exported_at}}, upsert=True
+        )
+
+
+tutor_repository = TutorRepository()
+user_repository = UserRepository()
+broadcast_job_repository = BroadcastJobRepository()
+export_watermark_repository = ExportWatermarkRepository()
@@ -0,0 +1,144 @@
+"""Tutor search: keyset pagination with cached match totals."""
+import json
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from config import settings
+
+# Fields whose changes can move a tutor in or out of a search filter
+SEARCHABLE_FIELDS = {'status', 'subjects', 'grades', 'location'}
+
+
+class Page(NamedTuple):
+    """One page of a keyset-paginated query."""
+    items: List[Dict[str, Any]]
+    has_next: bool
+    has_previous: bool
+    total: Optional[int] = None
+
+
+class TotalsCache:
+    """Match counts per normalized search filter.
+
+    Entries are dropped when a tutor write touches a searchable field, and
+    expire after ``ttl`` seconds to pick up writes made by other processes.
+    """
+
+    def __init__(self, ttl: int = settings.search_totals_ttl,
+                 max_entries: int = settings.search_totals_max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, total = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            return total
+
+    def set(self, key: str, total: int):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop the oldest entry; dicts keep insertion order
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (time.monotonic(), total)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+totals_cache = TotalsCache()
+
+
+def normalize_filter(query: Dict[str, Any]) -> str:
+    """Get a stable cache key for a search filter."""
+    return json.dumps(query, sort_keys=True, default=str)
+
+
+def _keyset_condition(sort_keys: List[str], anchor: Dict[str, Any], operator: str) -> Dict[str, Any]:
+    """Build the filter selecting documents strictly after/before an anchor in sort order."""
+    clauses = []
+    for i, key in enumerate(sort_keys):
+        clause = {prev: anchor.get(prev) for prev in sort_keys[:i]}
+        clause[key] = {operator: anchor.get(key)}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {'$or': clauses}
+
+
+def _page_bounds(collection, sort_keys: List[str], after=None, before=None):
+    """Resolve a cursor into (keyset condition, sort direction, anchored).
+
+    The anchor's sort values are read back by ``_id``, so the cursor stays
+    small enough for callback data. When sorting by ``_id`` alone the cursor
+    already is the anchor and no lookup is needed.
+    """
+    anchor_id = after or before
+    if anchor_id is None:
+        return None, ASCENDING, False
+
+    if sort_keys == ['_id']:
+        anchor = {'_id': ObjectId(anchor_id)}
+    else:
+        anchor = collection.find_one({'_id': ObjectId(anchor_id)}, {key: 1 for key in sort_keys})
+        if anchor is None:
+            return None, ASCENDING, False
+
+    condition = _keyset_condition(sort_keys, anchor, '$gt' if after else '$lt')
+    return condition, DESCENDING if before else ASCENDING, True
+
+
+def _to_page(items: List[Dict[str, Any]], limit: int, direction: int, anchored: bool,
+             total: Optional[int] = None) -> Page:
+    """Trim the look-ahead document and work out the navigation flags."""
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    if direction == DESCENDING:
+        items.reverse()
+        return Page(items, has_next=True, has_previous=has_more, total=total)
+    return Page(items, has_next=has_more, has_previous=anchored, total=total)
+
+
+def keyset_page(collection, query: Dict[str, Any], sort_keys: List[str], limit: int,
+                after=None, before=None, projection: Optional[Dict[str, Any]] = None) -> Page:
+    """Fetch a page ordered ascending by ``sort_keys`` (which must end with ``_id``).
+
+    ``after``/``before`` are the ``_id`` of the last/first document of the page
+    the user is coming from, so every page costs one indexed range scan no
+    matter how deep it is.
+    """
+    condition, direction, anchored = _page_bounds(collection, sort_keys, after, before)
+    page_query = {'$and': [query, condition]} if condition else query
+
+    cursor = collection.find(page_query, projection).sort([(key, direction) for key in sort_keys]).limit(limit + 1)
+    return _to_page(list(cursor), limit, direction, anchored)
+
+
+def search_page(collection, query: Dict[str, Any], sort_keys: List[str], limit: int,
+                after=None, before=None, projection: Optional[Dict[str, Any]] = None) -> Page:
+    """Fetch a keyset page together with the total number of matches.
+
+    The page is always an index-backed :func:`keyset_page` range scan. On a
+    totals cache miss the total is counted separately; inside a ``$facet``
+    the keyset ``$match`` and ``$sort`` could not use an index, so every
+    miss would sort the whole match set in memory.
+    """
+    page = keyset_page(collection, query, sort_keys, limit, after=after, before=before, projection=projection)
+
+    cache_key = normalize_filter(query)
+    total = totals_cache.get(cache_key)
+    if total is None:
+        total = collection.count_documents(query)
+        totals_cache.set(cache_key, total)
+    return page._replace(total=total)
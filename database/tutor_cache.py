@@ -0,0 +1,251 @@
+"""In-process cache of approved tutors for the student search.
+
+The cache holds compact ``SearchCard`` records for every approved tutor and
+answers ``show_tutors`` searches through a bitmap index without a database
+round trip. It is kept current by the repository's own writes and by a
+background thread that follows a change stream, or polls ``updated_at`` when
+the server does not support change streams (standalone mongod). Polling
+cannot see deletes, so each poll also drops cached tutors that are no
+longer approved.
+
+When there are more approved tutors than ``max_entries`` the cache stays
+out of the way: searches go to MongoDB, a single warning is logged, and
+the thread only counts the approved tutors every poll interval until
+they fit again, instead of reloading.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from bson.objectid import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+from config import settings
+from database.location import MAX_QUERY_TOKENS, location_tokens
+from database.search import Page
+from database.tutor_index import TutorBitmapIndex
+from database.views import SearchCard
+
+logger = logging.getLogger(__name__)
+
+# The cache holds as many tutors as fit in TUTOR_CACHE_MEMORY_MB unless
+# TUTOR_CACHE_MAX_ENTRIES sets the count directly. benchmarks/tutor_index.py
+# measures about 0.9 KB per tutor for its record, its strings and its index
+# slots; the default 256 MB holds about 260k tutors.
+TUTOR_CACHE_BYTES_PER_ENTRY = 1024
+TUTOR_CACHE_MAX_ENTRIES = (settings.tutor_cache_max_entries
+                           or settings.tutor_cache_memory_mb * 1024 * 1024 // TUTOR_CACHE_BYTES_PER_ENTRY)
+
+class ApprovedTutorCache:
+    """Read-through cache of approved tutors with hit/miss counters.
+
+    Records are kept in least-recently-served order. When the approved set
+    grows past ``max_entries`` the oldest records are evicted and the cache
+    reports every search as a miss until a reload fits again.
+    """
+
+    def __init__(self, max_entries: int = TUTOR_CACHE_MAX_ENTRIES,
+                 poll_interval: float = settings.tutor_cache_poll_interval):
+        self.max_entries = max_entries
+        self.poll_interval = poll_interval
+        self._records: "OrderedDict[ObjectId, SearchCard]" = OrderedDict()
+        self._index = TutorBitmapIndex()
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.ready = False
+        self.complete = False
+        self.mode = 'stopped'
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._watermark = None
+        self._over_capacity = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the cache counters."""
+        with self._lock:
+            return {
+                'size': len(self._records),
+                'max_entries': self.max_entries,
+                'ready': self.ready,
+                'complete': self.complete,
+                'mode': self.mode,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    # -- updates -----------------------------------------------------------
+
+    def load(self, collection):
+        """Replace the cache contents with every approved tutor."""
+        query = {'status': 'approved'}
+        documents = list(collection.find(query, SearchCard.PROJECTION).sort('_id', 1).limit(self.max_entries + 1))
+        complete = len(documents) <= self.max_entries
+
+        with self._lock:
+            self._records = OrderedDict((doc['_id'], SearchCard(doc)) for doc in documents[:self.max_entries])
+            self._index.rebuild(self._records.values())
+            self.complete = complete
+            self.ready = True
+            stamps = [doc['updated_at'] for doc in documents if doc.get('updated_at')]
+            if stamps:
+                self._watermark = max(stamps)
+
+        if not complete and not self._over_capacity:
+            logger.warning(f"More than {self.max_entries} approved tutors; searches will use the database "
+                           "until they fit in the cache again (TUTOR_CACHE_MEMORY_MB)")
+        self._over_capacity = not complete
+
+    def apply(self, document: Optional[Dict[str, Any]]):
+        """Add, replace or drop one tutor after it was written."""
+        if not document or '_id' not in document:
+            return
+        if document.get('status') == 'approved':
+            self._put(SearchCard(document))
+        else:
+            self.discard(document['_id'])
+
+    def discard(self, tutor_id):
+        """Drop a tutor from the cache."""
+        tutor_id = ObjectId(tutor_id)
+        with self._lock:
+            if self._records.pop(tutor_id, None) is not None:
+                self._index.remove(tutor_id)
+
+    def _put(self, record: SearchCard):
+        with self._lock:
+            self._records[record._id] = record
+            self._records.move_to_end(record._id)
+            self._index.add(record)
+            while len(self._records) > self.max_entries:
+                evicted_id, _ = self._records.popitem(last=False)
+                self._index.remove(evicted_id)
+                self.evictions += 1
+                self.complete = False
+            if record.updated_at and (self._watermark is None or record.updated_at > self._watermark):
+                self._watermark = record.updated_at
+
+    def invalidate_index(self, *_):
+        """Rebuild the search index before the next query, e.g. after a catalog change."""
+        with self._lock:
+            self._index.needs_rebuild = True
+
+    # -- reads -------------------------------------------------------------
+
+    def search(self, filters: Dict[str, str], limit: int, after=None, before=None) -> Optional[Page]:
+        """Get a page of approved tutors ordered by ``_id``, or None on a miss."""
+        with self._lock:
+            if not (self.ready and self.complete):
+                self.misses += 1
+                return None
+            self.hits += 1
+
+            if self._index.needs_rebuild:
+                self._index.rebuild(self._records.values())
+
+            query_tokens = location_tokens(filters['location'])[:MAX_QUERY_TOKENS] if 'location' in filters else []
+            bits = self._index.match(filters, query_tokens)
+            page_ids, has_next, has_previous, total = self._index.page(bits, limit, after=after, before=before)
+
+            items = []
+            for tutor_id in page_ids:
+                self._records.move_to_end(tutor_id)
+                items.append(self._records[tutor_id])
+            return Page(items, has_next=has_next, has_previous=has_previous, total=total)
+
+    # -- background refresh ------------------------------------------------
+
+    def start(self, collection_getter):
+        """Load the cache and follow changes in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(collection_getter,), name='tutor-cache', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the background refresh and wait for its thread to finish."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        self.mode = 'stopped'
+
+    def _run(self, collection_getter):
+        while not self._stop.is_set():
+            try:
+                collection = collection_getter()
+                if self._over_capacity and not self._fits(collection):
+                    self._stop.wait(self.poll_interval)
+                    continue
+                try:
+                    # Opened before the load so writes made while it runs are replayed
+                    # afterwards; applying a change the load already saw is harmless
+                    stream = collection.watch(full_document='updateLookup', max_await_time_ms=1000)
+                except OperationFailure as e:
+                    # Change streams need a replica set; fall back to polling
+                    logger.info(f"Tutor cache change stream unavailable ({e}); polling updated_at")
+                    self.load(collection)
+                    self._poll(collection)
+                else:
+                    with stream:
+                        self.load(collection)
+                        self._watch(stream)
+            except PyMongoError as e:
+                logger.error(f"Tutor cache refresh failed: {e}")
+                self._stop.wait(self.poll_interval)
+            except Exception as e:
+                # Keep the thread alive; a dead one would leave the cache serving stale tutors
+                logger.error(f"Tutor cache refresh failed: {e}", exc_info=True)
+                with self._lock:
+                    self.ready = False
+                self._stop.wait(self.poll_interval)
+
+    def _fits(self, collection) -> bool:
+        """Whether the approved tutors fit in the cache again; counted on the status index."""
+        return collection.count_documents({'status': 'approved'}, limit=self.max_entries + 1) <= self.max_entries
+
+    def _watch(self, stream):
+        self.mode = 'change_stream'
+        while not self._stop.is_set():
+            change = stream.try_next()
+            if change is None:
+                if not self.complete:
+                    return
+                continue
+            if change['operationType'] == 'delete':
+                self.discard(change['documentKey']['_id'])
+            elif change.get('fullDocument') is not None:
+                self.apply(change['fullDocument'])
+
+    def _poll(self, collection):
+        self.mode = 'poll'
+        while not self._stop.wait(self.poll_interval):
+            if not self.complete:
+                return
+            if self._watermark is None:
+                query = {'updated_at': {'$exists': True}}
+            else:
+                # $gte so writes sharing the watermark's millisecond are not missed
+                query = {'updated_at': {'$gte': self._watermark}}
+            for document in collection.find(query, SearchCard.PROJECTION).sort('updated_at', 1):
+                self.apply(document)
+                with self._lock:
+                    self._watermark = document['updated_at']
+            self._drop_deleted(collection)
+
+    def _drop_deleted(self, collection):
+        """Drop cached tutors that were deleted; ``updated_at`` polling never sees them."""
+        with self._lock:
+            cached = set(self._records)
+        # Only ids cached before the scan, so a tutor added while it runs is kept
+        approved = {doc['_id'] for doc in collection.find({'status': 'approved'}, {'_id': 1})}
+        for tutor_id in cached - approved:
+            self.discard(tutor_id)
+
+tutor_cache = ApprovedTutorCache()
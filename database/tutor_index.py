@@ -0,0 +1,184 @@
+"""Bitmap index over the cached approved tutors.
+
+Every tutor gets a slot, and slots are assigned in ``_id`` order. Each
+subject, grade range and location token maps to a Python int whose set bits
+are the slots of the tutors carrying it, so a combined filter such as
+"Physics + 9-10 + Bole" is a bitwise AND of three ints, and walking the set
+bits from low to high yields the matches already sorted by ``_id``.
+"""
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+
+
+def _popcount(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+class TutorBitmapIndex:
+    """Subject, grade and location-token bitsets over tutor slots."""
+
+    def __init__(self):
+        self._slot_ids: List[ObjectId] = []
+        self._slots: Dict[ObjectId, int] = {}
+        self._keys: Dict[ObjectId, Tuple[tuple, Optional[str], tuple]] = {}
+        self._alive = 0
+        self._subjects: Dict[str, int] = {}
+        self._grades: Dict[str, int] = {}
+        self._tokens: Dict[str, int] = {}
+        self._sorted_tokens: List[str] = []
+        self.needs_rebuild = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    # -- updates -----------------------------------------------------------
+
+    def rebuild(self, records):
+        """Reindex every record from scratch in ``_id`` order.
+
+        Bits are collected in byte buffers and converted to ints once per key;
+        OR-ing them into growing ints one record at a time is quadratic.
+        """
+        self.__init__()
+        records = sorted(records, key=lambda r: r._id)
+        size = (len(records) + 7) // 8
+        alive = bytearray(size)
+        buffers = {'subjects': {}, 'grades': {}, 'tokens': {}}
+
+        def mark(table, key, slot):
+            buffer = buffers[table].get(key)
+            if buffer is None:
+                buffer = buffers[table][key] = bytearray(size)
+            buffer[slot >> 3] |= 1 << (slot & 7)
+
+        for slot, record in enumerate(records):
+            keys = (tuple(record.subjects), record.grades, tuple(record.location_key))
+            self._slot_ids.append(record._id)
+            self._slots[record._id] = slot
+            self._keys[record._id] = keys
+            alive[slot >> 3] |= 1 << (slot & 7)
+            for subject in keys[0]:
+                mark('subjects', subject, slot)
+            if keys[1] is not None:
+                mark('grades', keys[1], slot)
+            for token in keys[2]:
+                mark('tokens', token, slot)
+
+        self._alive = int.from_bytes(alive, 'little')
+        self._subjects = {key: int.from_bytes(buf, 'little') for key, buf in buffers['subjects'].items()}
+        self._grades = {key: int.from_bytes(buf, 'little') for key, buf in buffers['grades'].items()}
+        self._tokens = {key: int.from_bytes(buf, 'little') for key, buf in buffers['tokens'].items()}
+        self._sorted_tokens = sorted(self._tokens)
+
+    def add(self, record):
+        """Index a new record, or reindex an edited one in its existing slot."""
+        tutor_id = record._id
+        if tutor_id in self._keys:
+            self._unset(tutor_id)
+        slot = self._slots.get(tutor_id)
+        if slot is None:
+            if self._slot_ids and tutor_id < self._slot_ids[-1]:
+                # Slots must stay in _id order; reindex before the next query
+                self.needs_rebuild = True
+            slot = len(self._slot_ids)
+            self._slot_ids.append(tutor_id)
+            self._slots[tutor_id] = slot
+
+        bit = 1 << slot
+        keys = (tuple(record.subjects), record.grades, tuple(record.location_key))
+        self._keys[tutor_id] = keys
+        self._alive |= bit
+        for subject in keys[0]:
+            self._subjects[subject] = self._subjects.get(subject, 0) | bit
+        if keys[1] is not None:
+            self._grades[keys[1]] = self._grades.get(keys[1], 0) | bit
+        for token in keys[2]:
+            if token not in self._tokens:
+                bisect.insort(self._sorted_tokens, token)
+            self._tokens[token] = self._tokens.get(token, 0) | bit
+
+    def remove(self, tutor_id):
+        """Drop a record; its slot is reused only after the next rebuild."""
+        if tutor_id in self._keys:
+            self._unset(tutor_id)
+            if len(self._slot_ids) > 2 * max(len(self._keys), 1):
+                self.needs_rebuild = True
+
+    def _unset(self, tutor_id):
+        bit = 1 << self._slots[tutor_id]
+        subjects, grade, tokens = self._keys.pop(tutor_id)
+        self._alive &= ~bit
+        for subject in subjects:
+            self._clear(self._subjects, subject, bit)
+        if grade is not None:
+            self._clear(self._grades, grade, bit)
+        for token in tokens:
+            if self._clear(self._tokens, token, bit):
+                del self._sorted_tokens[bisect.bisect_left(self._sorted_tokens, token)]
+
+    @staticmethod
+    def _clear(table: Dict[str, int], key: str, bit: int) -> bool:
+        """Clear a bit and report whether the key has no tutors left."""
+        remaining = table.get(key, 0) & ~bit
+        if remaining:
+            table[key] = remaining
+            return False
+        table.pop(key, None)
+        return True
+
+    # -- queries -----------------------------------------------------------
+
+    def _prefix_bits(self, prefix: str) -> int:
+        """OR together the bitsets of every token starting with ``prefix``."""
+        bits = 0
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            bits |= self._tokens[token]
+        return bits
+
+    def match(self, filters: Dict[str, str], query_tokens: List[str]) -> int:
+        """Get the bitset of tutors matching every filter."""
+        bits = self._alive
+        if 'subjects' in filters:
+            bits &= self._subjects.get(filters['subjects'], 0)
+        if 'grades' in filters:
+            bits &= self._grades.get(filters['grades'], 0)
+        if 'location' in filters:
+            if not query_tokens:
+                return 0
+            for token in query_tokens:
+                if not bits:
+                    break
+                bits &= self._prefix_bits(token)
+        return bits
+
+    def page(self, bits: int, limit: int, after=None, before=None) -> Tuple[List[ObjectId], bool, bool, int]:
+        """Get (ids, has_next, has_previous, total) for one page of a match bitset."""
+        total = _popcount(bits)
+        ids = []
+
+        if before is not None:
+            end = bisect.bisect_left(self._slot_ids, ObjectId(before))
+            remaining = bits & ((1 << end) - 1)
+            while remaining and len(ids) <= limit:
+                slot = remaining.bit_length() - 1
+                ids.append(self._slot_ids[slot])
+                remaining ^= 1 << slot
+            has_previous = len(ids) > limit
+            ids = ids[:limit]
+            ids.reverse()
+            return ids, (bits >> end) != 0, has_previous, total
+
+        start = bisect.bisect_right(self._slot_ids, ObjectId(after)) if after is not None else 0
+        remaining = bits >> start
+        while remaining and len(ids) <= limit:
+            lowest = remaining & -remaining
+            slot = lowest.bit_length() - 1
+            ids.append(self._slot_ids[start + slot])
+            remaining ^= lowest
+        has_next = len(ids) > limit
+        return ids[:limit], has_next, (bits & ((1 << start) - 1)) != 0, total
@@ -0,0 +1,97 @@
+"""Per-view tutor projections and the lightweight records they load into.
+
+Each view lists only the fields its screen shows, so listings never pull a
+whole tutor document (and never the full, unbounded ``bio``) off the wire.
+Every view carries ``version`` so its rendered card can be cached.
+"""
+from typing import Any, Dict
+
+from database.location import location_tokens
+
+# Admin list rows show at most this much of a tutor's bio
+BIO_PREVIEW_LENGTH = 100
+
+
+class TutorRecord:
+    """Base for per-view tutor records.
+
+    Subclasses list their fields in ``__slots__``; ``PROJECTION`` is the
+    matching MongoDB projection. Records answer ``get()``, ``[]`` and ``in``
+    the way the handlers already read tutor documents.
+    """
+    __slots__ = ()
+    PROJECTION: Dict[str, Any] = {}
+
+    def __init__(self, document: Dict[str, Any]):
+        for field in self.__slots__:
+            setattr(self, field, document.get(field))
+
+    @classmethod
+    def from_document(cls, document):
+        return cls(document) if document is not None else None
+
+    def get(self, field: str, default=None):
+        value = getattr(self, field, None) if field in self.__slots__ else None
+        return default if value is None else value
+
+    def __getitem__(self, field: str):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.__slots__ and getattr(self, field) is not None
+
+    def __getstate__(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __setstate__(self, state):
+        for field in self.__slots__:
+            setattr(self, field, state.get(field))
+
+
+def _projection(fields, **expressions) -> Dict[str, Any]:
+    projection = {field: 1 for field in fields if field != '_id'}
+    projection.update(expressions)
+    return projection
+
+
+class SearchCard(TutorRecord):
+    """Tutor card shown to parents in search results (and held by the tutor cache)."""
+    __slots__ = ('_id', 'name', 'university', 'subjects', 'grades', 'location',
+                 'location_key', 'profile_photo', 'registration_date', 'updated_at', 'version')
+    # status is read to decide cache membership but not kept on the record
+    PROJECTION = _projection(__slots__, status=1)
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        if self.location_key is None:
+            self.location_key = location_tokens(self.location)
+        if self.subjects is None:
+            self.subjects = []
+
+
+class AdminListRow(TutorRecord):
+    """Row of the admin "All Tutors" listing."""
+    __slots__ = ('_id', 'name', 'is_active', 'university', 'department', 'subjects', 'grades',
+                 'location', 'contact', 'registration_date', 'rating', 'reviews_count', 'bio', 'version')
+    # One character past the preview so the listing still knows to add "..."
+    PROJECTION = _projection(__slots__, bio={'$cond': [
+        {'$ifNull': ['$bio', False]},
+        {'$substrCP': ['$bio', 0, BIO_PREVIEW_LENGTH + 1]},
+        '$$REMOVE'
+    ]})
+
+
+class ApprovalCard(TutorRecord):
+    """Pending application shown to admins for approval."""
+    __slots__ = ('_id', 'name', 'university', 'department', 'subjects', 'grades',
+                 'location', 'contact', 'registration_date', 'profile_photo', 'version')
+    PROJECTION = _projection(__slots__)
+
+
+class ProfileView(TutorRecord):
+    """A tutor's own profile, as shown by /myprofile and after updates."""
+    __slots__ = ('_id', 'name', 'university', 'department', 'year', 'subjects', 'grades',
+                 'method', 'location', 'contact', 'status', 'profile_photo', 'version')
+    PROJECTION = _projection(__slots__)
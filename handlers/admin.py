@@ -1,14 +1,9 @@
 import datetime
 import logging
-import os
-import csv
-from io import StringIO
-from typing import List
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ContextTypes, 
-    CallbackQueryHandler, 
     CommandHandler, 
     MessageHandler, 
     filters,
@@ -17,7 +12,19 @@ from telegram.ext import (
 from telegram.constants import ParseMode
 from bson.objectid import ObjectId
 
-from database.db import get_tutors_collection, get_users_collection
+from config import settings
+from database.db import db_manager
+from database.export import changed_since_query
+from database.recipients import ROLE_TUTOR, ROLE_USER
+from database.repository import (
+    broadcast_job_repository, export_watermark_repository, tutor_repository, user_repository
+)
+from database.views import AdminListRow, ApprovalCard
+from messaging.broadcast import BroadcastProgress
+from messaging.cards import ADMIN_DETAIL_CARD, ADMIN_ROW_CARD, APPROVAL_CARD, card_renderer
+from messaging.jobs import BroadcastJobRunner
+from messaging.scheduler import outbound_scheduler
+from routing import CallbackRouter, callback_data
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +33,7 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     query = update.callback_query
     
     # Check if user is admin
-    if str(update.effective_user.id) not in os.getenv('ADMIN_IDS', '').split(','):
+    if not settings.is_admin(update.effective_user.id):
         if query:
             await query.answer("❌ You don't have permission to access this.", show_alert=True)
         else:
@@ -37,23 +44,35 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         await query.answer()
     
     # Get pending tutor applications count
-    tutors = get_tutors_collection()
-    pending_count = tutors.count_documents({"status": "pending"})
-    total_tutors = tutors.count_documents({})
+    pending_count = await tutor_repository.count({"status": "pending"})
+    total_tutors = await tutor_repository.count({})
     
     keyboard = [
-        [InlineKeyboardButton(f"👥 Pending Approvals ({pending_count})", callback_data='pending_approvals')],
-        [InlineKeyboardButton("📋 All Tutors", callback_data='all_tutors')],
-        [InlineKeyboardButton("📤 Export Data", callback_data='export_data')],
-        [InlineKeyboardButton("📢 Broadcast", callback_data='broadcast')]
+        [InlineKeyboardButton(f"👥 Pending Approvals ({pending_count})", callback_data=callback_data('adm', 'pending'))],
+        [InlineKeyboardButton("📋 All Tutors", callback_data=callback_data('adm', 'tutors'))],
+        [
+            InlineKeyboardButton("📤 Export Data", callback_data=callback_data('adm', 'export', 'all')),
+            InlineKeyboardButton("🆕 Export Changes", callback_data=callback_data('adm', 'export', 'changes'))
+        ],
+        [InlineKeyboardButton("📈 Analytics Snapshot", callback_data=callback_data('adm', 'snapshot'))],
+        [InlineKeyboardButton("📢 Broadcast", callback_data=callback_data('adm', 'broadcast'))],
+        [InlineKeyboardButton("📬 Broadcast Jobs", callback_data=callback_data('adm', 'jobs'))]
     ]
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
+    outbound = outbound_scheduler.stats()
+    pool = db_manager.pool_stats()
+    
     text = (
         f"👨‍💼 *Admin Panel*\n\n"
         f"• Pending Approvals: `{pending_count}`\n"
-        f"• Total Tutors: `{total_tutors}`\n\n"
+        f"• Total Tutors: `{total_tutors}`\n"
+        f"• Outbound Queue: `{outbound['interactive_queued'] + outbound['bulk_queued']}` "
+        f"(p95 wait `{outbound['interactive_wait_p95_ms']}ms`)\n"
+        f"• DB Connections: `{pool['checked_out']}/{settings.mongo_max_pool_size}` in use "
+        f"(p99 wait `{pool['wait_p99_ms']:.0f}ms`, `{pool['checkout_failures']}` failed, "
+        f"`{pool['reconnects']}` reconnects)\n\n"
         "Select an option below:"
     )
     
@@ -81,13 +100,15 @@ async def pending_approvals(update: Update, context: ContextTypes.DEFAULT_TYPE)
             query = update.callback_query
             await query.answer()
         
-        tutors = get_tutors_collection()
-        pending_tutors = list(tutors.find({"status": "pending"}).sort("_id", -1).limit(10))
+        # Only the newest application is shown at a time
+        pending_tutors = await tutor_repository.find_page(
+            {"status": "pending"}, limit=1, sort=[("_id", -1)], view=ApprovalCard
+        )
         
         if not pending_tutors:
             message = "✅ No pending tutor applications at the moment."
             reply_markup = InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data='admin')]
+                [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data=callback_data('adm', 'panel'))]
             ])
             
             if update.callback_query:
@@ -104,38 +125,20 @@ async def pending_approvals(update: Update, context: ContextTypes.DEFAULT_TYPE)
         if not ObjectId.is_valid(tutor_id):
             raise ValueError("Invalid tutor ID format")
     
-        # Prepare tutor info
-        tutor_info = (
-            f"👤 *{tutor.get('name', 'N/A')}*\n"
-            f"🏫 {tutor.get('university', 'N/A')} - {tutor.get('department', 'N/A')}\n"
-            f"📚 *Subjects:* {', '.join(tutor.get('subjects', []))}\n"
-            f"🎓 *Grades:* {tutor.get('grades', 'N/A')}\n"
-            f"📍 *Location:* {tutor.get('location', 'N/A')}\n"
-            f"📞 *Contact:* {tutor.get('contact', 'N/A')}\n"
-            f"📅 *Registered:* {tutor.get('registration_date', 'N/A')}"
-        )
+        card = card_renderer.render(tutor, APPROVAL_CARD)
+        message_text = card.text
+        reply_markup = card.reply_markup
         
         # Get profile photo if available
         profile_photo = tutor.get('profile_photo')
         
-        # Create approve/reject buttons
-        keyboard = [
-            [
-                InlineKeyboardButton("✅ Approve", callback_data=f"approve_{tutor_id}"),
-                InlineKeyboardButton("❌ Reject", callback_data=f"reject_{tutor_id}")
-            ],
-            [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data='admin')]
-        ]
-        
-        message_text = f"📝 *Tutor Application*\n\n{tutor_info}"
-        
         if update.callback_query:
             if profile_photo:
                 try:
                     await query.message.reply_photo(
                         photo=profile_photo,
                         caption=message_text,
-                        reply_markup=InlineKeyboardMarkup(keyboard),
+                        reply_markup=reply_markup,
                         parse_mode='Markdown'
                     )
                     await query.message.delete()
@@ -143,13 +146,13 @@ async def pending_approvals(update: Update, context: ContextTypes.DEFAULT_TYPE)
                     logger.error(f"Error sending photo: {e}")
                     await query.edit_message_text(
                         f"{message_text}\n\n⚠️ Could not load profile photo",
-                        reply_markup=InlineKeyboardMarkup(keyboard),
+                        reply_markup=reply_markup,
                         parse_mode='Markdown'
                     )
             else:
                 await query.edit_message_text(
                     message_text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    reply_markup=reply_markup,
                     parse_mode='Markdown'
                 )
         else:
@@ -158,20 +161,20 @@ async def pending_approvals(update: Update, context: ContextTypes.DEFAULT_TYPE)
                     await update.message.reply_photo(
                         photo=profile_photo,
                         caption=message_text,
-                        reply_markup=InlineKeyboardMarkup(keyboard),
+                        reply_markup=reply_markup,
                         parse_mode='Markdown'
                     )
                 except Exception as e:
                     logger.error(f"Error sending photo: {e}")
                     await update.message.reply_text(
                         f"{message_text}\n\n⚠️ Could not load profile photo",
-                        reply_markup=InlineKeyboardMarkup(keyboard),
+                        reply_markup=reply_markup,
                         parse_mode='Markdown'
                     )
             else:
                 await update.message.reply_text(
                     message_text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    reply_markup=reply_markup,
                     parse_mode='Markdown'
                 )
     except Exception as e:
@@ -187,9 +190,8 @@ async def handle_approval(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     query = update.callback_query
     await query.answer()
     
-    # Get the action and tutor ID from the callback data
-    action, tutor_id = query.data.split('_', 1)
-    tutors = get_tutors_collection()
+    # Callback data is "adm:review:<approve|reject>:<tutor _id>"
+    action, tutor_id = context.args
     
     # Update tutor status
     status = "approved" if action == "approve" else "rejected"
@@ -197,18 +199,12 @@ async def handle_approval(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Convert string ID to ObjectId for MongoDB
     try:
         # Update the tutor status
-        result = tutors.update_one(
-            {"_id": ObjectId(tutor_id)}, 
-            {"$set": {"status": status}}
-        )
+        tutor = await tutor_repository.set_status(tutor_id, status)
         
-        if result.modified_count == 0:
+        if tutor is None:
             await query.edit_message_text("❌ Failed to update tutor status. Please try again.")
             return
         
-        # Get the updated tutor document
-        tutor = tutors.find_one({"_id": ObjectId(tutor_id)})
-        
         # Notify the tutor
         if tutor and 'telegram_id' in tutor:
             try:
@@ -244,64 +240,52 @@ async def handle_approval(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.edit_message_text("❌ An error occurred. Please try again.")
 
 async def all_tutors(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Show all approved tutors with pagination."""
+    """Show all approved tutors with keyset pagination ordered by name."""
     query = update.callback_query
     if query:
         await query.answer()
     
-    tutors = get_tutors_collection()
-    page = int(context.user_data.get('tutors_page', 0))
+    # Pagination callbacks look like "adm:tutors:next:<page>:<last _id>" or "adm:tutors:prev:<page>:<first _id>"
+    page, after, before = 0, None, None
+    if query and context.args:
+        direction, page_str, cursor = context.args
+        page = int(page_str)
+        if direction == 'next':
+            after = cursor
+        else:
+            before = cursor
     per_page = 5
-    skip = page * per_page
     
     # Get total count and paginated tutors with more fields
-    total_tutors = tutors.count_documents({"status": "approved"})
-    tutor_list = list(tutors.find({"status": "approved"})
-                     .skip(skip)
-                     .limit(per_page)
-                     .sort("name", 1))
+    result = await tutor_repository.search(
+        {"status": "approved"}, ['name', '_id'], per_page, after=after, before=before, view=AdminListRow
+    )
+    total_tutors = result.total
+    tutor_list = result.items
     
     if not tutor_list and page == 0:
         message = "No tutors found in the system."
-        keyboard = [[InlineKeyboardButton("🔙 Back to Admin Panel", callback_data='admin')]]
+        keyboard = [[InlineKeyboardButton("🔙 Back to Admin Panel", callback_data=callback_data('adm', 'panel'))]]
     else:
         message = f"📋 *All Tutors* (Page {page + 1}/{(total_tutors + per_page - 1) // per_page or 1})\n\n"
         
-        for i, tutor in enumerate(tutor_list, 1):
-            # Format tutor details
-            tutor_details = (
-                f"👤 *{tutor.get('name', 'N/A')}* "
-                f"({'✅ Active' if tutor.get('is_active', True) else '❌ Inactive'})\n"
-                f"🏫 *University:* {tutor.get('university', 'N/A')} - {tutor.get('department', 'N/A')}\n"
-                f"📚 *Subjects:* {', '.join(tutor.get('subjects', ['N/A']))}\n"
-                f"🎓 *Levels:* {tutor.get('grades', 'N/A')}\n"
-                f"📍 *Location:* {tutor.get('location', 'N/A')}\n"
-                f"📞 *Contact:* {tutor.get('contact', 'N/A')}\n"
-                f"📅 *Member since:* {tutor.get('registration_date', 'N/A')}\n"
-                f"⭐ *Rating:* {tutor.get('rating', 'N/A')} ({tutor.get('reviews_count', 0)} reviews)\n"
-                f"💬 *Bio:* {tutor.get('bio', 'No bio provided')[:100]}{'...' if len(tutor.get('bio', '')) > 100 else ''}\n"
-                f"🔗 *Profile ID:* `{str(tutor.get('_id', 'N/A'))}`\n"
-                "─────────────────────\n\n"
-            )
-            message += tutor_details
-        
-        # Create action buttons for each tutor
+        # Each row's text and view button come from the card cache
         keyboard = []
         for tutor in tutor_list:
-            tutor_id = str(tutor.get('_id'))
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"👤 {tutor.get('name', 'Tutor')}", 
-                    callback_data=f'view_tutor_{tutor_id}'
-                )
-            ])
+            card = card_renderer.render(tutor, ADMIN_ROW_CARD)
+            message += card.text
+            keyboard.extend(card.reply_markup.inline_keyboard)
         
         # Add pagination controls
         pagination_row = []
-        if page > 0:
-            pagination_row.append(InlineKeyboardButton("⬅️ Previous", callback_data=f'tutors_page_{page-1}'))
-        if (page + 1) * per_page < total_tutors:
-            pagination_row.append(InlineKeyboardButton("Next ➡️", callback_data=f'tutors_page_{page+1}'))
+        if tutor_list and result.has_previous:
+            pagination_row.append(InlineKeyboardButton(
+                "⬅️ Previous", callback_data=callback_data('adm', 'tutors', 'prev', max(page - 1, 0), tutor_list[0]['_id'])
+            ))
+        if tutor_list and result.has_next:
+            pagination_row.append(InlineKeyboardButton(
+                "Next ➡️", callback_data=callback_data('adm', 'tutors', 'next', page + 1, tutor_list[-1]['_id'])
+            ))
         
         if pagination_row:
             keyboard.append(pagination_row)
@@ -309,10 +293,10 @@ async def all_tutors(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         # Add admin actions and navigation
         keyboard.extend([
             [
-                InlineKeyboardButton("📤 Export All Data", callback_data='export_data'),
-                InlineKeyboardButton("📢 Broadcast", callback_data='broadcast')
+                InlineKeyboardButton("📤 Export All Data", callback_data=callback_data('adm', 'export', 'all')),
+                InlineKeyboardButton("📢 Broadcast", callback_data=callback_data('adm', 'broadcast'))
             ],
-            [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data='admin')]
+            [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data=callback_data('adm', 'panel'))]
         ])
     
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -335,82 +319,155 @@ async def all_tutors(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
             await update.message.reply_text("An error occurred. Here are the tutors:" + message, reply_markup=reply_markup, parse_mode='Markdown')
 
 async def export_data(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Export tutor data to a CSV file."""
+    """Export tutor data to a CSV file, either everything or only the changes since the admin's last export."""
     query = update.callback_query
     if query:
         await query.answer("Preparing data export...")
     
-    tutors = get_tutors_collection()
-    tutor_list = list(tutors.find({}, {'_id': 0, 'profile_photo': 0, 'telegram_id': 0}))
-    
-    if not tutor_list:
-        message = "No tutor data available to export."
-        reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Admin Panel", callback_data='admin')]])
-        if query:
-            await query.edit_message_text(message, reply_markup=reply_markup)
+    changes_only = bool(query and context.args == ['changes'])
+    # An export reads every tutor; run it outside the update so the admin's
+    # chat keeps answering while it is built
+    context.application.create_task(send_export(update, changes_only), update=update)
+
+async def send_export(update: Update, changes_only: bool) -> None:
+    """Build the CSV export and send it to the admin who asked for it."""
+    query = update.callback_query
+    target = query.message if query else update.message
+    back_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Admin Panel", callback_data=callback_data('adm', 'panel'))]])
+    admin_id = update.effective_user.id
+    try:
+        since = await export_watermark_repository.get(admin_id) if changes_only else None
+        
+        # Taken before reading, so changes made during the export land in the next one
+        started_at = datetime.datetime.utcnow()
+        export_file, rows = await tutor_repository.export_csv(changed_since_query(since))
+        
+        if export_file is None:
+            await export_watermark_repository.set(admin_id, started_at)
+            if since is not None:
+                message = f"No tutor changes since your last export ({since.strftime('%Y-%m-%d %H:%M')} UTC)."
+            else:
+                message = "No tutor data available to export."
+            if query:
+                await query.edit_message_text(message, reply_markup=back_markup)
+            else:
+                await update.message.reply_text(message, reply_markup=back_markup)
+            return
+        
+        prefix = "tutors_changes" if since is not None else "tutors_export"
+        filename = f"{prefix}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        if settings.export_gzip:
+            filename += '.gz'
+        
+        if since is not None:
+            caption = f"📊 Tutors changed since {since.strftime('%Y-%m-%d %H:%M')} UTC ({rows} tutors)."
         else:
-            await update.message.reply_text(message, reply_markup=reply_markup)
-        return
-    
-    # Create CSV content
-    import csv
-    from io import StringIO
-    
-    output = StringIO()
-    writer = csv.DictWriter(output, fieldnames=tutor_list[0].keys())
-    writer.writeheader()
-    writer.writerows(tutor_list)
-    
-    # Send the file
-    output.seek(0)
-    filename = f"tutors_export_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    
-    if query:
-        await query.message.reply_document(
-            document=output.getvalue().encode('utf-8'),
-            filename=filename,
-            caption="📊 Here's the exported tutor data.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Admin Panel", callback_data='admin')]])
+            caption = f"📊 Here's the exported tutor data ({rows} tutors)."
+        
+        try:
+            await target.reply_document(
+                document=export_file,
+                filename=filename,
+                caption=caption,
+                reply_markup=back_markup
+            )
+            # Only move the watermark once the admin actually has the file
+            await export_watermark_repository.set(admin_id, started_at)
+        finally:
+            export_file.close()
+    except Exception as e:
+        # Runs as its own task, so nothing else would tell the admin it failed
+        logger.error(f"Error exporting tutor data: {e}", exc_info=True)
+        await target.reply_text(
+            "❌ An error occurred while exporting the tutor data. Please try again.",
+            reply_markup=back_markup
         )
-    else:
-        await update.message.reply_document(
-            document=output.getvalue().encode('utf-8'),
-            filename=filename,
-            caption="📊 Here's the exported tutor data.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Admin Panel", callback_data='admin')]])
+
+async def export_analytics(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Export a columnar analytics snapshot of all tutors as Parquet or Feather."""
+    query = update.callback_query
+    if query:
+        await query.answer("Building analytics snapshot...")
+    
+    context.application.create_task(send_analytics_snapshot(update), update=update)
+
+async def send_analytics_snapshot(update: Update) -> None:
+    """Build the analytics snapshot and send it to the admin who asked for it."""
+    query = update.callback_query
+    target = query.message if query else update.message
+    back_markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Admin Panel", callback_data=callback_data('adm', 'panel'))]])
+    fmt = settings.analytics_format
+    try:
+        export_file, rows = await tutor_repository.export_snapshot({}, fmt)
+        
+        if export_file is None:
+            message = "No tutor data available to export."
+            if query:
+                await query.edit_message_text(message, reply_markup=back_markup)
+            else:
+                await update.message.reply_text(message, reply_markup=back_markup)
+            return
+        
+        filename = f"tutors_snapshot_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+        try:
+            await target.reply_document(
+                document=export_file,
+                filename=filename,
+                caption=f"📈 Analytics snapshot of {rows} tutors ({fmt.capitalize()}).",
+                reply_markup=back_markup
+            )
+        finally:
+            export_file.close()
+    except Exception as e:
+        # Runs as its own task, so nothing else would tell the admin it failed
+        logger.error(f"Error building analytics snapshot: {e}", exc_info=True)
+        await target.reply_text(
+            "❌ An error occurred while building the analytics snapshot. Please try again.",
+            reply_markup=back_markup
         )
 
+BROADCAST_AUDIENCES = {
+    'all': ("👥 Everyone", None),
+    ROLE_TUTOR: ("👨‍🏫 Tutors", ROLE_TUTOR),
+    ROLE_USER: ("👨‍👩‍👧 Parents", ROLE_USER),
+}
+
+def broadcast_prompt(role=None):
+    """Get the broadcast prompt text and keyboard with the chosen audience marked."""
+    audience_row = []
+    for key, (label, audience_role) in BROADCAST_AUDIENCES.items():
+        if audience_role == role:
+            label = f"✅ {label}"
+        audience_row.append(InlineKeyboardButton(label, callback_data=callback_data('adm', 'audience', key)))
+    
+    text = (
+        "📢 *Broadcast Message*\n\n"
+        "Choose who receives it, then enter the message you want to broadcast.\n"
+        "You can use markdown formatting: *bold*, _italic_, `code`."
+    )
+    return text, InlineKeyboardMarkup([
+        audience_row,
+        [InlineKeyboardButton("🔙 Cancel", callback_data=callback_data('adm', 'panel'))]
+    ])
+
 async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Start the broadcast message process."""
     query = update.callback_query
     
     # Check if user is admin
-    if str(update.effective_user.id) not in os.getenv('ADMIN_IDS', '').split(','):
+    if not settings.is_admin(update.effective_user.id):
         if query:
             await query.answer("❌ You don't have permission to use this feature.", show_alert=True)
         return -1
     
+    context.user_data.pop('broadcast_role', None)
+    text, reply_markup = broadcast_prompt()
+    
     if query:
         await query.answer()
-        await query.message.reply_text(
-            "📢 *Broadcast Message*\n\n"
-            "Please enter the message you want to broadcast to all users.\n"
-            "You can use markdown formatting: *bold*, _italic_, `code`.",
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔙 Cancel", callback_data='admin')]
-            ])
-        )
+        await query.message.reply_text(text, parse_mode=ParseMode.MARKDOWN, reply_markup=reply_markup)
     else:
-        await update.message.reply_text(
-            "📢 *Broadcast Message*\n\n"
-            "Please enter the message you want to broadcast to all users.\n"
-            "You can use markdown formatting: *bold*, _italic_, `code`.",
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔙 Cancel", callback_data='admin')]
-            ])
-        )
+        await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN, reply_markup=reply_markup)
     
     # Store the original message ID for cleanup
     if query and query.message:
@@ -418,166 +475,97 @@ async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     
     return 'AWAITING_BROADCAST_MESSAGE'
 
-async def handle_broadcast_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Handle the broadcast message and send to all users."""
+async def select_broadcast_audience(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Choose which role the next broadcast goes to."""
+    query = update.callback_query
+    label, role = BROADCAST_AUDIENCES.get(context.args[0], BROADCAST_AUDIENCES['all'])
+    context.user_data['broadcast_role'] = role
+    await query.answer(f"Audience: {label}")
+    
+    text, reply_markup = broadcast_prompt(role)
     try:
-        message_text = update.message.text
-        
-        # Get all users collection (both tutors and students)
-        users_collection = get_users_collection()
-        tutors_collection = get_tutors_collection()
-        
-        # Get all users with chat_id (telegram_id)
-        all_users = list(users_collection.find({"chat_id": {"$exists": True, "$ne": None}}))
-        
-        # If no users found in users collection, try to get from tutors collection
-        if not all_users:
-            all_users = list(tutors_collection.find({"chat_id": {"$exists": True, "$ne": None}}))
-        
-        # If still no users, try to find any ID field that might be a Telegram ID
-        if not all_users:
-            all_users = list(users_collection.find({}) + tutors_collection.find({}))
-            
-            # Try to find any numeric ID field
-            user_ids = set()
-            for user in all_users:
-                for key, value in user.items():
-                    if isinstance(value, (int, str)) and str(value).isdigit() and int(value) > 10000:
-                        user_ids.add(int(value))
-            
-            if user_ids:
-                all_users = [{"chat_id": uid} for uid in user_ids]
-        
-        # Get unique chat IDs
-        chat_ids = set()
-        for user in all_users:
-            if 'chat_id' in user and user['chat_id']:
-                try:
-                    chat_ids.add(int(user['chat_id']))
-                except (ValueError, TypeError):
-                    continue
-        
-        chat_ids = list(chat_ids)
-        
-        if not chat_ids:
-            await update.message.reply_text(
-                "❌ No active users found to send the broadcast message to.",
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data='admin')]
-                ])
+        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN, reply_markup=reply_markup)
+    except Exception as e:
+        logger.error(f"Error updating broadcast prompt: {e}")
+    
+    return 'AWAITING_BROADCAST_MESSAGE'
+
+async def handle_broadcast_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Take the broadcast message and start sending it to all users."""
+    message_text = update.message.text
+    role = context.user_data.pop('broadcast_role', None)
+    
+    # Format the broadcast message with a nice header and footer
+    broadcast_msg = (
+        f"📢 *Announcement from Admin*\n\n"
+        f"{message_text}\n\n"
+        f"_This is a broadcast message. Please do not reply to this message._"
+    )
+    
+    # Storing the job reads every recipient, so it happens outside the update
+    # along with the sending itself
+    context.application.create_task(
+        start_broadcast(context.bot, update.effective_chat.id, update.effective_user.id, broadcast_msg, role),
+        update=update
+    )
+    
+    # Clean up the broadcast message if it exists
+    if 'broadcast_message_id' in context.user_data:
+        try:
+            await context.bot.delete_message(
+                chat_id=update.effective_chat.id,
+                message_id=context.user_data['broadcast_message_id']
             )
-            return -1
-        
-        sent_count = 0
-        failed_count = 0
-        failed_users = []
+        except Exception as e:
+            logger.error(f"Error cleaning up message: {e}")
         
-        # Send initial message
-        progress_message = await update.message.reply_text(
-            f"📤 Preparing to send broadcast to {len(user_ids)} users..."
+        del context.user_data['broadcast_message_id']
+    
+    return -1  # End conversation
+
+async def start_broadcast(bot, chat_id: int, admin_id: int, broadcast_msg: str, role) -> None:
+    """Store a broadcast job for the chosen audience and send it."""
+    back_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data=callback_data('adm', 'panel'))]
+    ])
+    try:
+        # Store the job and stream its recipients from the registry before sending,
+        # so a restart can resume it
+        job = await broadcast_job_repository.create(
+            broadcast_msg, user_repository.recipient_chat_ids(role),
+            parse_mode=ParseMode.MARKDOWN, created_by=admin_id, role=role
         )
         
-        # Send the message to each user
-        sent_count = 0
-        failed_count = 0
-        failed_users = []
-        
-        # Format the broadcast message with a nice header and footer
-        broadcast_msg = (
-            f"📢 *Announcement from Admin*\n\n"
-            f"{message_text}\n\n"
-            f"_This is a broadcast message. Please do not reply to this message._"
-        )
+        if not job['total']:
+            await broadcast_job_repository.set_status(job['_id'], 'done')
+            await bot.send_message(
+                chat_id=chat_id,
+                text="❌ No active users found to send the broadcast message to.",
+                reply_markup=back_markup
+            )
+            return
         
         # Send initial status message
-        status_message = await update.message.reply_text(
-            f"📤 Sending broadcast to {len(chat_ids)} users...\n"
-            "🔄 0% complete (0/0 sent, 0 failed)"
+        status_message = await bot.send_message(
+            chat_id=chat_id,
+            text=f"📤 Sending broadcast to {job['total']} users...\n"
+                 "🔄 0% complete (0/0 sent, 0 failed)"
         )
-        
-        # Send messages to all chat IDs
-        for i, chat_id in enumerate(chat_ids, 1):
-            try:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=broadcast_msg,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                sent_count += 1
-            except Exception as e:
-                logger.error(f"Failed to send message to chat {chat_id}: {e}")
-                failed_count += 1
-                failed_users.append(str(chat_id))
-            
-            # Update status every 5 messages or if it's the last message
-            if i % 5 == 0 or i == len(chat_ids):
-                progress = int((i / len(chat_ids)) * 100)
-                status_text = (
-                    f"📤 Sending broadcast to {len(chat_ids)} users...\n"
-                    f"🔄 {progress}% complete ({i}/{len(chat_ids)} sent, {failed_count} failed)"
-                )
-                
-                # Add failed users if any (show only last 5 to avoid message being too long)
-                if failed_users:
-                    status_text += f"\n\n❌ Failed to send to: {', '.join(failed_users[-5:])}"
-                    if len(failed_users) > 5:
-                        status_text += f" and {len(failed_users) - 5} more..."
-                
-                try:
-                    await status_message.edit_text(status_text)
-                except Exception as e:
-                    logger.error(f"Failed to update status message: {e}")
-        
-        # Send final result
-        result_message = (
-            f"✅ *Broadcast Completed*\n\n"
-            f"📤 *Sent to:* {sent_count} users\n"
-            f"❌ *Failed:* {failed_count} users"
-        )
-        
-        # Add failed users to the result message (limited to first 10)
-        if failed_users:
-            result_message += "\n\n*Failed to send to:*"
-            for i in range(0, min(10, len(failed_users)), 5):
-                result_message += f"\n• {', '.join(failed_users[i:i+5])}"
-            
-            if len(failed_users) > 10:
-                result_message += f"\n... and {len(failed_users) - 10} more"
-        
-        # Send the final result
-        await update.message.reply_text(
-            result_message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data='admin')]
-            ])
+        await broadcast_job_repository.set_status_message(
+            job['_id'], status_message.chat_id, status_message.message_id
         )
-        
-        # Clean up the broadcast message if it exists
-        if 'broadcast_message_id' in context.user_data:
-            try:
-                await context.bot.delete_message(
-                    chat_id=update.effective_chat.id,
-                    message_id=context.user_data['broadcast_message_id']
-                )
-            except Exception as e:
-                logger.error(f"Error cleaning up message: {e}")
-            
-            del context.user_data['broadcast_message_id']
-        
-        return -1  # End conversation
-        
+        job['status_chat_id'] = status_message.chat_id
+        job['status_message_id'] = status_message.message_id
     except Exception as e:
         logger.error(f"Error in broadcast: {e}", exc_info=True)
-        await update.message.reply_text(
-            "❌ An error occurred while sending the broadcast. Please try again.",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data='admin')]
-            ])
+        await bot.send_message(
+            chat_id=chat_id,
+            text="❌ An error occurred while sending the broadcast. Please try again.",
+            reply_markup=back_markup
         )
-        return -1
+        return
     
-    return await admin_panel(update, context)
+    await run_broadcast_job(bot, job)
 
 async def view_tutor_details(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show detailed information about a specific tutor."""
@@ -585,65 +573,20 @@ async def view_tutor_details(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.answer()
     
     try:
-        tutor_id = query.data.replace('view_tutor_', '')
-        tutors = get_tutors_collection()
-        tutor = tutors.find_one({"_id": ObjectId(tutor_id)})
+        tutor_id = context.args[0]
+        tutor = await tutor_repository.find_by_id(tutor_id)
         
         if not tutor:
             await query.edit_message_text("❌ Tutor not found.")
             return
             
-        # Format registration date if it exists
-        reg_date = tutor.get('registration_date')
-        if isinstance(reg_date, datetime.datetime):
-            reg_date = reg_date.strftime("%Y-%m-%d %H:%M")
+        card = card_renderer.render(tutor, ADMIN_DETAIL_CARD)
+        tutor_info = card.text
         
         # Get profile photo if exists
         profile_photo = tutor.get('profile_photo')
         
-        # Format tutor details with markdown
-        tutor_info = (
-            f"👤 *{tutor.get('name', 'N/A')}* "
-            f"({'✅ Active' if tutor.get('is_active', True) else '❌ Inactive'})\n\n"
-            f"📧 *Email:* `{tutor.get('email', 'N/A')}`\n"
-            f"📞 *Phone:* `{tutor.get('contact', 'N/A')}`\n"
-            f"🏫 *University:* {tutor.get('university', 'N/A')}\n"
-            f"🎓 *Department:* {tutor.get('department', 'N/A')}\n"
-            f"📚 *Subjects:* {', '.join(tutor.get('subjects', ['N/A']))}\n"
-            f"🎯 *Levels:* {tutor.get('grades', 'N/A')}\n"
-            f"📍 *Location:* {tutor.get('location', 'N/A')}\n"
-            f"⭐ *Rating:* {tutor.get('rating', 'N/A')} ({tutor.get('reviews_count', 0)} reviews)\n"
-            f"📅 *Member since:* {reg_date or 'N/A'}\n"
-            f"🔗 *Profile ID:* `{str(tutor.get('_id', 'N/A'))}`\n\n"
-            f"📝 *Bio:*\n{tutor.get('bio', 'No bio provided')}\n"
-        )
-        
-        # Create keyboard with all buttons
-        keyboard = [
-            [
-                InlineKeyboardButton("✏️ Edit Tutor", callback_data=f'edit_tutor_{tutor_id}'),
-                InlineKeyboardButton("🔒 Toggle Status", callback_data=f'toggle_status_{tutor_id}')
-            ],
-            [
-                InlineKeyboardButton("📨 Contact", 
-                    url=f"https://t.me/{tutor.get('username', '').lstrip('@')}" if tutor.get('username') else None, 
-                    callback_data='no_username' if not tutor.get('username') else None
-                ),
-                InlineKeyboardButton("📞 Show Phone", 
-                    callback_data=f'show_phone_{tutor_id}'
-                ) if tutor.get('contact') else InlineKeyboardButton("📞 No Phone", callback_data='no_phone')
-            ],
-            [
-                InlineKeyboardButton("📊 View Reviews", callback_data=f'reviews_{tutor_id}'),
-                InlineKeyboardButton("📋 View Sessions", callback_data=f'sessions_{tutor_id}')
-            ],
-            [
-                InlineKeyboardButton("⬅️ Back to List", callback_data='all_tutors'),
-                InlineKeyboardButton("🏠 Admin Panel", callback_data='admin')
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = card.reply_markup
         
         try:
             # If there's a photo in the current message, delete it first
@@ -674,8 +617,8 @@ async def view_tutor_details(update: Update, context: ContextTypes.DEFAULT_TYPE)
             await query.edit_message_text(
                 "❌ Error loading tutor details. Please try again.",
                 reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("⬅️ Back to List", callback_data='all_tutors')],
-                    [InlineKeyboardButton("🏠 Admin Panel", callback_data='admin')]
+                    [InlineKeyboardButton("⬅️ Back to List", callback_data=callback_data('adm', 'tutors'))],
+                    [InlineKeyboardButton("🏠 Admin Panel", callback_data=callback_data('adm', 'panel'))]
                 ])
             )
             
@@ -683,15 +626,156 @@ async def view_tutor_details(update: Update, context: ContextTypes.DEFAULT_TYPE)
         logger.error(f"Error in view_tutor_details: {e}")
         await query.edit_message_text("❌ An error occurred while loading tutor details.")
 
+def broadcast_status_text(progress: BroadcastProgress) -> str:
+    """Format the progress line of a running broadcast."""
+    percent = int((progress.done / progress.total) * 100) if progress.total else 100
+    status_text = (
+        f"📤 Sending broadcast to {progress.total} users...\n"
+        f"🔄 {percent}% complete ({progress.done}/{progress.total} sent, {progress.failed} failed)\n"
+        f"⚡ {progress.rate:.1f} messages/sec"
+    )
+    
+    # Add failed users if any (show only last 5 to avoid message being too long)
+    if progress.failed_users:
+        status_text += f"\n\n❌ Failed to send to: {', '.join(progress.failed_users[-5:])}"
+        if len(progress.failed_users) > 5:
+            status_text += f" and {len(progress.failed_users) - 5} more..."
+    
+    return status_text
+
+async def run_broadcast_job(bot, job) -> None:
+    """Send a stored broadcast job, editing its status message as it goes."""
+    status_chat_id = job.get('status_chat_id')
+    
+    async def report_progress(progress: BroadcastProgress):
+        if status_chat_id and job.get('status_message_id'):
+            await bot.edit_message_text(
+                broadcast_status_text(progress),
+                chat_id=status_chat_id,
+                message_id=job['status_message_id']
+            )
+    
+    try:
+        result = await BroadcastJobRunner(bot).run(job, on_progress=report_progress)
+    except Exception as e:
+        logger.error(f"Broadcast job {job['_id']} stopped: {e}", exc_info=True)
+        return
+    
+    if not status_chat_id:
+        return
+    
+    # Send final result
+    result_message = (
+        f"✅ *Broadcast Completed*\n\n"
+        f"📤 *Sent to:* {result.sent} users\n"
+        f"❌ *Failed:* {result.failed} users"
+    )
+    
+    # Add failed users to the result message (limited to first 10)
+    failed_users = result.failed_users
+    if failed_users:
+        result_message += "\n\n*Failed to send to:*"
+        for i in range(0, min(10, len(failed_users)), 5):
+            result_message += f"\n• {', '.join(failed_users[i:i+5])}"
+        
+        if len(failed_users) > 10:
+            result_message += f"\n... and {len(failed_users) - 10} more"
+    
+    try:
+        await bot.send_message(
+            chat_id=status_chat_id,
+            text=result_message,
+            parse_mode=ParseMode.MARKDOWN,
+            reply_markup=InlineKeyboardMarkup([
+                [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data=callback_data('adm', 'panel'))]
+            ])
+        )
+    except Exception as e:
+        logger.error(f"Error sending broadcast result: {e}")
+
+async def resume_broadcast_jobs(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Continue the broadcast jobs that were interrupted by a restart.
+
+    Scheduled at startup, possibly while MongoDB is still unreachable; until
+    the jobs can be loaded it schedules itself again with a growing delay,
+    kept in the job's ``data``. Once they are loaded, jobs whose recipient
+    snapshot was cut short are marked failed, then again every
+    ``CREATING_TIMEOUT`` seconds.
+    """
+    delay = context.job.data or 1.0
+    try:
+        if not db_manager.ready:
+            raise ConnectionError("MongoDB is not connected yet")
+        jobs = await broadcast_job_repository.find_unfinished()
+    except Exception as e:
+        logger.error(f"Error loading unfinished broadcast jobs ({e}); retrying in {delay:.0f}s")
+        context.job_queue.run_once(
+            resume_broadcast_jobs, when=delay, data=min(delay * 2, settings.db_connect_max_backoff)
+        )
+        return
+    
+    for job in jobs:
+        logger.info(f"Resuming broadcast job {job['_id']} ({job['sent'] + job['failed']}/{job['total']} done)")
+        context.application.create_task(run_broadcast_job(context.bot, job))
+    
+    # A snapshot cut short moments before the restart, or one still running in
+    # another worker, is not stale yet, so the sweep repeats instead of running once
+    context.job_queue.run_repeating(
+        fail_abandoned_broadcast_jobs, interval=broadcast_job_repository.CREATING_TIMEOUT, first=0
+    )
+
+async def fail_abandoned_broadcast_jobs(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Mark broadcasts whose recipient snapshot was cut short by a crash or an error as failed."""
+    try:
+        job_ids = await broadcast_job_repository.fail_abandoned()
+    except Exception as e:
+        logger.error(f"Error checking for abandoned broadcast jobs: {e}")
+        return
+    
+    for job_id in job_ids:
+        logger.warning(f"Broadcast job {job_id} stopped while its recipients were stored; marked failed")
+
+async def broadcast_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show the progress of the latest broadcast jobs."""
+    query = update.callback_query
+    
+    if not settings.is_admin(update.effective_user.id):
+        await query.answer("❌ You don't have permission to access this.", show_alert=True)
+        return
+    
+    await query.answer()
+    
+    jobs = await broadcast_job_repository.recent(limit=5)
+    status_icons = {'creating': '📝', 'pending': '⏳', 'running': '🔄', 'done': '✅', 'failed': '❌'}
+    
+    message = "📬 *Broadcast Jobs*\n\n"
+    if not jobs:
+        message += "No broadcasts have been sent yet."
+    for job in jobs:
+        done = job['sent'] + job['failed']
+        percent = int((done / job['total']) * 100) if job['total'] else 100
+        message += (
+            f"{status_icons.get(job['status'], '•')} {job['created_at'].strftime('%Y-%m-%d %H:%M')} "
+            f"- {percent}% ({job['sent']} sent, {job['failed']} failed of {job['total']})\n"
+        )
+    
+    await query.edit_message_text(
+        message,
+        parse_mode='Markdown',
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔄 Refresh", callback_data=callback_data('adm', 'jobs'))],
+            [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data=callback_data('adm', 'panel'))]
+        ])
+    )
+
 async def handle_show_phone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show tutor's phone number when requested."""
     query = update.callback_query
     await query.answer()
     
     try:
-        tutor_id = query.data.replace('show_phone_', '')
-        tutors = get_tutors_collection()
-        tutor = tutors.find_one({"_id": ObjectId(tutor_id)})
+        tutor_id = context.args[0]
+        tutor = await tutor_repository.find_by_id(tutor_id)
         
         if not tutor or not tutor.get('contact'):
             await query.answer("❌ Phone number not available.", show_alert=True)
@@ -715,14 +799,34 @@ async def handle_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     else:
         await update.message.reply_text("Operation cancelled.")
     
-    return await admin_panel(update, context)
+    await admin_panel(update, context)
+    return ConversationHandler.END
+
+async def leave_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Leave the broadcast prompt for the admin panel without sending anything."""
+    await admin_panel(update, context)
+    return ConversationHandler.END
+
+def get_admin_routes():
+    """Return the callback routes of the admin panel; only admins may use them."""
+    return {
+        'adm:panel': admin_panel,
+        'adm:pending': pending_approvals,
+        'adm:review': handle_approval,
+        'adm:tutors': all_tutors,
+        'adm:view': view_tutor_details,
+        'adm:phone': handle_show_phone,
+        'adm:export': export_data,
+        'adm:snapshot': export_analytics,
+        'adm:jobs': broadcast_jobs,
+    }
 
 def get_admin_handlers():
     """Return a list of handlers for admin commands."""
     # Create a conversation handler for the broadcast feature
     broadcast_handler = ConversationHandler(
         entry_points=[
-            CallbackQueryHandler(broadcast, pattern='^broadcast$')
+            CallbackRouter({'adm:broadcast': broadcast}, allowed=settings.is_admin, name='broadcast entry')
         ],
         states={
             'AWAITING_BROADCAST_MESSAGE': [
@@ -730,42 +834,19 @@ def get_admin_handlers():
                     filters.TEXT & ~filters.COMMAND,
                     handle_broadcast_message
                 ),
-                CallbackQueryHandler(admin_panel, pattern='^admin$')
+                CallbackRouter(
+                    {'adm:audience': select_broadcast_audience}, allowed=settings.is_admin, name='broadcast audience'
+                )
             ]
         },
         fallbacks=[
             CommandHandler('cancel', handle_cancel),
-            CallbackQueryHandler(admin_panel, pattern='^admin$')
+            CallbackRouter({'adm:panel': leave_broadcast}, allowed=settings.is_admin, name='broadcast cancel')
         ],
-        map_to_parent={
-            -1: 'ADMIN_PANEL'  # Return to admin panel when done
-        }
+        name='broadcast'
     )
     
     return [
-        # Conversation handler for the admin panel
-        ConversationHandler(
-            entry_points=[
-                CommandHandler('admin', admin_panel),
-                CallbackQueryHandler(admin_panel, pattern='^admin$')
-            ],
-            states={
-                'ADMIN_PANEL': [
-                    CallbackQueryHandler(handle_approval, pattern='^(approve|reject)_'),
-                    CallbackQueryHandler(handle_show_phone, pattern='^show_phone_'),
-                    CallbackQueryHandler(all_tutors, pattern='^all_tutors$'),
-                    CallbackQueryHandler(export_data, pattern='^export_data$'),
-                    CallbackQueryHandler(broadcast, pattern='^broadcast$'),
-                    CallbackQueryHandler(view_tutor_details, pattern='^view_tutor_'),
-                    CallbackQueryHandler(pending_approvals, pattern='^pending_approvals$'),
-                    CallbackQueryHandler(handle_cancel, pattern='^cancel$')
-                ]
-            },
-            fallbacks=[
-                CommandHandler('cancel', handle_cancel),
-                CallbackQueryHandler(handle_cancel, pattern='^cancel$')
-            ]
-        ),
-        # Add the broadcast handler separately
+        CommandHandler('admin', admin_panel),
         broadcast_handler
     ]
@@ -1,9 +1,13 @@
-import os
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes, CallbackQueryHandler, CommandHandler, MessageHandler, filters
-from database.db import get_tutors_collection
-from config import SUBJECTS_LIST, GRADE_RANGES, TEACHING_METHODS
+from typing import Optional
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
+from telegram.ext import ContextTypes, CommandHandler, MessageHandler, filters
+from database.repository import tutor_repository
+from messaging.cards import SEARCH_CARD, card_renderer, contact_rows
+from catalog import catalog_service
+from config import settings
+from routing import callback_data
+from search_session import SearchSession
 from bson.objectid import ObjectId
 
 logger = logging.getLogger(__name__)
@@ -17,8 +21,8 @@ async def student_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     await query.answer()
     
     keyboard = [
-        [InlineKeyboardButton("🔍 Find Tutors", callback_data='search_tutors')],
-        [InlineKeyboardButton("ℹ️ Help", callback_data='student_help')]
+        [InlineKeyboardButton("🔍 Find Tutors", callback_data=callback_data('find', 'start'))],
+        [InlineKeyboardButton("ℹ️ Help", callback_data=callback_data('menu', 'help'))]
     ]
     
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -34,18 +38,31 @@ async def student_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     )
     return 0
 
+async def student_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Explain how to find a tutor."""
+    query = update.callback_query
+    await query.answer()
+    
+    await query.edit_message_text(
+        "ℹ️ *Finding a Tutor*\n\n"
+        "• Tap *Find Tutors* or send /find\n"
+        "• Search by subject, grade level or location, or show all tutors\n"
+        "• After picking a subject, narrow it down by grade level and location\n"
+        "• Use the contact button on the results to reach the admin",
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔍 Find Tutors", callback_data=callback_data('find', 'start'))]
+        ]),
+        parse_mode='Markdown'
+    )
+
 async def search_tutors(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle the /find command to search for tutors."""
-    # Initialize or reset search context
-    context.user_data['search_filters'] = {}
-    context.user_data['search_page'] = 0
-    
     # Show search options
     keyboard = [
-        [InlineKeyboardButton("🔍 Search by Subject", callback_data='search_subject')],
-        [InlineKeyboardButton("🏫 Search by Grade Level", callback_data='search_grade')],
-        [InlineKeyboardButton("📍 Search by Location", callback_data='search_location')],
-        [InlineKeyboardButton("👨‍🏫 Show All Tutors", callback_data='show_all')]
+        [InlineKeyboardButton("🔍 Search by Subject", callback_data=callback_data('find', 'by', 'subject'))],
+        [InlineKeyboardButton("🏫 Search by Grade Level", callback_data=callback_data('find', 'by', 'grade'))],
+        [InlineKeyboardButton("📍 Search by Location", callback_data=callback_data('find', 'by', 'location'))],
+        [InlineKeyboardButton("👨‍🏫 Show All Tutors", callback_data=callback_data('find', 'by', 'all'))]
     ]
     
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -73,58 +90,36 @@ async def handle_search_option(update: Update, context: ContextTypes.DEFAULT_TYP
     query = update.callback_query
     await query.answer()
     
-    search_type = query.data
-    context.user_data['search_type'] = search_type
-    
-    if search_type == 'search_subject':
-        # Create keyboard with subject options
-        keyboard = []
-        for i in range(0, len(SUBJECTS_LIST), 2):
-            row = []
-            if i + 1 < len(SUBJECTS_LIST):
-                row.extend([
-                    InlineKeyboardButton(SUBJECTS_LIST[i], callback_data=f"subject_{SUBJECTS_LIST[i]}"),
-                    InlineKeyboardButton(SUBJECTS_LIST[i+1], callback_data=f"subject_{SUBJECTS_LIST[i+1]}")
-                ])
-            else:
-                row.append(InlineKeyboardButton(SUBJECTS_LIST[i], callback_data=f"subject_{SUBJECTS_LIST[i]}"))
-            keyboard.append(row)
-        
-        keyboard.append([InlineKeyboardButton("🔙 Back", callback_data='back_to_search')])
-        
+    # Callback data is "find:by:<subject|grade|location|all>"
+    search_type = context.args[0]
+    
+    if search_type == 'subject':
         await query.edit_message_text(
             "📚 Select a subject:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=catalog_service.current.search_subjects_keyboard
         )
         return 'HANDLE_SUBJECT_SELECTION'
     
-    elif search_type == 'search_grade':
-        # Create keyboard with grade options
-        keyboard = [
-            [InlineKeyboardButton(grade, callback_data=f"grade_{grade}") for grade in GRADE_RANGES],
-            [InlineKeyboardButton("🔙 Back", callback_data='back_to_search')]
-        ]
-        
+    elif search_type == 'grade':
         await query.edit_message_text(
             "🎓 Select grade level:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=catalog_service.current.search_grades_keyboard
         )
         return 'HANDLE_GRADE_SELECTION'
     
-    elif search_type == 'search_location':
+    elif search_type == 'location':
+        # A plain location search, not narrowing an earlier one
+        context.user_data.pop('search_filters', None)
         await query.edit_message_text(
             "📍 Please enter the location (e.g., Bole, Mexico):",
             reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔙 Back", callback_data='back_to_search')]
+                [InlineKeyboardButton("🔙 Back", callback_data=callback_data('find', 'start'))]
             ])
         )
         return 'HANDLE_LOCATION_INPUT'
     
-    elif search_type == 'show_all':
-        return await show_tutors(update, context, {})
-    
-    elif search_type == 'back_to_search':
-        return await search_tutors(update, context)
+    elif search_type == 'all':
+        return await show_tutors(update, context, SearchSession.start({}))
     
     return await search_tutors(update, context)
 
@@ -133,48 +128,177 @@ async def handle_subject_selection(update: Update, context: ContextTypes.DEFAULT
     query = update.callback_query
     await query.answer()
     
-    subject = query.data.replace('subject_', '')
-    context.user_data['search_filters']['subjects'] = subject
+    subject = context.args[0]
+    session = SearchSession.start({'subjects': subject})
     
-    return await show_tutors(update, context, {'subjects': subject})
+    # Narrow the subject down by grade level before showing any tutors
+    grade_buttons = [
+        page_button(grade, SearchSession.start({'subjects': subject, 'grades': grade}))
+        for grade in catalog_service.current.grades
+    ]
+    grade_buttons = [button for button in grade_buttons if button is not None]
+    all_grades = page_button("All grade levels", session)
+    if not grade_buttons or all_grades is None:
+        return await show_tutors(update, context, session)
+    
+    await query.edit_message_text(
+        f"📚 {subject}\n\n🎓 Select a grade level:",
+        reply_markup=InlineKeyboardMarkup([
+            grade_buttons,
+            [all_grades],
+            [InlineKeyboardButton("🔙 Back", callback_data=callback_data('find', 'by', 'subject'))]
+        ])
+    )
+    return 'HANDLE_GRADE_SELECTION'
 
 async def handle_grade_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle grade level selection for tutor search."""
     query = update.callback_query
     await query.answer()
     
-    grade = query.data.replace('grade_', '')
-    return await show_tutors(update, context, {'grades': grade})
+    grade = context.args[0]
+    return await show_tutors(update, context, SearchSession.start({'grades': grade}))
 
 async def handle_location_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle location input for tutor search."""
     if update.callback_query:
         return await search_tutors(update, context)
     
-    location = update.message.text
-    return await show_tutors(update, context, {'location': location})
+    # Narrowing a subject or grade search keeps its filters
+    search_filters = dict(context.user_data.pop('search_filters', None) or {})
+    search_filters['location'] = update.message.text
+    return await show_tutors(update, context, SearchSession.start(search_filters))
+
+async def narrow_by_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Ask for a location to add to the filters of the search a result page came from."""
+    query = update.callback_query
+    
+    # Callback data is "find:near:<search session token>"
+    try:
+        session = SearchSession.decode(context.args[0])
+    except (IndexError, ValueError) as e:
+        logger.warning(f"Unreadable narrow-by-location button {query.data!r}: {e}")
+        return await search_tutors(update, context)
+    
+    await query.answer()
+    context.user_data['search_filters'] = session.filters
+    await query.message.reply_text(
+        "📍 Please enter the location (e.g., Bole, Mexico):",
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔙 Back", callback_data=callback_data('find', 'start'))]
+        ])
+    )
+    return 'HANDLE_LOCATION_INPUT'
+
+# Telegram limits for one message and one album caption
+MAX_MESSAGE_LENGTH = 4096
+MAX_CAPTION_LENGTH = 1024
+CARD_SEPARATOR = "\n➖➖➖➖➖➖➖➖\n\n"
+
+def card_text(tutor) -> str:
+    """Get the cached search card text of a tutor."""
+    return card_renderer.render(tutor, SEARCH_CARD).text
+
+async def send_tutor_cards(target, tutor_list) -> None:
+    """Send each tutor as a separate message, with their photo when they have one."""
+    for tutor in tutor_list:
+        card = card_renderer.render(tutor, SEARCH_CARD)
+        
+        # Send tutor info with photo if available
+        if tutor.get('profile_photo'):
+            try:
+                await target.reply_photo(
+                    photo=tutor['profile_photo'],
+                    caption=card.text,
+                    reply_markup=card.reply_markup,
+                    parse_mode='Markdown'
+                )
+                continue
+            except Exception as e:
+                logger.error(f"Error sending tutor photo: {e}")
+                await target.reply_text(
+                    f"{card.text}\n\n⚠️ Could not load profile photo",
+                    reply_markup=card.reply_markup,
+                    parse_mode='Markdown'
+                )
+                continue
+        
+        await target.reply_text(
+            card.text,
+            reply_markup=card.reply_markup,
+            parse_mode='Markdown'
+        )
+
+async def send_tutor_page(target, tutor_list, summary: str, reply_markup) -> None:
+    """Send a page of tutors as one album plus one navigation message.
+
+    Tutors with photos go into a single media group with their cards as
+    captions; the cards of tutors without photos are combined into the
+    navigation message. Without any photos the whole page is that one
+    message.
+    """
+    with_photos = [
+        tutor for tutor in tutor_list
+        if tutor.get('profile_photo') and len(card_text(tutor)) <= MAX_CAPTION_LENGTH
+    ]
+    
+    if len(with_photos) == 1:
+        try:
+            await target.reply_photo(
+                photo=with_photos[0]['profile_photo'],
+                caption=card_text(with_photos[0]),
+                parse_mode='Markdown'
+            )
+        except Exception as e:
+            logger.error(f"Error sending tutor photo: {e}")
+            with_photos = []
+    elif with_photos:
+        try:
+            await target.reply_media_group(media=[
+                InputMediaPhoto(
+                    media=tutor['profile_photo'],
+                    caption=card_text(tutor),
+                    parse_mode='Markdown'
+                )
+                for tutor in with_photos
+            ])
+        except Exception as e:
+            # One bad file ID fails the whole album; fall back to text for the page
+            logger.error(f"Error sending tutor album: {e}")
+            with_photos = []
+    
+    text_only = [tutor for tutor in tutor_list if tutor not in with_photos]
+    text = CARD_SEPARATOR.join([card_text(tutor) for tutor in text_only] + [summary])
+    if len(text) > MAX_MESSAGE_LENGTH:
+        # Too long for one message; send the text cards one by one
+        await send_tutor_cards(target, text_only)
+        text = summary
+    
+    await target.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+
+def page_button(label: str, session: SearchSession, action: str = 'page') -> Optional[InlineKeyboardButton]:
+    """A button that carries a search session, or None when the session does not fit in one."""
+    try:
+        return InlineKeyboardButton(label, callback_data=session.button_data(action))
+    except ValueError as e:
+        logger.warning(f"Leaving out the {label!r} button of a search: {e}")
+        return None
+
+async def show_tutors(update: Update, context: ContextTypes.DEFAULT_TYPE, session: SearchSession) -> int:
+    """Show one page of a tutor search with keyset pagination.
 
-async def show_tutors(update: Update, context: ContextTypes.DEFAULT_TYPE, filters: dict) -> int:
-    """Show tutors based on search filters with pagination."""
-    tutors = get_tutors_collection()
-    
-    # Build query with filters
-    query = {'status': 'approved'}
-    
-    if 'subjects' in filters:
-        query['subjects'] = filters['subjects']
-    if 'grades' in filters:
-        query['grades'] = filters['grades']
-    if 'location' in filters:
-        query['location'] = {'$regex': filters['location'], '$options': 'i'}
-    
-    # Get pagination info
-    page = context.user_data.get('search_page', 0)
+    The session holds the filters, page number and cursor; the Next/Previous
+    buttons carry the session of their page, so nothing is kept per user.
+    """
+    page = session.page
     skip = page * TUTORS_PER_PAGE
     
     # Get tutors with pagination
-    total_tutors = tutors.count_documents(query)
-    tutor_list = list(tutors.find(query).skip(skip).limit(TUTORS_PER_PAGE))
+    result = await tutor_repository.search_approved(
+        session.filters, TUTORS_PER_PAGE, after=session.after, before=session.before
+    )
+    total_tutors = result.total
+    tutor_list = result.items
     
     if not tutor_list and page == 0:
         message = "🔍 No tutors found matching your criteria."
@@ -182,155 +306,85 @@ async def show_tutors(update: Update, context: ContextTypes.DEFAULT_TYPE, filter
             await update.callback_query.edit_message_text(
                 message,
                 reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("🔙 Back to Search", callback_data='back_to_search')]
+                    [InlineKeyboardButton("🔙 Back to Search", callback_data=callback_data('find', 'start'))]
                 ])
             )
         else:
             await update.message.reply_text(
                 message,
                 reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("🔙 Back to Search", callback_data='back_to_search')]
+                    [InlineKeyboardButton("🔙 Back to Search", callback_data=callback_data('find', 'start'))]
                 ])
             )
         return 'SEARCH_OPTIONS'
     
-    # Send each tutor as a separate message with photo if available
-    for tutor in tutor_list:
-        tutor_info = (
-            f"👤 *{tutor.get('name', 'N/A')}*\n"
-            f"🏫 {tutor.get('university', 'N/A')}\n"
-            f"📚 *Subjects:* {', '.join(tutor.get('subjects', []))}\n"
-            f"🎓 *Grades:* {tutor.get('grades', 'N/A')}\n"
-            f"📍 *Location:* {tutor.get('location', 'N/A')}\n"
-            f"📞 *Contact:* {os.getenv('ADMIN_NUMBER', 'Contact Admin')}\n"
-            f"📅 *Member since:* {tutor.get('registration_date', 'N/A')}\n"
-        )
-        
-        # Create contact button with admin's number
-        keyboard = []
-        admin_number = os.getenv('ADMIN_NUMBER', '').strip()
-        
-        if admin_number:
-            # Format the number for display (remove + and any non-digit characters)
-            display_number = ''.join(filter(str.isdigit, admin_number))
-            # Create a WhatsApp link which is more reliable than tel: on mobile
-            whatsapp_url = f"https://wa.me/{display_number}"
-            
-            keyboard.append([
-                InlineKeyboardButton("📞 Contact Admin", url=whatsapp_url)
-            ])
-        else:
-            keyboard.append([
-                InlineKeyboardButton("ℹ️ Contact information not available", callback_data="no_contact")
-            ])
-            
-        # Add view more tutors button
-        keyboard.append([InlineKeyboardButton("🔍 View More Tutors", callback_data='show_more_tutors')])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Send tutor info with photo if available
-        if tutor.get('profile_photo') and update.callback_query:
-            try:
-                await update.callback_query.message.reply_photo(
-                    photo=tutor['profile_photo'],
-                    caption=tutor_info,
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
-            except Exception as e:
-                logger.error(f"Error sending tutor photo: {e}")
-                await update.callback_query.message.reply_text(
-                    f"{tutor_info}\n\n⚠️ Could not load profile photo",
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
-        elif update.callback_query:
-            await update.callback_query.message.reply_text(
-                tutor_info,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-        else:
-            if tutor.get('profile_photo'):
-                try:
-                    await update.message.reply_photo(
-                        photo=tutor['profile_photo'],
-                        caption=tutor_info,
-                        reply_markup=reply_markup,
-                        parse_mode='Markdown'
-                    )
-                except Exception as e:
-                    logger.error(f"Error sending tutor photo: {e}")
-                    await update.message.reply_text(
-                        f"{tutor_info}\n\n⚠️ Could not load profile photo",
-                        reply_markup=reply_markup,
-                        parse_mode='Markdown'
-                    )
-            else:
-                await update.message.reply_text(
-                    tutor_info,
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
+    target = update.callback_query.message if update.callback_query else update.message
+    summary = f"Showing tutors {skip + 1} to {min(skip + len(tutor_list), total_tutors)} of {total_tutors}"
     
     # Add pagination controls at the end
     keyboard = []
     nav_buttons = []
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton("⬅️ Previous", callback_data='prev_page'))
-    if (page + 1) * TUTORS_PER_PAGE < total_tutors:
-        nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data='next_page'))
+    if tutor_list and result.has_previous:
+        nav_buttons.append(page_button("⬅️ Previous", session.previous_page(tutor_list[0]['_id'])))
+    if tutor_list and result.has_next:
+        nav_buttons.append(page_button("Next ➡️", session.next_page(tutor_list[-1]['_id'])))
+    nav_buttons = [button for button in nav_buttons if button is not None]
     
     if nav_buttons:
         keyboard.append(nav_buttons)
     
+    if session.location is None and session.filters:
+        # Combine the subject or grade with a location; the button opens the first page again
+        near = page_button("📍 Narrow by location", session._replace(page=0, cursor=None, backwards=False), 'near')
+        if near is not None:
+            keyboard.append([near])
+    
     keyboard.extend([
-        [InlineKeyboardButton("🔍 New Search", callback_data='back_to_search')],
-        [InlineKeyboardButton("🏠 Back to Main Menu", callback_data='back_to_main')]
+        [InlineKeyboardButton("🔍 New Search", callback_data=callback_data('find', 'start'))],
+        [InlineKeyboardButton("🏠 Back to Main Menu", callback_data=callback_data('find', 'start'))]
     ])
     
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    if update.callback_query:
-        await update.callback_query.message.reply_text(
-            f"Showing tutors {skip + 1} to {min(skip + len(tutor_list), total_tutors)} of {total_tutors}",
-            reply_markup=reply_markup
-        )
+    if settings.search_results_mode == 'cards':
+        await send_tutor_cards(target, tutor_list)
+        await target.reply_text(summary, reply_markup=InlineKeyboardMarkup(keyboard))
     else:
-        await update.message.reply_text(
-            f"Showing tutors {skip + 1} to {min(skip + len(tutor_list), total_tutors)} of {total_tutors}",
-            reply_markup=reply_markup
-        )
+        # Albums cannot carry buttons, so the contact button moves to the navigation message
+        keyboard.insert(0, contact_rows()[0])
+        await send_tutor_page(target, tutor_list, summary, InlineKeyboardMarkup(keyboard))
     
     return 'HANDLE_TUTOR_LIST'
 
 async def handle_pagination(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle pagination for tutor search results."""
     query = update.callback_query
-    await query.answer()
-    
-    action = query.data
     
-    if action == 'next_page':
-        context.user_data['search_page'] += 1
-    elif action == 'prev_page':
-        context.user_data['search_page'] = max(0, context.user_data.get('search_page', 1) - 1)
+    # Callback data is "find:page:<search session token>"
+    try:
+        session = SearchSession.decode(context.args[0])
+    except (IndexError, ValueError) as e:
+        # A button from an older session format; start the search over
+        logger.warning(f"Unreadable search page button {query.data!r}: {e}")
+        return await search_tutors(update, context)
     
-    # Get current search filters
-    search_filters = context.user_data.get('search_filters', {})
-    return await show_tutors(update, context, search_filters)
+    await query.answer()
+    return await show_tutors(update, context, session)
+
+def get_student_routes():
+    """Return the callback routes of the student menu and tutor search."""
+    return {
+        'menu:student': student_menu,
+        'menu:help': student_help,
+        'find:start': search_tutors,
+        'find:by': handle_search_option,
+        'find:subject': handle_subject_selection,
+        'find:grade': handle_grade_selection,
+        'find:page': handle_pagination,
+        'find:near': narrow_by_location,
+    }
 
 def get_student_handlers():
     """Return a list of handlers for student-related commands."""
     return [
-        CallbackQueryHandler(student_menu, pattern='^student$'),
-        CallbackQueryHandler(search_tutors, pattern='^search_tutors$'),
-        CallbackQueryHandler(handle_search_option, pattern='^(search_|show_)'),
-        CallbackQueryHandler(handle_subject_selection, pattern='^subject_'),
-        CallbackQueryHandler(handle_grade_selection, pattern='^grade_'),
-        CallbackQueryHandler(handle_pagination, pattern='^(next_page|prev_page)$'),
-        CallbackQueryHandler(handle_search_option, pattern='^back_to_'),
         MessageHandler(filters.TEXT & ~filters.COMMAND, handle_location_input),
         CommandHandler('find', search_tutors)
     ]
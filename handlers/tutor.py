@@ -1,39 +1,26 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes, CallbackQueryHandler, MessageHandler, filters, CommandHandler, ConversationHandler
-from database.db import get_tutors_collection
+from telegram.ext import ContextTypes, MessageHandler, filters, CommandHandler, ConversationHandler
+from database.recipients import ROLE_TUTOR
+from database.repository import tutor_repository, user_repository
+from database.views import ProfileView
+from messaging.cards import PROFILE_CARD, card_renderer
+from catalog import catalog_service
 from config import (
-    REGISTER, NAME, UNIVERSITY, DEPARTMENT, YEAR, SUBJECTS, GRADES, METHOD, LOCATION, CONTACT, PROFILE_PIC,
-    SUBJECTS_LIST, GRADE_RANGES, TEACHING_METHODS
+    REGISTER, NAME, UNIVERSITY, DEPARTMENT, YEAR, SUBJECTS, GRADES, METHOD, LOCATION, CONTACT, PROFILE_PIC
 )
+from routing import CallbackRouter, callback_data
 
 logger = logging.getLogger(__name__)
 
-def format_tutor_info(tutor):
-    """Format tutor information for display."""
-    return (
-        f"👤 *{tutor.get('name', 'N/A')}*\n"
-        f"🏫 {tutor.get('university', 'N/A')} - {tutor.get('department', 'N/A')}\n"
-        f"📅 Year of Study: {tutor.get('year', 'N/A')}\n"
-        f"📚 *Subjects:* {', '.join(tutor.get('subjects', []))}\n"
-        f"🎓 *Grades:* {tutor.get('grades', 'N/A')}\n"
-        f"🏠 *Teaching Method:* {tutor.get('method', 'N/A')}\n"
-        f"📍 *Location:* {tutor.get('location', 'N/A')}\n"
-        f"📞 *Contact:* {tutor.get('contact', 'N/A')}\n"
-        f"✅ *Status:* {tutor.get('status', 'pending').capitalize()}"
-    )
-
 # These are now imported from config.py
 
 async def start_registration(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Start the registration process for tutors."""
     user = update.effective_user
-    tutors = get_tutors_collection()
     
     # Check if user is already registered
-    existing_tutor = tutors.find_one({"telegram_id": user.id})
-    
-    if existing_tutor:
+    if await tutor_repository.is_registered(user.id):
         await update.message.reply_text(
             "You are already registered as a tutor!\n"
             "Use /myprofile to view your profile or /update to make changes."
@@ -82,17 +69,7 @@ async def get_year(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Store the year of study and ask for subjects."""
     context.user_data['year'] = update.message.text
     
-    # Create inline keyboard for subject selection
-    keyboard = []
-    for i in range(0, len(SUBJECTS_LIST), 2):
-        row = []
-        for subject in SUBJECTS_LIST[i:i+2]:
-            row.append(InlineKeyboardButton(subject, callback_data=f"subject_{subject}"))
-        keyboard.append(row)
-    
-    keyboard.append([InlineKeyboardButton("Done", callback_data="subjects_done")])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = catalog_service.current.register_subjects_keyboard
     
     await update.message.reply_text(
         "📚 *Subjects*\n\n"
@@ -110,7 +87,8 @@ async def select_subjects(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     query = update.callback_query
     await query.answer()
     
-    if query.data == "subjects_done":
+    # Callback data is "reg:subject:<subject>" to toggle a subject or "reg:done"
+    if not context.args:
         if not context.user_data.get('selected_subjects'):
             await query.edit_message_text(
                 "Please select at least one subject!",
@@ -118,12 +96,7 @@ async def select_subjects(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             )
             return SUBJECTS
             
-        # Create keyboard for grade range selection
-        keyboard = [
-            [InlineKeyboardButton(grade, callback_data=f"grade_{grade}")] 
-            for grade in GRADE_RANGES
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = catalog_service.current.register_grades_keyboard
         
         await query.edit_message_text(
             "👨‍🎓 *Grade Range*\n\n"
@@ -134,7 +107,7 @@ async def select_subjects(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return GRADES
     
     # Toggle subject selection
-    subject = query.data.replace("subject_", "")
+    subject = context.args[0]
     if subject in context.user_data['selected_subjects']:
         context.user_data['selected_subjects'].remove(subject)
     else:
@@ -156,14 +129,9 @@ async def get_grades(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
     
-    context.user_data['grades'] = query.data.replace("grade_", "")
+    context.user_data['grades'] = context.args[0]
     
-    # Create keyboard for teaching method selection
-    keyboard = [
-        [InlineKeyboardButton(method, callback_data=f"method_{method}")] 
-        for method in TEACHING_METHODS
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = catalog_service.current.register_methods_keyboard
     
     await query.edit_message_text(
         "🏠 *Teaching Method*\n\n"
@@ -178,7 +146,7 @@ async def get_method(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
     
-    context.user_data['method'] = query.data.replace("method_", "")
+    context.user_data['method'] = context.args[0]
     
     await query.edit_message_text(
         "📍 *Location*\n\n"
@@ -226,9 +194,8 @@ async def get_contact(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
 async def myprofile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show the tutor's profile information."""
     user = update.effective_user
-    tutors = get_tutors_collection()
     
-    tutor = tutors.find_one({"telegram_id": user.id})
+    tutor = await tutor_repository.find_by_telegram_id(user.id, view=ProfileView)
     
     if not tutor:
         if update.callback_query:
@@ -243,13 +210,13 @@ async def myprofile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         return
     
     # Format tutor information
-    message = format_tutor_info(tutor)
+    message = card_renderer.render(tutor, PROFILE_CARD).text
     
     # Create keyboard
     keyboard = [
-        [InlineKeyboardButton("✏️ Update Profile", callback_data="update_profile")],
-        [InlineKeyboardButton("🔄 Refresh", callback_data="myprofile")],
-        [InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_main")]
+        [InlineKeyboardButton("✏️ Update Profile", callback_data=callback_data('profile', 'edit'))],
+        [InlineKeyboardButton("🔄 Refresh", callback_data=callback_data('profile', 'show'))],
+        [InlineKeyboardButton("🔙 Back to Menu", callback_data=callback_data('find', 'start'))]
     ]
     
     # If there's a profile photo, send the photo with caption
@@ -298,8 +265,7 @@ async def start_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     else:
         user = update.effective_user
     
-    tutors = get_tutors_collection()
-    tutor = tutors.find_one({"telegram_id": user.id})
+    tutor = await tutor_repository.find_by_telegram_id(user.id, view=ProfileView)
     
     if not tutor:
         message = "You haven't registered as a tutor yet. Use /register to create your profile."
@@ -314,15 +280,15 @@ async def start_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     
     # Show update options
     keyboard = [
-        [InlineKeyboardButton("✏️ Name", callback_data='update_name')],
-        [InlineKeyboardButton("🏫 University & Department", callback_data='update_uni')],
-        [InlineKeyboardButton("📅 Year of Study", callback_data='update_year')],
-        [InlineKeyboardButton("📚 Subjects", callback_data='update_subjects')],
-        [InlineKeyboardButton("🎓 Grade Levels", callback_data='update_grades')],
-        [InlineKeyboardButton("🏠 Teaching Method", callback_data='update_method')],
-        [InlineKeyboardButton("📍 Location", callback_data='update_location')],
-        [InlineKeyboardButton("📞 Contact Info", callback_data='update_contact')],
-        [InlineKeyboardButton("❌ Cancel", callback_data='cancel_update')]
+        [InlineKeyboardButton("✏️ Name", callback_data=callback_data('profile', 'field', 'name'))],
+        [InlineKeyboardButton("🏫 University & Department", callback_data=callback_data('profile', 'field', 'uni'))],
+        [InlineKeyboardButton("📅 Year of Study", callback_data=callback_data('profile', 'field', 'year'))],
+        [InlineKeyboardButton("📚 Subjects", callback_data=callback_data('profile', 'field', 'subjects'))],
+        [InlineKeyboardButton("🎓 Grade Levels", callback_data=callback_data('profile', 'field', 'grades'))],
+        [InlineKeyboardButton("🏠 Teaching Method", callback_data=callback_data('profile', 'field', 'method'))],
+        [InlineKeyboardButton("📍 Location", callback_data=callback_data('profile', 'field', 'location'))],
+        [InlineKeyboardButton("📞 Contact Info", callback_data=callback_data('profile', 'field', 'contact'))],
+        [InlineKeyboardButton("❌ Cancel", callback_data=callback_data('profile', 'cancel'))]
     ]
     
     message = "🔄 *Update Profile*\n\nWhat would you like to update?"
@@ -347,29 +313,25 @@ async def select_field(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     query = update.callback_query
     await query.answer()
     
-    action = query.data
-    
-    if action == 'cancel_update':
-        await query.edit_message_text("Update cancelled. Your profile remains unchanged.")
-        return ConversationHandler.END
-    
-    context.user_data['update_field'] = action
+    # Callback data is "profile:field:<field>"
+    field = context.args[0]
+    context.user_data['update_field'] = field
     
     field_display = {
-        'update_name': "full name",
-        'update_uni': "university and department",
-        'update_year': "year of study",
-        'update_subjects': "subjects",
-        'update_grades': "grade levels",
-        'update_method': "teaching method",
-        'update_location': "location",
-        'update_contact': "contact information"
+        'name': "full name",
+        'uni': "university and department",
+        'year': "year of study",
+        'subjects': "subjects",
+        'grades': "grade levels",
+        'method': "teaching method",
+        'location': "location",
+        'contact': "contact information"
     }
     
     await query.edit_message_text(
-        f"✏️ Please enter your new {field_display.get(action, action.replace('update_', ''))}:",
+        f"✏️ Please enter your new {field_display.get(field, field)}:",
         reply_markup=InlineKeyboardMarkup([
-            [InlineKeyboardButton("❌ Cancel", callback_data='cancel_update')]
+            [InlineKeyboardButton("❌ Cancel", callback_data=callback_data('profile', 'cancel'))]
         ])
     )
     
@@ -378,52 +340,47 @@ async def select_field(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
 async def get_new_value(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Get and update the new field value."""
     field = context.user_data.get('update_field')
-    tutors = get_tutors_collection()
     
     if not field:
         await update.message.reply_text("An error occurred. Please try again.")
         return ConversationHandler.END
     
     update_data = {}
+    catalog = catalog_service.current
     
-    if field == 'update_name':
+    if field == 'name':
         update_data['name'] = update.message.text
-    elif field == 'update_uni':
+    elif field == 'uni':
         parts = update.message.text.split(' - ', 1)
         if len(parts) == 2:
             update_data['university'] = parts[0].strip()
             update_data['department'] = parts[1].strip()
         else:
             update_data['university'] = update.message.text
-    elif field == 'update_year':
+    elif field == 'year':
         update_data['year'] = update.message.text
-    elif field == 'update_subjects':
+    elif field == 'subjects':
         # This would need a more complex UI for selection
         subjects = [s.strip() for s in update.message.text.split(',')]
-        update_data['subjects'] = [s for s in subjects if s in SUBJECTS_LIST]
-    elif field == 'update_grades':
-        if update.message.text in GRADE_RANGES:
+        update_data['subjects'] = [s for s in subjects if s in catalog.subjects]
+    elif field == 'grades':
+        if update.message.text in catalog.grades:
             update_data['grades'] = update.message.text
-    elif field == 'update_method':
-        if update.message.text in TEACHING_METHODS:
+    elif field == 'method':
+        if update.message.text in catalog.methods:
             update_data['method'] = update.message.text
-    elif field == 'update_location':
+    elif field == 'location':
         update_data['location'] = update.message.text
-    elif field == 'update_contact':
+    elif field == 'contact':
         update_data['contact'] = update.message.text
     
     if update_data:
-        tutors.update_one(
-            {"telegram_id": update.effective_user.id},
-            {"$set": update_data}
-        )
-        
-        # Get updated tutor data
-        tutor = tutors.find_one({"telegram_id": update.effective_user.id})
+        # Update and get updated tutor data
+        tutor = await tutor_repository.update_by_telegram_id(update.effective_user.id, update_data)
         
         await update.message.reply_text(
             "✅ Profile updated successfully!\n\n"
-            f"{format_tutor_info(tutor)}\n\n"
+            f"{card_renderer.render(tutor, PROFILE_CARD).text}\n\n"
             "What would you like to do next?\n"
             "/myprofile - View your profile\n"
             "/update - Update your profile\n"
@@ -452,19 +409,17 @@ def get_tutor_handlers():
     update_conv = ConversationHandler(
         entry_points=[
             CommandHandler('update', start_update),
-            CallbackQueryHandler(start_update, pattern='^update_profile$')
+            CallbackRouter({'profile:edit': start_update}, name='profile update entry')
         ],
         states={
-            'SELECT_FIELD': [CallbackQueryHandler(select_field, pattern='^update_')],
-            'GET_NEW_VALUE': [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, get_new_value),
-                CallbackQueryHandler(cancel, pattern='^cancel_update$')
-            ]
+            'SELECT_FIELD': [CallbackRouter({'profile:field': select_field}, name='profile update fields')],
+            'GET_NEW_VALUE': [MessageHandler(filters.TEXT & ~filters.COMMAND, get_new_value)]
         },
         fallbacks=[
             CommandHandler('cancel', cancel),
-            CallbackQueryHandler(cancel, pattern='^cancel$')
+            CallbackRouter({'profile:cancel': cancel}, name='profile update cancel')
         ],
+        name='profile update',
         allow_reentry=True
     )
     
@@ -473,6 +428,12 @@ def get_tutor_handlers():
         CommandHandler('myprofile', myprofile)
     ]
 
+def get_tutor_routes():
+    """Return the callback routes of the tutor menu and profile."""
+    return {
+        'profile:show': myprofile,
+    }
+
 # Create conversation handler for tutor registration
 async def handle_profile_pic(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle the profile picture upload and complete registration."""
@@ -514,8 +475,8 @@ async def handle_profile_pic(update: Update, context: ContextTypes.DEFAULT_TYPE)
     }
     
     # Save to database
-    tutors = get_tutors_collection()
-    tutors.insert_one(tutor_data)
+    await tutor_repository.insert(tutor_data)
+    await user_repository.register(update.effective_chat.id, role=ROLE_TUTOR)
     
     # Send confirmation message
     if profile_photo:
@@ -548,9 +509,11 @@ def get_tutor_registration_handler():
             UNIVERSITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_university)],
             DEPARTMENT: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_department)],
             YEAR: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_year)],
-            SUBJECTS: [CallbackQueryHandler(select_subjects, pattern='^subject_|subjects_done$')],
-            GRADES: [CallbackQueryHandler(get_grades, pattern='^grade_')],
-            METHOD: [CallbackQueryHandler(get_method, pattern='^method_')],
+            SUBJECTS: [CallbackRouter(
+                {'reg:subject': select_subjects, 'reg:done': select_subjects}, name='registration subjects'
+            )],
+            GRADES: [CallbackRouter({'reg:grade': get_grades}, name='registration grades')],
+            METHOD: [CallbackRouter({'reg:method': get_method}, name='registration methods')],
             LOCATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_location)],
             CONTACT: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_contact)],
             PROFILE_PIC: [
@@ -561,8 +524,8 @@ def get_tutor_registration_handler():
         },
         fallbacks=[
             CommandHandler('cancel', cancel),
-            CallbackQueryHandler(cancel, pattern='^cancel$'),
             CommandHandler('skip', handle_profile_pic)
         ],
+        name='registration',
         allow_reentry=True
     )
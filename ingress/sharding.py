@@ -0,0 +1,324 @@
+"""Multi-process deployment: one ingress process, N worker processes.
+
+With ``UPDATE_WORKERS`` above 1 the process started by ``main.py`` only
+receives updates, from the webhook (:class:`ShardedWebhookServer`) or
+from getUpdates (:class:`ShardPoller`), and hands each one as raw JSON to
+one of the worker processes over a bounded ``multiprocessing`` queue.
+Every worker runs the full Application with the handlers from
+``handlers/`` and its own MongoDB pool and executor.
+
+Updates are sharded by chat: ``chat_id % workers``, with the user id for
+updates without a chat, the same key :mod:`update_processor` orders by.
+A chat therefore always lands on the same worker, which keeps its
+updates in order and lets the in-memory state stay per process:
+``ConversationHandler`` states, ``user_data``, the rendered card cache
+and the outbound per-chat rate limits. The tutor cache, catalog and
+search totals are per process too; each worker keeps its copies in sync
+with MongoDB the way a single process does. Telegram's global rate limit
+is split evenly between the workers, and only worker 0 resumes
+interrupted broadcasts.
+
+A full worker queue stops the ingress for that shard: the webhook answers
+503 so Telegram retries, and the poller waits before fetching more. A
+worker that dies is started again with a new, empty queue; the updates
+still queued for it are lost and logged.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import httpx
+from telegram import Bot, Update
+from telegram.ext import Application
+
+from config import settings
+from ingress.webhook import BACKLOG_POLL_INTERVAL, WebhookServer, register_webhook, stop_on_signals
+from update_processor import has_room
+
+logger = logging.getLogger(__name__)
+
+# Update fields whose object has a ``chat``, and those that only have a user
+_CHAT_FIELDS = ('message', 'edited_message', 'channel_post', 'edited_channel_post',
+                'my_chat_member', 'chat_member', 'chat_join_request')
+_USER_FIELDS = ('inline_query', 'chosen_inline_result', 'shipping_query', 'pre_checkout_query')
+
+
+def raw_ordering_key(data: dict) -> Optional[int]:
+    """:func:`update_processor.ordering_key` for an update that is still JSON."""
+    for field in _CHAT_FIELDS:
+        if field in data:
+            return data[field]['chat']['id']
+    if 'callback_query' in data:
+        query = data['callback_query']
+        message = query.get('message')
+        return message['chat']['id'] if message else query['from']['id']
+    for field in _USER_FIELDS:
+        if field in data:
+            return data[field]['from']['id']
+    if 'poll_answer' in data:
+        user = data['poll_answer'].get('user')
+        return user['id'] if user else None
+    return None
+
+
+def shard_for(data: dict, shards: int) -> int:
+    """The worker an update goes to; updates without a chat or user are spread by id."""
+    key = raw_ordering_key(data)
+    return (key if key is not None else data['update_id']) % shards
+
+
+class WorkerPool:
+    """The worker processes and the queue each one reads its updates from.
+
+    ``target(index, workers, queue, *args)`` runs in each process; it must be
+    importable from a fresh interpreter, since workers are spawned rather
+    than forked so none of them inherits the ingress process's sockets or
+    MongoDB client.
+    """
+
+    def __init__(self, workers: int, target: Callable, queue_size: int, args: Tuple = ()):
+        self.target = target
+        self.queue_size = queue_size
+        self.args = tuple(args)
+        self._context = multiprocessing.get_context('spawn')
+        self._stopping = False
+        self.queues: List[multiprocessing.Queue] = [None] * workers
+        self.processes: List[multiprocessing.Process] = [None] * workers
+        for index in range(workers):
+            self._create(index)
+
+    def __len__(self) -> int:
+        return len(self.processes)
+
+    def _create(self, index: int):
+        # A worker that died may have held its queue's lock, so every process gets a new queue
+        self.queues[index] = self._context.Queue(maxsize=self.queue_size)
+        self.processes[index] = self._context.Process(
+            target=self.target, args=(index, len(self), self.queues[index]) + self.args,
+            name=f'worker-{index}', daemon=True
+        )
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+        logger.info(f"Started {len(self)} update workers")
+
+    def respawn_dead(self) -> List[int]:
+        """Start a new process for every worker that exited on its own; returns their indexes."""
+        restarted = []
+        for index, process in enumerate(self.processes):
+            if self._stopping or process.exitcode is None:
+                continue
+            old_queue = self.queues[index]
+            try:
+                lost = f"{old_queue.qsize()} queued updates"
+            except NotImplementedError:
+                lost = "its queued updates"
+            logger.error(f"{process.name} exited with code {process.exitcode}; restarting it, {lost} are lost")
+            # Nobody reads the old queue any more; do not wait for it to flush at exit
+            old_queue.cancel_join_thread()
+            old_queue.close()
+            self._create(index)
+            self.processes[index].start()
+            restarted.append(index)
+        return restarted
+
+    def put(self, shard: int, payload: bytes) -> bool:
+        """Queue a raw update for a worker; False when that worker's queue is full."""
+        try:
+            self.queues[shard].put_nowait(payload)
+        except queue.Full:
+            return False
+        return True
+
+    def alive(self) -> bool:
+        return all(process.is_alive() for process in self.processes)
+
+    def stop(self, timeout: float = settings.worker_stop_timeout):
+        """Let each worker finish the updates it has, then stop it; all within ``timeout``."""
+        self._stopping = True
+        deadline = time.monotonic() + timeout
+        for process, shard_queue in zip(self.processes, self.queues):
+            if not process.is_alive():
+                # Nothing reads a dead worker's queue, so the sentinel could never be delivered
+                shard_queue.cancel_join_thread()
+                continue
+            try:
+                shard_queue.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                logger.warning(f"{process.name} has a full queue at shutdown; terminating it")
+                shard_queue.cancel_join_thread()
+                process.terminate()
+                process.join()
+        for process, shard_queue in zip(self.processes, self.queues):
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in {timeout:.0f}s; terminating it")
+                shard_queue.cancel_join_thread()
+                process.terminate()
+                process.join()
+
+
+class ShardedWebhookServer(WebhookServer):
+    """The webhook server of the ingress process; updates go to the worker pool as JSON."""
+
+    def __init__(self, pool: WorkerPool, secret_token: str, **kwargs):
+        super().__init__(None, secret_token, **kwargs)
+        self.pool = pool
+
+    def parse_update(self, body: bytes) -> Tuple[int, bytes]:
+        data = json.loads(body)
+        if not isinstance(data, dict) or 'update_id' not in data:
+            raise ValueError("Not an update")
+        return shard_for(data, len(self.pool)), body
+
+    def try_put(self, update: Tuple[int, bytes]) -> bool:
+        return self.pool.put(*update)
+
+    def is_ready(self) -> bool:
+        return self.pool.alive()
+
+    def stats(self):
+        return {'workers': len(self.pool), **self.counters}
+
+
+class ShardPoller:
+    """getUpdates long polling for the ingress process.
+
+    Talks to the Bot API with plain httpx so the updates stay JSON all the
+    way to the workers instead of being parsed here only to be serialized
+    again.
+    """
+
+    def __init__(self, pool: WorkerPool, api_url: str, poll_timeout: int = settings.poll_timeout):
+        self.pool = pool
+        self.api_url = api_url
+        self.poll_timeout = poll_timeout
+        self.offset = 0
+
+    async def run(self, stop_event: asyncio.Event):
+        async with httpx.AsyncClient(timeout=self.poll_timeout + 10) as client:
+            await client.post(f"{self.api_url}/deleteWebhook")
+            stopping = asyncio.create_task(stop_event.wait())
+            try:
+                await self._poll(client, stopping)
+            finally:
+                stopping.cancel()
+
+    async def _poll(self, client: httpx.AsyncClient, stopping: asyncio.Task):
+        while not stopping.done():
+            polling = asyncio.create_task(self._get_updates(client))
+            await asyncio.wait({polling, stopping}, return_when=asyncio.FIRST_COMPLETED)
+            if not polling.done():
+                # Stopped during a long poll; the updates it would return stay with Telegram
+                polling.cancel()
+                break
+            try:
+                updates = polling.result()
+            except (httpx.HTTPError, ValueError) as e:
+                logger.error(f"getUpdates failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            for data in updates:
+                shard = shard_for(data, len(self.pool))
+                payload = json.dumps(data).encode('utf-8')
+                # A full worker holds up polling, so Telegram keeps the rest
+                while not self.pool.put(shard, payload):
+                    if stopping.done():
+                        # The offset has not moved past this update, so it is fetched again next time
+                        return
+                    await asyncio.sleep(BACKLOG_POLL_INTERVAL)
+                self.offset = data['update_id'] + 1
+
+    async def _get_updates(self, client: httpx.AsyncClient) -> List[dict]:
+        response = await client.post(f"{self.api_url}/getUpdates", json={
+            'offset': self.offset, 'timeout': self.poll_timeout, 'allowed_updates': Update.ALL_TYPES,
+        })
+        body = response.json()
+        if not body.get('ok'):
+            raise ValueError(body.get('description', 'getUpdates was not ok'))
+        return body['result']
+
+
+async def watch_workers(pool: WorkerPool, stop_event: asyncio.Event):
+    """Restart workers that die until ``stop_event`` is set."""
+    while not stop_event.is_set():
+        pool.respawn_dead()
+        try:
+            await asyncio.wait_for(stop_event.wait(), settings.worker_check_interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def serve_ingress(settings, pool: WorkerPool, stop_event: Optional[asyncio.Event] = None):
+    """Receive updates for the worker pool until stopped."""
+    stop_event = stop_event or asyncio.Event()
+    stop_on_signals(stop_event)
+    watching = asyncio.create_task(watch_workers(pool, stop_event))
+    try:
+        await _receive(settings, pool, stop_event)
+    finally:
+        watching.cancel()
+
+
+async def _receive(settings, pool: WorkerPool, stop_event: asyncio.Event):
+    if settings.update_mode != 'webhook':
+        await ShardPoller(pool, settings.bot_api_url + settings.bot_token).run(stop_event)
+        return
+
+    server = ShardedWebhookServer(
+        pool, settings.webhook_secret, host=settings.webhook_listen,
+        port=settings.webhook_port, path=settings.webhook_path
+    )
+    await server.start()
+    try:
+        async with Bot(settings.bot_token, base_url=settings.bot_api_url) as bot:
+            await register_webhook(bot, settings)
+        await stop_event.wait()
+    finally:
+        await server.stop()
+
+
+def run_sharded(settings, worker_target: Callable):
+    """Run the ingress process with ``settings.update_workers`` workers until interrupted."""
+    pool = WorkerPool(settings.update_workers, worker_target, settings.webhook_queue_size)
+    pool.start()
+    try:
+        asyncio.run(serve_ingress(settings, pool))
+    finally:
+        pool.stop()
+
+
+async def serve_worker(application: Application, shard_queue):
+    """Run ``application`` on the updates of one worker queue until the ingress stops it."""
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+
+    async def feed(payload: bytes):
+        # The worker queue only fills up, and pushes back on the ingress,
+        # while this process has a full backlog
+        while not has_room(application):
+            await asyncio.sleep(BACKLOG_POLL_INTERVAL)
+        try:
+            update = Update.de_json(json.loads(payload), application.bot)
+        except Exception as e:
+            logger.error(f"Dropped an unreadable update: {e}")
+            return
+        application.update_queue.put_nowait(update)
+
+    def read():
+        # multiprocessing queues only block, so they are read from a thread
+        while (payload := shard_queue.get()) is not None:
+            asyncio.run_coroutine_threadsafe(feed(payload), loop).result()
+        loop.call_soon_threadsafe(stopped.set)
+
+    async with application:
+        await application.start()
+        threading.Thread(target=read, name='shard-reader', daemon=True).start()
+        await stopped.wait()
+        await application.stop()
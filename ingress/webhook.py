@@ -0,0 +1,289 @@
+"""Webhook ingress: a small asyncio HTTP server that feeds the update queue.
+
+Telegram POSTs every update as JSON to ``WEBHOOK_PATH``. The server checks
+the ``X-Telegram-Bot-Api-Secret-Token`` header against the secret given to
+``setWebhook``, turns the body into an ``Update`` and puts it on the
+Application's update queue, which is bounded in webhook mode. The
+backlog counts the queued updates and, with a concurrent update
+processor, the ones it has taken off the queue but not finished. When
+the backlog stays at the queue size for ``enqueue_timeout`` seconds the
+server answers 503 with ``Retry-After`` and Telegram delivers the update
+again later, so a burst slows Telegram down instead of piling up in
+memory.
+
+``GET /healthz`` answers 200 while the server loop is alive. ``GET
+/readyz`` answers 200 only while the Application is running and the
+backlog has room, and reports the backlog, the request counters and the
+MongoDB pool counters as JSON.
+
+The server speaks just enough HTTP/1.1 for Telegram and local tests:
+``Content-Length`` bodies and keep-alive connections, no chunked
+encoding and no TLS (terminate TLS at a reverse proxy). Recorded updates
+can be replayed against a local bot started with ``UPDATE_MODE=webhook``:
+
+    curl -H 'X-Telegram-Bot-Api-Secret-Token: <WEBHOOK_SECRET>' \
+         -H 'Content-Type: application/json' \
+         --data-binary @benchmarks/updates/help_command.json \
+         http://127.0.0.1:8443/telegram
+"""
+import asyncio
+import hmac
+import json
+import logging
+import signal
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import Application
+
+from config import settings
+from database.db import db_manager
+from update_processor import backlog, has_room
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+# How often a full backlog is checked again while a delivery waits for room
+BACKLOG_POLL_INTERVAL = 0.01
+MAX_HEADERS = 100
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+    411: 'Length Required', 413: 'Payload Too Large', 503: 'Service Unavailable',
+}
+
+
+class HttpError(Exception):
+    """A request the server answers with an error status and closes."""
+
+    def __init__(self, status: int, message: str = ''):
+        super().__init__(message or REASONS.get(status, ''))
+        self.status = status
+
+
+class WebhookServer:
+    """Accept Telegram webhook deliveries and queue them for the Application."""
+
+    def __init__(self, application: Application, secret_token: str, host: str = '0.0.0.0',
+                 port: int = 8443, path: str = '/telegram',
+                 enqueue_timeout: float = settings.webhook_enqueue_timeout,
+                 max_body: int = settings.webhook_max_body):
+        self.application = application
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self.path = path
+        self.enqueue_timeout = enqueue_timeout
+        self.max_body = max_body
+        self.counters: Counter = Counter()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        return self.application.update_queue
+
+    async def start(self):
+        """Start listening; the bound port is in ``self.port`` afterwards."""
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Stop accepting connections and wait for the open ones to close."""
+        if self._server is None:
+            return
+        self._server.close()
+        # Idle keep-alive connections would otherwise hold wait_closed() open
+        for writer in list(self._connections.values()):
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    # -- update sink, overridden by ingress.sharding.ShardedWebhookServer ------
+
+    def parse_update(self, body: bytes):
+        """Turn a request body into what :meth:`try_put` takes; raises on a malformed update."""
+        update = Update.de_json(json.loads(body), self.application.bot)
+        if update is None:
+            raise ValueError("Empty update")
+        return update
+
+    def try_put(self, update) -> bool:
+        """Queue the update if the backlog has room."""
+        if not has_room(self.application):
+            return False
+        self.queue.put_nowait(update)
+        return True
+
+    def is_ready(self) -> bool:
+        return self.application.running and has_room(self.application)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'queued': self.queue.qsize(),
+            'in_flight': backlog(self.application) - self.queue.qsize(),
+            'capacity': self.queue.maxsize,
+            **self.counters,
+            'mongo': db_manager.pool_stats(),
+        }
+
+    # -- HTTP ----------------------------------------------------------------
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), settings.webhook_idle_timeout)
+                except HttpError as e:
+                    await self._respond(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    return
+                if request is None:
+                    return
+                method, target, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, payload, extra = await self._route(method, target, headers, body)
+                await self._respond(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    return
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Webhook connection failed: {e}", exc_info=True)
+        finally:
+            self._connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HttpError(400, 'Malformed request line')
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HttpError(400, 'Too many headers')
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        body = b''
+        if method == 'POST':
+            if 'content-length' not in headers:
+                raise HttpError(411)
+            try:
+                length = int(headers['content-length'])
+            except ValueError:
+                raise HttpError(400, 'Bad Content-Length')
+            if length > self.max_body:
+                raise HttpError(413)
+            body = await reader.readexactly(length)
+        return method, target.split('?', 1)[0], headers, body
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool,
+                       extra_headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8')
+        head = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            'Content-Type: application/json',
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        head.extend(f"{name}: {value}" for name, value in (extra_headers or {}).items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def _route(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        if target == '/healthz':
+            return 200, {'status': 'ok'}, None
+        if target == '/readyz':
+            ready = self.is_ready()
+            return (200 if ready else 503), dict(self.stats(), ready=ready), None
+        if target != self.path:
+            return 404, {'error': 'Not Found'}, None
+        if method != 'POST':
+            return 405, {'error': 'Method Not Allowed'}, {'Allow': 'POST'}
+        return await self._receive_update(headers, body)
+
+    async def _receive_update(self, headers: Dict[str, str], body: bytes):
+        given = headers.get(SECRET_HEADER, '')
+        if not hmac.compare_digest(given.encode('utf-8'), self.secret_token.encode('utf-8')):
+            self.counters['forbidden'] += 1
+            return 403, {'error': 'Invalid secret token'}, None
+
+        try:
+            update = self.parse_update(body)
+        except Exception as e:
+            self.counters['bad_request'] += 1
+            logger.warning(f"Rejected malformed webhook update: {e}")
+            return 400, {'error': 'Malformed update'}, None
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.enqueue_timeout
+        while not self.try_put(update):
+            if loop.time() >= deadline:
+                # Telegram redelivers after a non-2xx answer, so the update is not lost
+                self.counters['throttled'] += 1
+                return 503, {'error': 'Update backlog is full'}, {'Retry-After': '1'}
+            await asyncio.sleep(BACKLOG_POLL_INTERVAL)
+
+        self.counters['accepted'] += 1
+        return 200, {'ok': True}, None
+
+
+async def register_webhook(bot, settings):
+    """Point Telegram at WEBHOOK_URL, or only log when serving locally without one."""
+    if not settings.webhook_url:
+        logger.warning("WEBHOOK_URL is not set; serving locally without registering the webhook")
+        return
+    await bot.set_webhook(
+        url=settings.webhook_url.rstrip('/') + settings.webhook_path,
+        secret_token=settings.webhook_secret,
+        max_connections=settings.webhook_max_connections,
+        allowed_updates=Update.ALL_TYPES,
+    )
+
+
+def stop_on_signals(stop_event: asyncio.Event):
+    """Set ``stop_event`` on SIGINT and SIGTERM."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # Not available on Windows or outside the main thread
+            pass
+
+
+async def serve_webhook(application: Application, settings, stop_event: Optional[asyncio.Event] = None):
+    """Register the webhook with Telegram and serve updates until stopped."""
+    server = WebhookServer(
+        application, settings.webhook_secret, host=settings.webhook_listen,
+        port=settings.webhook_port, path=settings.webhook_path
+    )
+    stop_event = stop_event or asyncio.Event()
+    stop_on_signals(stop_event)
+
+    async with application:
+        await application.start()
+        await server.start()
+        try:
+            await register_webhook(application.bot, settings)
+            await stop_event.wait()
+        finally:
+            await server.stop()
+            await application.stop()
+
+
+def run_webhook(application: Application, settings):
+    """Run the bot in webhook mode until interrupted."""
+    asyncio.run(serve_webhook(application, settings))
@@ -1,19 +1,31 @@
+import time
+
+# Taken before the heavy imports so the startup report covers them
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
 import logging
-import os
-from dotenv import load_dotenv
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import (
-    Application, CommandHandler, CallbackQueryHandler, MessageHandler,
-    filters, ContextTypes, ConversationHandler
-)
-from database.db import db_manager
-from config import REGISTER, NAME, UNIVERSITY, DEPARTMENT, YEAR, SUBJECTS, GRADES, METHOD, LOCATION, CONTACT
-from handlers.tutor import get_tutor_registration_handler, get_tutor_handlers, select_subjects, get_grades, get_method
-from handlers.student import student_menu, search_tutors, get_student_handlers
-from handlers.admin import admin_panel, get_admin_handlers, pending_approvals, handle_approval
-
-# Load environment variables
-load_dotenv()
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
+from catalog import catalog_service
+from database.db import db_manager, get_catalog_collection, get_tutors_collection
+from database.repository import shutdown_executor, user_repository
+from database.indexes import apply_migrations
+from database.search import totals_cache
+from database.tutor_cache import tutor_cache
+from messaging.scheduler import outbound_scheduler
+from config import settings
+from handlers.tutor import get_tutor_registration_handler, get_tutor_handlers, get_tutor_routes
+from handlers.student import get_student_handlers, get_student_routes
+from handlers.admin import get_admin_handlers, get_admin_routes, resume_broadcast_jobs
+from ingress.sharding import run_sharded, serve_worker
+from ingress.webhook import run_webhook
+from routing import CallbackRouter, answer_stale_callback, callback_data, check_routes
+from update_processor import ChatOrderedUpdateProcessor
 
 # Enable logging
 logging.basicConfig(
@@ -22,20 +34,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Conversation states are now imported from config.py
+# Set by stop_services() so a startup still waiting for MongoDB gives up
+_services_stopped = threading.Event()
+
+class StartupTimer:
+    """Time the startup phases and log them as they finish."""
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.phases = {}
 
-# Admin IDs
-ADMIN_IDS = [int(id_str.strip()) for id_str in os.getenv('ADMIN_IDS', '').split(',') if id_str.strip()]
+    def record(self, name: str, seconds: float):
+        self.phases[name] = seconds
+        logger.info(f"Startup phase '{name}' took {seconds * 1000:.0f}ms")
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+startup_timer = StartupTimer(_IMPORT_STARTED)
+startup_timer.record('import', time.perf_counter() - _IMPORT_STARTED)
+
+def connect_database():
+    """Ping MongoDB until it answers, then apply index migrations, without holding up startup."""
+    delay = 1.0
+    with startup_timer.phase('connection'):
+        while True:
+            try:
+                db_manager.ping()
+                break
+            except Exception as e:
+                logger.error(f"MongoDB is not reachable yet ({e}); retrying in {delay:.0f}s")
+            if _services_stopped.wait(delay):
+                return
+            delay = min(delay * 2, settings.db_connect_max_backoff)
+
+    # Make sure the indexes the handlers rely on exist
+    try:
+        apply_migrations()
+    except Exception as e:
+        logger.error(f"Error applying index migrations: {e}")
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Send a welcome message and ask for the user's role."""
     user = update.effective_user
+    
+    # Keep the broadcast recipient registry current
+    try:
+        await user_repository.register(update.effective_chat.id)
+    except Exception as e:
+        logger.error(f"Error registering chat {update.effective_chat.id}: {e}")
+    
     keyboard = [
-        [InlineKeyboardButton("👨‍🎓 I'm a Tutor", callback_data='tutor')],
-        [InlineKeyboardButton("👨‍👩‍👧 I'm a Parent", callback_data='student')]
+        [InlineKeyboardButton("👨‍🎓 I'm a Tutor", callback_data=callback_data('menu', 'tutor'))],
+        [InlineKeyboardButton("👨‍👩‍👧 I'm a Parent", callback_data=callback_data('menu', 'student'))]
     ]
-    if user.id in ADMIN_IDS:
-        keyboard.append([InlineKeyboardButton("👨‍💼 Admin Panel", callback_data='admin')])
+    if settings.is_admin(user.id):
+        keyboard.append([InlineKeyboardButton("👨‍💼 Admin Panel", callback_data=callback_data('adm', 'panel'))])
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
@@ -49,20 +108,19 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return 0
 
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Handle button callbacks from the main menu."""
+    """Show the tutor menu chosen from the main menu."""
     query = update.callback_query
     await query.answer()
     
-    if query.data == 'tutor':
-        await query.edit_message_text(
-            "👨‍🏫 *Tutor Menu*\n\n"
-            "What would you like to do?\n"
-            "• /register - Register as a tutor\n"
-            "• /myprofile - View your profile\n"
-            "• /update - Update your profile\n"
-            "• /help - Show help",
-            parse_mode='Markdown'
-        )
+    await query.edit_message_text(
+        "👨‍🏫 *Tutor Menu*\n\n"
+        "What would you like to do?\n"
+        "• /register - Register as a tutor\n"
+        "• /myprofile - View your profile\n"
+        "• /update - Update your profile\n"
+        "• /help - Show help",
+        parse_mode='Markdown'
+    )
     
     return 0
 
@@ -84,11 +142,101 @@ For any issues, please contact @your_support_handle
 """
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
+def start_services() -> None:
+    """Start the background work every process that handles updates needs."""
+    _services_stopped.clear()
+    # Connect in the background so a slow MongoDB does not delay polling
+    threading.Thread(target=connect_database, name='db-startup', daemon=True).start()
+
+    # Load approved tutors into memory and keep them in sync in the background
+    if settings.tutor_cache_enabled:
+        tutor_cache.start(get_tutors_collection)
+
+    # A new catalog version swaps the prebuilt keyboards and drops everything
+    # derived from the old subject and grade lists at the same time
+    catalog_service.add_listener(tutor_cache.invalidate_index)
+    catalog_service.add_listener(lambda catalog: totals_cache.invalidate())
+    catalog_service.start(get_catalog_collection)
+
+def stop_services() -> None:
+    """Stop the background work and close the database connection."""
+    _services_stopped.set()
+    tutor_cache.stop()
+    catalog_service.stop()
+    shutdown_executor()
+    db_manager.close_connection()
+
+def build_application(update_queue: Optional[asyncio.Queue] = None, resume_jobs: bool = True) -> Application:
+    """Create the Application with every handler registered.
+
+    With an ``update_queue`` the Application has no Updater and handles
+    whatever is put on that queue (webhook mode and sharded workers).
+    """
+    # Every Bot API call goes through the outbound scheduler's rate limits and priorities
+    # Chats are handled concurrently, each chat's updates in order
+    builder = (
+        Application.builder()
+        .token(settings.bot_token)
+        .base_url(settings.bot_api_url)
+        .rate_limiter(outbound_scheduler)
+        .concurrent_updates(ChatOrderedUpdateProcessor(settings.max_concurrent_updates))
+    )
+    if update_queue is not None:
+        builder = builder.updater(None).update_queue(update_queue)
+    application = builder.build()
+
+    with startup_timer.phase('handler registration'):
+        register_handlers(application)
+
+    # Pick up broadcasts that were still sending when the bot last stopped
+    if resume_jobs:
+        if application.job_queue:
+            application.job_queue.run_once(resume_broadcast_jobs, when=1)
+        else:
+            logger.warning("Job queue unavailable; install python-telegram-bot[job-queue] to resume broadcasts")
+    return application
+
+def run_worker(index: int, workers: int, shard_queue) -> None:
+    """Run one worker process of the sharded deployment (UPDATE_WORKERS above 1)."""
+    # The ingress process owns Ctrl+C and stops the workers through their queues
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Telegram's global limit is for the whole bot, so the workers share it
+    outbound_scheduler.global_rate = settings.outbound_global_rate / workers
+
+    start_services()
+    # One worker resumes interrupted broadcasts, or every worker would send them again
+    application = build_application(asyncio.Queue(maxsize=settings.webhook_queue_size), resume_jobs=index == 0)
+    try:
+        asyncio.run(serve_worker(application, shard_queue))
+    finally:
+        stop_services()
+
 def main() -> None:
     """Start the bot."""
-    # Create the Application
-    application = Application.builder().token(os.getenv('BOT_TOKEN')).build()
+    if settings.update_workers > 1:
+        # This process only receives updates; the workers handle them
+        run_sharded(settings, run_worker)
+        return
 
+    start_services()
+    if settings.update_mode == 'webhook':
+        # No getUpdates loop; the webhook server fills a bounded queue instead
+        application = build_application(asyncio.Queue(maxsize=settings.webhook_queue_size))
+        run_webhook(application, settings)
+    else:
+        build_application().run_polling()
+
+def build_callback_router() -> CallbackRouter:
+    """Collect the routes of every button that is not part of a conversation."""
+    router = CallbackRouter(name='main router')
+    router.include({'menu:tutor': button_handler})
+    router.include(get_tutor_routes())
+    router.include(get_student_routes())
+    router.include(get_admin_routes(), allowed=settings.is_admin)
+    return router
+
+def register_handlers(application: Application) -> None:
+    """Add every command, conversation and callback handler to the application."""
     # Add command handlers
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
@@ -100,28 +248,24 @@ def main() -> None:
     # Add tutor registration handler
     application.add_handler(get_tutor_registration_handler())
     
-    # Add student handlers
-    for handler in get_student_handlers():
-        application.add_handler(handler)
-    
     # Add admin handlers
     for handler in get_admin_handlers():
         application.add_handler(handler)
     
-    # Add main menu button handlers
-    application.add_handler(CallbackQueryHandler(button_handler, pattern='^tutor$'))
-    application.add_handler(CallbackQueryHandler(student_menu, pattern='^student$'))
-    application.add_handler(CallbackQueryHandler(admin_panel, pattern='^admin$'))
+    # Add student handlers; the location search takes any text message, so it
+    # comes after every conversation that waits for one
+    for handler in get_student_handlers():
+        application.add_handler(handler)
     
-    # Add conversation handlers
-    application.add_handler(CallbackQueryHandler(select_subjects, pattern='^subject_|subjects_done$'))
-    application.add_handler(CallbackQueryHandler(get_grades, pattern='^grade_'))
-    application.add_handler(CallbackQueryHandler(get_method, pattern='^method_'))
-    application.add_handler(CallbackQueryHandler(pending_approvals, pattern='^pending_approvals$'))
-    application.add_handler(CallbackQueryHandler(handle_approval, pattern='^(approve|reject)_'))
-
-    # Start the Bot
-    application.run_polling()
+    # One router for every other button, after the conversations so a button
+    # that belongs to an active conversation state reaches it first
+    application.add_handler(build_callback_router())
+    
+    # Whatever is left is an info-only button or a keyboard from before routing
+    application.add_handler(CallbackQueryHandler(answer_stale_callback))
+    
+    # Fail at startup rather than let two handlers silently compete for a button
+    check_routes(application.handlers)
 
 if __name__ == '__main__':
     try:
@@ -130,4 +274,4 @@ if __name__ == '__main__':
         logger.error(f"Error in main: {e}")
     finally:
         # Close the database connection when the bot stops
-        db_manager.close_connection()
+        stop_services()
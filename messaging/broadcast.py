@@ -0,0 +1,169 @@
+"""Concurrent broadcast sending behind a shared rate limit.
+
+A bounded pool of sender tasks pulls chat IDs from a queue and sends
+through one token bucket sized to Telegram's global allowance. The bucket
+holds a single token, so no one-second window of a broadcast goes over
+the rate. A
+``RetryAfter`` from any sender pauses the whole pool, and progress is
+reported on a wall-clock interval instead of every N messages.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Awaitable, Callable, Iterable, List, Optional, Union
+
+from telegram.error import Forbidden, NetworkError, RetryAfter, TimedOut
+
+from config import settings
+from messaging.rate_limit import TokenBucket
+from messaging.scheduler import BULK
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_MAX_ATTEMPTS = 3
+# Tokens the bucket can save up; a bucket as deep as the rate would send a
+# full extra second of messages at the start and after every pause
+BROADCAST_BURST = 1
+
+# Per-chat send outcomes
+SENT = 'sent'
+FAILED = 'failed'
+BLOCKED = 'blocked'
+
+
+@dataclass
+class BroadcastProgress:
+    """Running totals of one broadcast."""
+    total: int
+    sent: int = 0
+    failed: int = 0
+    failed_users: List[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def rate(self) -> float:
+        """Messages handled per second so far."""
+        elapsed = time.monotonic() - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """Get the wait from a RetryAfter, which newer PTB versions give as a timedelta."""
+    retry_after = error.retry_after
+    if hasattr(retry_after, 'total_seconds'):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class BroadcastEngine:
+    """Send one message to many chats with a bounded, rate-limited sender pool."""
+
+    def __init__(self, bot, rate: float = settings.broadcast_rate, workers: int = settings.broadcast_workers,
+                 progress_interval: float = settings.broadcast_progress_interval,
+                 max_attempts: int = BROADCAST_MAX_ATTEMPTS, burst: float = BROADCAST_BURST):
+        self.bot = bot
+        self.bucket = TokenBucket(rate, capacity=burst)
+        self.workers = workers
+        self.progress_interval = progress_interval
+        self.max_attempts = max_attempts
+        # Queue behind interactive replies when the bot sends through the outbound scheduler
+        self._send_kwargs = {'rate_limit_args': {'priority': BULK}} if getattr(bot, 'rate_limiter', None) else {}
+
+    async def _send(self, chat_id: int, text: str, parse_mode: Optional[str]) -> str:
+        """Send to one chat, retrying flood waits and transient network errors.
+
+        Returns ``SENT``, ``FAILED`` or ``BLOCKED``.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            await self.bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode, **self._send_kwargs)
+                return SENT
+            except RetryAfter as e:
+                wait = retry_after_seconds(e)
+                logger.warning(f"Flood limit hit while broadcasting; pausing all senders for {wait}s")
+                self.bucket.pause(wait)
+            except Forbidden as e:
+                # The user blocked the bot or deleted their account; retrying will not help
+                logger.info(f"Broadcast to chat {chat_id} refused: {e}")
+                return BLOCKED
+            except (TimedOut, NetworkError) as e:
+                if attempt == self.max_attempts:
+                    logger.error(f"Failed to send message to chat {chat_id}: {e}")
+                    return FAILED
+                await asyncio.sleep(attempt)
+            except Exception as e:
+                logger.error(f"Failed to send message to chat {chat_id}: {e}")
+                return FAILED
+        return FAILED
+
+    async def run(self, chat_ids: Union[Iterable[int], AsyncIterable[int]], total: int, text: str,
+                  parse_mode: Optional[str] = None,
+                  on_progress: Callable[[BroadcastProgress], Awaitable[None]] = None,
+                  on_result: Callable[[int, str], Awaitable[None]] = None,
+                  progress: Optional[BroadcastProgress] = None) -> BroadcastProgress:
+        """Send ``text`` to every chat and return the final totals.
+
+        ``on_progress`` is awaited at most once per ``progress_interval``
+        seconds while sending, and once more at the end. ``on_result`` is
+        awaited with each chat ID and its outcome. Pass
+        ``progress`` to continue the totals of an earlier run.
+        """
+        progress = progress or BroadcastProgress(total=total)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+
+        async def sender():
+            while True:
+                chat_id = await queue.get()
+                if chat_id is None:
+                    return
+                outcome = await self._send(chat_id, text, parse_mode)
+                if outcome == SENT:
+                    progress.sent += 1
+                else:
+                    progress.failed += 1
+                    progress.failed_users.append(str(chat_id))
+                if on_result:
+                    await on_result(chat_id, outcome)
+
+        async def reporter():
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                try:
+                    await on_progress(progress)
+                except Exception as e:
+                    logger.error(f"Failed to update broadcast progress: {e}")
+
+        async def producer():
+            if hasattr(chat_ids, '__aiter__'):
+                async for chat_id in chat_ids:
+                    await queue.put(chat_id)
+            else:
+                for chat_id in chat_ids:
+                    await queue.put(chat_id)
+            for _ in range(self.workers):
+                await queue.put(None)
+
+        # A failing sender cancels the rest instead of leaving the producer blocked on a full queue
+        tasks = [asyncio.create_task(producer())]
+        tasks.extend(asyncio.create_task(sender()) for _ in range(self.workers))
+        ticker = asyncio.create_task(reporter()) if on_progress else None
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if ticker:
+                ticker.cancel()
+
+        if on_progress:
+            try:
+                await on_progress(progress)
+            except Exception as e:
+                logger.error(f"Failed to update broadcast progress: {e}")
+        return progress
@@ -0,0 +1,219 @@
+"""Rendered tutor cards shared by the student, tutor and admin screens.
+
+Each card kind turns one tutor into Markdown text and, where the screen
+shows one, an ``InlineKeyboardMarkup``. Tutor text fields are escaped once
+while rendering, and the result is kept in an LRU cache keyed by
+``(tutor _id, version, kind)``. The repository bumps ``version`` on every
+tutor write, so an edited tutor gets a new key and stale cards simply age
+out of the cache.
+"""
+import datetime
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+
+from config import settings
+from database.views import BIO_PREVIEW_LENGTH
+from routing import callback_data
+
+# Card kinds
+SEARCH_CARD = 'search'
+PROFILE_CARD = 'profile'
+APPROVAL_CARD = 'approval'
+ADMIN_ROW_CARD = 'admin_row'
+ADMIN_DETAIL_CARD = 'admin_detail'
+
+
+class RenderedCard(NamedTuple):
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+
+
+def md(value, default: str = 'N/A') -> str:
+    """Escape a tutor-provided value for legacy Markdown."""
+    if value is None or value == '':
+        return default
+    return escape_markdown(str(value), version=1)
+
+
+def code(value, default: str = 'N/A') -> str:
+    """Make a value safe inside a Markdown code span, which cannot escape backticks."""
+    if value is None or value == '':
+        return default
+    return str(value).replace('`', "'")
+
+
+def md_list(values, default: str = 'N/A') -> str:
+    return md(', '.join(values), default) if values else default
+
+
+def contact_rows() -> list:
+    """Get the contact button row shown with search results."""
+    if settings.admin_number:
+        # A WhatsApp link is more reliable than tel: on mobile
+        return [[InlineKeyboardButton("📞 Contact Admin", url=settings.admin_whatsapp_url)]]
+    return [[InlineKeyboardButton("ℹ️ Contact information not available", callback_data=callback_data('info', 'contact'))]]
+
+
+def _search_card(tutor) -> RenderedCard:
+    text = (
+        f"👤 *{md(tutor.get('name'))}*\n"
+        f"🏫 {md(tutor.get('university'))}\n"
+        f"📚 *Subjects:* {md_list(tutor.get('subjects'), '')}\n"
+        f"🎓 *Grades:* {md(tutor.get('grades'))}\n"
+        f"📍 *Location:* {md(tutor.get('location'))}\n"
+        f"📞 *Contact:* {md(settings.admin_number, 'Contact Admin')}\n"
+        f"📅 *Member since:* {md(tutor.get('registration_date'))}\n"
+    )
+    keyboard = contact_rows() + [[InlineKeyboardButton("🔍 View More Tutors", callback_data=callback_data('find', 'start'))]]
+    return RenderedCard(text, InlineKeyboardMarkup(keyboard))
+
+
+def _profile_card(tutor) -> RenderedCard:
+    return RenderedCard(
+        f"👤 *{md(tutor.get('name'))}*\n"
+        f"🏫 {md(tutor.get('university'))} - {md(tutor.get('department'))}\n"
+        f"📅 Year of Study: {md(tutor.get('year'))}\n"
+        f"📚 *Subjects:* {md_list(tutor.get('subjects'), '')}\n"
+        f"🎓 *Grades:* {md(tutor.get('grades'))}\n"
+        f"🏠 *Teaching Method:* {md(tutor.get('method'))}\n"
+        f"📍 *Location:* {md(tutor.get('location'))}\n"
+        f"📞 *Contact:* {md(tutor.get('contact'))}\n"
+        f"✅ *Status:* {md(tutor.get('status', 'pending').capitalize())}"
+    )
+
+
+def _approval_card(tutor) -> RenderedCard:
+    tutor_id = str(tutor['_id'])
+    text = (
+        f"📝 *Tutor Application*\n\n"
+        f"👤 *{md(tutor.get('name'))}*\n"
+        f"🏫 {md(tutor.get('university'))} - {md(tutor.get('department'))}\n"
+        f"📚 *Subjects:* {md_list(tutor.get('subjects'), '')}\n"
+        f"🎓 *Grades:* {md(tutor.get('grades'))}\n"
+        f"📍 *Location:* {md(tutor.get('location'))}\n"
+        f"📞 *Contact:* {md(tutor.get('contact'))}\n"
+        f"📅 *Registered:* {md(tutor.get('registration_date'))}"
+    )
+    keyboard = [
+        [
+            InlineKeyboardButton("✅ Approve", callback_data=callback_data('adm', 'review', 'approve', tutor_id)),
+            InlineKeyboardButton("❌ Reject", callback_data=callback_data('adm', 'review', 'reject', tutor_id))
+        ],
+        [InlineKeyboardButton("🔙 Back to Admin Panel", callback_data=callback_data('adm', 'panel'))]
+    ]
+    return RenderedCard(text, InlineKeyboardMarkup(keyboard))
+
+
+def _admin_row_card(tutor) -> RenderedCard:
+    bio = tutor.get('bio', '')
+    bio_preview = f"{md(bio[:BIO_PREVIEW_LENGTH], 'No bio provided')}{'...' if len(bio) > BIO_PREVIEW_LENGTH else ''}"
+    text = (
+        f"👤 *{md(tutor.get('name'))}* "
+        f"({'✅ Active' if tutor.get('is_active', True) else '❌ Inactive'})\n"
+        f"🏫 *University:* {md(tutor.get('university'))} - {md(tutor.get('department'))}\n"
+        f"📚 *Subjects:* {md_list(tutor.get('subjects'))}\n"
+        f"🎓 *Levels:* {md(tutor.get('grades'))}\n"
+        f"📍 *Location:* {md(tutor.get('location'))}\n"
+        f"📞 *Contact:* {md(tutor.get('contact'))}\n"
+        f"📅 *Member since:* {md(tutor.get('registration_date'))}\n"
+        f"⭐ *Rating:* {md(tutor.get('rating'))} ({tutor.get('reviews_count', 0)} reviews)\n"
+        f"💬 *Bio:* {bio_preview}\n"
+        f"🔗 *Profile ID:* `{code(tutor.get('_id'))}`\n"
+        "─────────────────────\n\n"
+    )
+    button = InlineKeyboardButton(f"👤 {tutor.get('name', 'Tutor')}", callback_data=callback_data('adm', 'view', tutor['_id']))
+    return RenderedCard(text, InlineKeyboardMarkup([[button]]))
+
+
+def _admin_detail_card(tutor) -> RenderedCard:
+    tutor_id = str(tutor['_id'])
+    reg_date = tutor.get('registration_date')
+    if isinstance(reg_date, datetime.datetime):
+        reg_date = reg_date.strftime("%Y-%m-%d %H:%M")
+
+    text = (
+        f"👤 *{md(tutor.get('name'))}* "
+        f"({'✅ Active' if tutor.get('is_active', True) else '❌ Inactive'})\n\n"
+        f"📧 *Email:* `{code(tutor.get('email'))}`\n"
+        f"📞 *Phone:* `{code(tutor.get('contact'))}`\n"
+        f"🏫 *University:* {md(tutor.get('university'))}\n"
+        f"🎓 *Department:* {md(tutor.get('department'))}\n"
+        f"📚 *Subjects:* {md_list(tutor.get('subjects'))}\n"
+        f"🎯 *Levels:* {md(tutor.get('grades'))}\n"
+        f"📍 *Location:* {md(tutor.get('location'))}\n"
+        f"⭐ *Rating:* {md(tutor.get('rating'))} ({tutor.get('reviews_count', 0)} reviews)\n"
+        f"📅 *Member since:* {md(reg_date)}\n"
+        f"🔗 *Profile ID:* `{code(tutor_id)}`\n\n"
+        f"📝 *Bio:*\n{md(tutor.get('bio'), 'No bio provided')}\n"
+    )
+
+    username = (tutor.get('username') or '').lstrip('@')
+    keyboard = [
+        [
+            InlineKeyboardButton("✏️ Edit Tutor", callback_data=callback_data('adm', 'edit', tutor_id)),
+            InlineKeyboardButton("🔒 Toggle Status", callback_data=callback_data('adm', 'toggle', tutor_id))
+        ],
+        [
+            InlineKeyboardButton("📨 Contact", url=f"https://t.me/{username}")
+            if username else InlineKeyboardButton("📨 Contact", callback_data=callback_data('info', 'username')),
+            InlineKeyboardButton("📞 Show Phone", callback_data=callback_data('adm', 'phone', tutor_id))
+            if tutor.get('contact') else InlineKeyboardButton("📞 No Phone", callback_data=callback_data('info', 'phone'))
+        ],
+        [
+            InlineKeyboardButton("📊 View Reviews", callback_data=callback_data('adm', 'reviews', tutor_id)),
+            InlineKeyboardButton("📋 View Sessions", callback_data=callback_data('adm', 'sessions', tutor_id))
+        ],
+        [
+            InlineKeyboardButton("⬅️ Back to List", callback_data=callback_data('adm', 'tutors')),
+            InlineKeyboardButton("🏠 Admin Panel", callback_data=callback_data('adm', 'panel'))
+        ]
+    ]
+    return RenderedCard(text, InlineKeyboardMarkup(keyboard))
+
+
+RENDERERS: Dict[str, Callable[[Any], RenderedCard]] = {
+    SEARCH_CARD: _search_card,
+    PROFILE_CARD: _profile_card,
+    APPROVAL_CARD: _approval_card,
+    ADMIN_ROW_CARD: _admin_row_card,
+    ADMIN_DETAIL_CARD: _admin_detail_card,
+}
+
+
+class CardRenderer:
+    """LRU cache of rendered cards keyed by tutor ``_id``, ``version`` and card kind."""
+
+    def __init__(self, max_entries: int = settings.card_cache_size):
+        self.max_entries = max_entries
+        self._cards: "OrderedDict[tuple, RenderedCard]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, tutor, kind: str) -> RenderedCard:
+        """Get the rendered card of one kind for a tutor document or view record."""
+        tutor_id = tutor.get('_id')
+        if tutor_id is None:
+            return RENDERERS[kind](tutor)
+
+        key = (tutor_id, tutor.get('version', 0), kind)
+        card = self._cards.get(key)
+        if card is not None:
+            self.hits += 1
+            self._cards.move_to_end(key)
+            return card
+
+        self.misses += 1
+        card = self._cards[key] = RENDERERS[kind](tutor)
+        if len(self._cards) > self.max_entries:
+            self._cards.popitem(last=False)
+        return card
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache counters."""
+        return {'size': len(self._cards), 'hits': self.hits, 'misses': self.misses}
+
+
+card_renderer = CardRenderer()
@@ -0,0 +1,90 @@
+"""Broadcasts stored as resumable jobs in MongoDB.
+
+A job's recipients are streamed from the database in ``chat_id`` order and
+sent through a ``BroadcastEngine``. Results are written back in batches of
+``BROADCAST_CHECKPOINT_SIZE`` with one bulk write, together with the job's
+cursor: the highest ``chat_id`` below which every recipient is recorded.
+After a restart the job continues from that cursor with the recipients
+still pending. Sends made after the last checkpoint are repeated, so a
+crash can deliver a message twice to at most one batch of chats, never
+skip one.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+from database.repository import broadcast_job_repository, user_repository
+from messaging.broadcast import BLOCKED, BroadcastEngine, BroadcastProgress
+
+logger = logging.getLogger(__name__)
+
+RECIPIENT_FETCH_SIZE = 500
+
+
+class BroadcastJobRunner:
+    """Send one stored broadcast job and checkpoint its progress."""
+
+    def __init__(self, bot, jobs=broadcast_job_repository, users=user_repository,
+                 checkpoint_size: int = settings.broadcast_checkpoint_size, engine: Optional[BroadcastEngine] = None):
+        self.jobs = jobs
+        self.users = users
+        self.checkpoint_size = checkpoint_size
+        self.engine = engine or BroadcastEngine(bot)
+        self._results: List[tuple] = []
+        self._dispatched: deque = deque()
+        self._finished: set = set()
+        self._cursor: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    async def _recipients(self, job_id):
+        """Stream pending chat IDs after the job's cursor, remembering the dispatch order."""
+        after = self._cursor
+        while True:
+            chat_ids = await self.jobs.pending_recipients(job_id, after=after, limit=RECIPIENT_FETCH_SIZE)
+            for chat_id in chat_ids:
+                self._dispatched.append(chat_id)
+                yield chat_id
+            if len(chat_ids) < RECIPIENT_FETCH_SIZE:
+                return
+            after = chat_ids[-1]
+
+    def _advance_cursor(self):
+        """Move the cursor past the longest prefix of dispatched chats that finished."""
+        while self._dispatched and self._dispatched[0] in self._finished:
+            chat_id = self._dispatched.popleft()
+            self._finished.discard(chat_id)
+            self._cursor = chat_id
+
+    async def _flush(self, job_id):
+        async with self._lock:
+            self._advance_cursor()
+            results, self._results = self._results, []
+            await self.jobs.checkpoint(job_id, results, cursor=self._cursor)
+            await self.users.mark_blocked([chat_id for chat_id, outcome in results if outcome == BLOCKED])
+
+    async def run(self, job: Dict[str, Any],
+                  on_progress: Callable[[BroadcastProgress], Awaitable[None]] = None) -> BroadcastProgress:
+        """Send a job to its pending recipients and mark it done."""
+        job_id = job['_id']
+        self._cursor = job.get('cursor')
+        progress = BroadcastProgress(total=job['total'], sent=job.get('sent', 0), failed=job.get('failed', 0))
+
+        async def on_result(chat_id: int, outcome: str):
+            self._results.append((chat_id, outcome))
+            self._finished.add(chat_id)
+            if len(self._results) >= self.checkpoint_size:
+                await self._flush(job_id)
+
+        await self.jobs.set_status(job_id, 'running')
+        try:
+            progress = await self.engine.run(
+                self._recipients(job_id), job['total'], job['text'], parse_mode=job.get('parse_mode'),
+                on_progress=on_progress, on_result=on_result, progress=progress
+            )
+        finally:
+            # Record whatever was sent, even when the run is cancelled or fails
+            await self._flush(job_id)
+        await self.jobs.set_status(job_id, 'done')
+        return progress
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Token bucket: ``rate`` tokens per second, bursting up to ``capacity``.
+
+    ``pause()`` empties the bucket and hands out nothing until the pause
+    ends, which is how a Telegram ``RetryAfter`` stops a whole sender pool.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def delay(self, now: float = None) -> float:
+        """Get the seconds until a token is available, 0 when one is available now."""
+        now = time.monotonic() if now is None else now
+        if now < self._paused_until:
+            return self._paused_until - now + 1 / self.rate
+        self._refill(now)
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self):
+        """Consume one token; check ``delay()`` first."""
+        self._tokens -= 1
+
+    @property
+    def idle(self) -> bool:
+        """Whether the bucket is full, so dropping it loses no state."""
+        return self.delay() == 0 and self._tokens >= self.capacity
+
+    async def acquire(self):
+        """Wait for one token. Waiters are served in arrival order."""
+        async with self._lock:
+            while True:
+                wait = self.delay()
+                if not wait:
+                    self.take()
+                    return
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for ``seconds``."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+        self._updated = max(self._updated, self._paused_until)
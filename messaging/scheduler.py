@@ -0,0 +1,259 @@
+"""Central scheduler for every outbound Bot API request.
+
+``OutboundScheduler`` is installed as the Application's rate limiter, so
+every ``send_*``, ``edit_*`` and ``answer_*`` call made through
+``context.bot`` is queued here instead of going straight to Telegram.
+
+- One global token bucket keeps the bot under Telegram's ~30 requests/s,
+  and one bucket per chat keeps each private chat near 1 message/s (with a
+  short burst) and each group under 20 messages/minute.
+- Requests are interactive by default. Bulk traffic such as broadcasts
+  passes ``rate_limit_args={'priority': BULK}`` and is only dispatched
+  when no interactive request is ready.
+- A queued edit of a message replaces the earlier edit of the same
+  message that has not been sent yet; both callers get the one result.
+- A ``RetryAfter`` pauses the whole queue and the request is retried.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import settings
+from messaging.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BULK: 'bulk'}
+
+
+WAIT_SAMPLES = 1000
+MAX_IDLE_CHAT_BUCKETS = 10000
+
+
+def _percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class _Request:
+    """One queued API call and the callers waiting for its result."""
+
+    __slots__ = ('callback', 'args', 'kwargs', 'chat_id', 'priority', 'edit_key', 'enqueued_at',
+                 'futures', 'retries')
+
+    def __init__(self, callback, args, kwargs, chat_id, priority, edit_key, future):
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.chat_id = chat_id
+        self.priority = priority
+        self.edit_key = edit_key
+        self.enqueued_at = time.monotonic()
+        self.futures = [future]
+        self.retries = 0
+
+
+class OutboundScheduler(BaseRateLimiter[Dict[str, Any]]):
+    """Prioritized, rate-limited queue in front of the Bot API."""
+
+    def __init__(self, global_rate: float = settings.outbound_global_rate,
+                 chat_rate: float = settings.outbound_chat_rate,
+                 chat_burst: float = settings.outbound_chat_burst,
+                 group_rate: float = settings.outbound_group_rate,
+                 max_retries: int = settings.outbound_max_retries):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._global: Optional[TokenBucket] = None
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._queues: Dict[int, Deque[_Request]] = {INTERACTIVE: deque(), BULK: deque()}
+        self._pending_edits: Dict[tuple, _Request] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._in_flight: set = set()
+        self._waits: Dict[int, Deque[float]] = {
+            INTERACTIVE: deque(maxlen=WAIT_SAMPLES), BULK: deque(maxlen=WAIT_SAMPLES)
+        }
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+
+    # -- BaseRateLimiter ---------------------------------------------------
+
+    async def initialize(self) -> None:
+        """Start the dispatcher task."""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._global = TokenBucket(self.global_rate)
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        """Stop dispatching and wait for the requests already sent."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for queue in self._queues.values():
+            while queue:
+                for future in queue.popleft().futures:
+                    future.cancel()
+        self._pending_edits.clear()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    async def process_request(self, callback: Callable[..., Coroutine[Any, Any, Any]], args: Any,
+                              kwargs: Dict[str, Any], endpoint: str, data: Dict[str, Any],
+                              rate_limit_args: Optional[Dict[str, Any]]) -> Any:
+        """Queue one API call and wait for its result."""
+        await self.initialize()
+        priority = BULK if (rate_limit_args or {}).get('priority') == BULK else INTERACTIVE
+        future = asyncio.get_running_loop().create_future()
+        chat_id = data.get('chat_id')
+
+        edit_key = None
+        if endpoint.startswith('editMessage'):
+            edit_key = (endpoint, chat_id, data.get('message_id'), data.get('inline_message_id'))
+            queued = self._pending_edits.get(edit_key)
+            if queued is not None:
+                # Only the newest content matters; send it in the older edit's place
+                queued.callback, queued.args, queued.kwargs = callback, args, kwargs
+                queued.futures.append(future)
+                self.coalesced += 1
+                return await future
+
+        request = _Request(callback, args, kwargs, chat_id, priority, edit_key, future)
+        if edit_key is not None:
+            self._pending_edits[edit_key] = request
+        self._queues[priority].append(request)
+        self._wakeup.set()
+        return await future
+
+    # -- dispatching -------------------------------------------------------
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_IDLE_CHAT_BUCKETS:
+                self._chats = {key: b for key, b in self._chats.items() if not b.idle}
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            if is_group:
+                bucket = TokenBucket(self.group_rate, capacity=1)
+            else:
+                bucket = TokenBucket(self.chat_rate, capacity=self.chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _next_ready(self, now: float):
+        """Pick the oldest request of the best priority whose chat has a token.
+
+        Returns (request, None), or (None, seconds until a chat frees up).
+        """
+        soonest = None
+        for priority in (INTERACTIVE, BULK):
+            queue = self._queues[priority]
+            for position, request in enumerate(queue):
+                if request.chat_id is None:
+                    del queue[position]
+                    return request, None
+                wait = self._chat_bucket(request.chat_id).delay(now)
+                if not wait:
+                    del queue[position]
+                    return request, None
+                soonest = wait if soonest is None else min(soonest, wait)
+        return None, soonest
+
+    async def _dispatch(self):
+        while True:
+            if not any(self._queues.values()):
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Wait for global capacity before choosing, so a request that
+            # arrives meanwhile with a higher priority is not passed over
+            wait = self._global.delay()
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+
+            request, wait = self._next_ready(time.monotonic())
+            if request is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._global.take()
+            if request.chat_id is not None:
+                self._chat_bucket(request.chat_id).take()
+            if request.edit_key is not None:
+                self._pending_edits.pop(request.edit_key, None)
+            self._waits[request.priority].append(time.monotonic() - request.enqueued_at)
+
+            task = asyncio.create_task(self._send(request))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, request: _Request):
+        try:
+            result = await request.callback(*request.args, **request.kwargs)
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            wait = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+            logger.warning(f"Flood limit hit; pausing outbound requests for {wait}s")
+            self._global.pause(wait)
+            if request.retries < self.max_retries:
+                request.retries += 1
+                self.retried += 1
+                self._queues[request.priority].appendleft(request)
+                self._wakeup.set()
+                return
+            self._resolve(request, error=e)
+        except Exception as e:
+            self._resolve(request, error=e)
+        else:
+            self.sent += 1
+            self._resolve(request, result=result)
+
+    @staticmethod
+    def _resolve(request: _Request, result=None, error: Exception = None):
+        for future in request.futures:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    # -- metrics -----------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, throughput counters and dispatch wait percentiles."""
+        stats = {
+            'in_flight': len(self._in_flight),
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'retried': self.retried,
+            'chats_tracked': len(self._chats),
+        }
+        for priority, name in PRIORITY_NAMES.items():
+            waits: List[float] = list(self._waits[priority])
+            stats[f'{name}_queued'] = len(self._queues[priority])
+            stats[f'{name}_wait_p50_ms'] = round(_percentile(waits, 50) * 1000, 1)
+            stats[f'{name}_wait_p95_ms'] = round(_percentile(waits, 95) * 1000, 1)
+        return stats
+
+
+outbound_scheduler = OutboundScheduler()
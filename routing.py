@@ -0,0 +1,223 @@
+"""Callback query routing by namespace and action.
+
+Every inline button carries ``callback_data`` of the form
+``namespace:action[:arg...]``, built with :func:`callback_data`. A
+:class:`CallbackRouter` parses it once into a :class:`Route` and finds the
+callback with one dict lookup on ``namespace:action``, instead of testing
+the data against a chain of regex ``CallbackQueryHandler``s where the
+first registered match wins. The arguments reach the callback as
+``context.args``, where ``CommandHandler`` puts command arguments.
+
+A router is an ordinary PTB handler: one serves every stateless button of
+the bot, and small ones sit in the entry points, states and fallbacks of
+the ``ConversationHandler``s. Adding a route twice to a router raises
+:class:`RouteConflictError`, and :func:`check_routes` walks the registered
+handlers at startup and raises it when two routers in the same scope
+claim the same route, or when a handler that takes any text message is
+registered before a conversation that waits for one in the same group:
+PTB hands an update to the first matching handler of a group, so the
+conversation would never see its text.
+
+Data without a ``:`` comes from a keyboard sent before routing existed;
+:func:`answer_stale_callback` tells the user to open the menu again.
+"""
+import datetime
+import functools
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from telegram import Chat, Message, Update, User
+from telegram.ext import BaseHandler, ContextTypes, ConversationHandler
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = ':'
+# Telegram rejects callback_data longer than this many bytes
+MAX_CALLBACK_DATA = 64
+
+
+class RouteConflictError(ValueError):
+    """Raised when two handlers claim the same route, or the same text messages, in one scope."""
+
+
+class Route(NamedTuple):
+    namespace: str
+    action: str
+    args: Tuple[str, ...]
+
+    @property
+    def key(self) -> str:
+        return f"{self.namespace}{SEPARATOR}{self.action}"
+
+
+def callback_data(namespace: str, action: str, *args) -> str:
+    """Build the ``callback_data`` of a button for a route and its arguments."""
+    parts = [namespace, action] + [str(arg) for arg in args]
+    if any(SEPARATOR in part for part in parts):
+        raise ValueError(f"Callback data parts cannot contain {SEPARATOR!r}: {parts}")
+    data = SEPARATOR.join(parts)
+    if len(data.encode('utf-8')) > MAX_CALLBACK_DATA:
+        raise ValueError(f"Callback data is longer than {MAX_CALLBACK_DATA} bytes: {data!r}")
+    return data
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_callback_data(data: str) -> Optional[Route]:
+    """Split ``callback_data`` into its route, or None when it is not in route form."""
+    namespace, separator, rest = data.partition(SEPARATOR)
+    if not separator:
+        return None
+    action, *args = rest.split(SEPARATOR)
+    return Route(namespace, action, tuple(args))
+
+
+def _split_key(key: str) -> Tuple[str, str]:
+    namespace, separator, action = key.partition(SEPARATOR)
+    if not separator or not namespace or not action or SEPARATOR in action:
+        raise ValueError(f"Route keys look like 'namespace:action', got {key!r}")
+    return namespace, action
+
+
+class CallbackRouter(BaseHandler):
+    """Dispatch callback queries to the callback registered for their route.
+
+    ``routes`` maps ``'namespace:action'`` keys to callbacks. When
+    ``allowed`` is given, it is called with the user ID before any of those
+    callbacks run and a user it rejects gets a permission alert instead.
+    """
+
+    def __init__(self, routes: Optional[Mapping[str, Callable]] = None,
+                 allowed: Optional[Callable[[int], bool]] = None, name: str = 'callbacks'):
+        super().__init__(self._not_dispatched)
+        self.name = name
+        self._routes: Dict[str, Tuple[Callable, Optional[Callable[[int], bool]]]] = {}
+        if routes:
+            self.include(routes, allowed=allowed)
+
+    @property
+    def routes(self) -> List[str]:
+        """The ``namespace:action`` keys this router handles."""
+        return list(self._routes)
+
+    def add(self, key: str, callback: Callable, allowed: Optional[Callable[[int], bool]] = None):
+        """Route ``namespace:action`` to a callback."""
+        _split_key(key)
+        if key in self._routes:
+            existing = self._routes[key][0]
+            raise RouteConflictError(
+                f"Route {key!r} in {self.name} already goes to {existing.__qualname__}, "
+                f"cannot also route it to {callback.__qualname__}"
+            )
+        self._routes[key] = (callback, allowed)
+
+    def include(self, routes: Mapping[str, Callable], allowed: Optional[Callable[[int], bool]] = None):
+        """Add several routes that share the same access check."""
+        for key, callback in routes.items():
+            self.add(key, callback, allowed=allowed)
+
+    def check_update(self, update: object) -> Optional[Tuple[Route, Callable, Optional[Callable]]]:
+        if not isinstance(update, Update) or not update.callback_query:
+            return None
+        data = update.callback_query.data
+        if not isinstance(data, str):
+            return None
+        route = parse_callback_data(data)
+        if route is None:
+            return None
+        target = self._routes.get(route.key)
+        if target is None:
+            return None
+        return (route,) + target
+
+    async def handle_update(self, update: Update, application, check_result, context: ContextTypes.DEFAULT_TYPE):
+        route, callback, allowed = check_result
+        context.args = list(route.args)
+        if allowed is not None and not allowed(update.effective_user.id):
+            await update.callback_query.answer("❌ You don't have permission to access this.", show_alert=True)
+            return None
+        return await callback(update, context)
+
+    async def _not_dispatched(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # handle_update picks the callback per route, so this never runs
+        raise RuntimeError(f"{self.name} callbacks are dispatched through handle_update")
+
+
+async def answer_stale_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Answer a callback query no router handled, so the button stops spinning."""
+    query = update.callback_query
+    if isinstance(query.data, str) and parse_callback_data(query.data) is None:
+        await query.answer("⌛ This menu has expired. Send /start to open a new one.", show_alert=True)
+    else:
+        await query.answer()
+
+
+def _router_claims(handler) -> Iterator[Tuple[str, Any]]:
+    if isinstance(handler, CallbackRouter):
+        for key in handler.routes:
+            yield key, handler
+
+
+def _check_scope(scope: str, handlers: Iterable[Any]):
+    owners: Dict[str, Any] = {}
+    for handler in handlers:
+        if isinstance(handler, ConversationHandler):
+            claims = [claim for entry in handler.entry_points for claim in _router_claims(entry)]
+            _check_conversation(handler)
+        else:
+            claims = list(_router_claims(handler))
+        for key, router in claims:
+            if key in owners and owners[key] is not router:
+                raise RouteConflictError(
+                    f"Route {key!r} is handled by both {owners[key].name} and {router.name} in {scope}"
+                )
+            owners[key] = router
+
+
+def _check_conversation(conversation: ConversationHandler):
+    name = conversation.name or 'conversation'
+    for state, handlers in conversation.states.items():
+        # Fallbacks are only consulted when no state handler matches
+        _check_scope(f"{name} state {state!r}", list(handlers) + list(conversation.fallbacks))
+
+
+def _text_probe() -> Update:
+    """A plain text message in a private chat, the update a conversation's text state waits for."""
+    user = User(id=0, first_name='probe', is_bot=False)
+    message = Message(message_id=0, date=datetime.datetime.now(datetime.timezone.utc),
+                      chat=Chat(id=0, type=Chat.PRIVATE), from_user=user, text='probe')
+    return Update(update_id=0, message=message)
+
+
+def _handler_name(handler) -> str:
+    callback = getattr(handler, 'callback', None)
+    return getattr(callback, '__qualname__', type(handler).__name__)
+
+
+def _check_text_shadowing(scope: str, handlers: Iterable[Any], probe: Update):
+    catch_all = None
+    for handler in handlers:
+        if isinstance(handler, ConversationHandler):
+            if catch_all is None:
+                continue
+            for state, state_handlers in handler.states.items():
+                if any(state_handler.check_update(probe) for state_handler in state_handlers):
+                    raise RouteConflictError(
+                        f"{_handler_name(catch_all)} takes every text message in {scope} before "
+                        f"{handler.name or 'conversation'} state {state!r} can; register it after the conversation"
+                    )
+        elif catch_all is None and handler.check_update(probe):
+            catch_all = handler
+
+
+def check_routes(handlers: Mapping[int, List[Any]]):
+    """Raise RouteConflictError if two routers claim the same route in one scope,
+    or a handler takes the text messages a later conversation waits for.
+
+    ``handlers`` is ``Application.handlers``. Each handler group is a scope,
+    with the entry points of its conversations; every conversation state,
+    together with that conversation's fallbacks, is a scope of its own.
+    """
+    probe = _text_probe()
+    for group, group_handlers in handlers.items():
+        _check_scope(f"handler group {group}", group_handlers)
+        _check_text_shadowing(f"handler group {group}", group_handlers, probe)
@@ -0,0 +1,163 @@
+"""Tutor search state carried in the callback data of the result buttons.
+
+A :class:`SearchSession` is the whole state of a student's search: the
+subject, grade and location filters, the page number and the keyset
+cursor of the page to show. The Next/Previous buttons carry it packed
+into ``find:page:<token>``, so any worker can serve any page without a
+server-side session and without ``context.user_data``.
+
+The token is URL-safe base64 without padding of this version 1 layout:
+
+    byte 0      format version
+    byte 1      flags: bit 0 pages backwards, bits 1-3 subject/grade/location present
+    bytes 2-3   page number, big-endian
+    bytes 4-15  cursor ``_id`` (12 zero bytes on the first page)
+    then        each present filter as a length byte and UTF-8 text
+
+Telegram allows 64 bytes of callback data, so the packed session may be
+at most ``MAX_SESSION_BYTES``. The location is stored as the tokens the
+search matches on; when a long location does not fit, its trailing
+tokens are dropped and a single remaining token is cut short. That
+happens before the first page is fetched, so every page of a search uses
+the same filters. Subjects and grades are never cut, since they must
+match exactly; a session whose subject and grade alone do not fit (a
+long label from a reloaded catalog) cannot be encoded, and the results
+are shown without the Next/Previous buttons.
+"""
+import base64
+import binascii
+import struct
+from typing import Dict, NamedTuple, Optional
+
+from bson.objectid import ObjectId
+
+from database.location import MAX_QUERY_TOKENS, location_tokens
+from routing import MAX_CALLBACK_DATA, callback_data
+
+SESSION_VERSION = 1
+PAGE_PREFIX = callback_data('find', 'page') + ':'
+# Unpadded base64 turns 3 bytes into 4 characters
+MAX_SESSION_BYTES = (MAX_CALLBACK_DATA - len(PAGE_PREFIX)) * 3 // 4
+
+_HEADER = struct.Struct('>BBH12s')
+_BACKWARDS = 0x01
+_FILTER_FLAGS = (('subjects', 0x02), ('grades', 0x04), ('location', 0x08))
+_NO_CURSOR = bytes(12)
+
+
+class SearchSession(NamedTuple):
+    """One page of a tutor search, small enough to live in a button."""
+    subjects: Optional[str] = None
+    grades: Optional[str] = None
+    location: Optional[str] = None
+    page: int = 0
+    cursor: Optional[str] = None
+    backwards: bool = False
+
+    @classmethod
+    def start(cls, filters: Dict[str, str]) -> 'SearchSession':
+        """Begin a search at its first page, with the location trimmed to what fits."""
+        session = cls(filters.get('subjects'), filters.get('grades'))
+        if filters.get('location') is None:
+            return session
+
+        tokens = location_tokens(filters['location'])[:MAX_QUERY_TOKENS]
+        session = session._replace(location=' '.join(tokens))
+        # Keep at least one token even if it has to be cut short
+        while len(session._pack()) > MAX_SESSION_BYTES and len(tokens) > 1:
+            tokens.pop()
+            session = session._replace(location=' '.join(tokens))
+        overflow = len(session._pack()) - MAX_SESSION_BYTES
+        if overflow > 0 and tokens:
+            trimmed = tokens[0].encode('utf-8')[:-overflow].decode('utf-8', 'ignore')
+            session = session._replace(location=trimmed)
+        return session
+
+    @property
+    def filters(self) -> Dict[str, str]:
+        """The filters in the form ``TutorRepository.search_approved`` takes."""
+        return {
+            key: value for key, value in
+            (('subjects', self.subjects), ('grades', self.grades), ('location', self.location))
+            if value is not None
+        }
+
+    @property
+    def after(self) -> Optional[str]:
+        return None if self.backwards else self.cursor
+
+    @property
+    def before(self) -> Optional[str]:
+        return self.cursor if self.backwards else None
+
+    def next_page(self, last_id) -> 'SearchSession':
+        return self._replace(page=self.page + 1, cursor=str(last_id), backwards=False)
+
+    def previous_page(self, first_id) -> 'SearchSession':
+        return self._replace(page=max(self.page - 1, 0), cursor=str(first_id), backwards=True)
+
+    def _pack(self) -> bytes:
+        flags = _BACKWARDS if self.backwards else 0
+        body = b''
+        for key, flag in _FILTER_FLAGS:
+            value = getattr(self, key)
+            if value is None:
+                continue
+            encoded = value.encode('utf-8')
+            if len(encoded) > 255:
+                raise ValueError(f"Search filter {key} is too long to encode")
+            flags |= flag
+            body += bytes([len(encoded)]) + encoded
+        cursor = ObjectId(self.cursor).binary if self.cursor else _NO_CURSOR
+        return _HEADER.pack(SESSION_VERSION, flags, min(self.page, 0xFFFF), cursor) + body
+
+    def encode(self) -> str:
+        """Pack the session into a callback data token."""
+        packed = self._pack()
+        if len(packed) > MAX_SESSION_BYTES:
+            raise ValueError(f"Search session needs {len(packed)} bytes, only {MAX_SESSION_BYTES} fit in a button")
+        return base64.urlsafe_b64encode(packed).rstrip(b'=').decode('ascii')
+
+    @classmethod
+    def decode(cls, token: str) -> 'SearchSession':
+        """Unpack a token made by :meth:`encode`; raises ValueError if it is not one."""
+        try:
+            packed = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        except (binascii.Error, ValueError) as e:
+            raise ValueError(f"Search session token is not base64: {e}") from None
+        if len(packed) < _HEADER.size:
+            raise ValueError("Search session token is truncated")
+
+        version, flags, page, cursor = _HEADER.unpack_from(packed)
+        if version != SESSION_VERSION:
+            raise ValueError(f"Unsupported search session version {version}")
+
+        values = {}
+        offset = _HEADER.size
+        for key, flag in _FILTER_FLAGS:
+            if not flags & flag:
+                continue
+            if offset >= len(packed):
+                raise ValueError("Search session token is truncated")
+            length = packed[offset]
+            value = packed[offset + 1:offset + 1 + length]
+            if len(value) != length:
+                raise ValueError("Search session token is truncated")
+            values[key] = value.decode('utf-8', 'replace')
+            offset += 1 + length
+
+        return cls(
+            page=page,
+            cursor=str(ObjectId(cursor)) if cursor != _NO_CURSOR else None,
+            backwards=bool(flags & _BACKWARDS),
+            **values
+        )
+
+    def button_data(self, action: str = 'page') -> str:
+        """The ``find:<action>:<token>`` callback data of a button for this session.
+
+        ``MAX_SESSION_BYTES`` is sized for ``page``, so ``action`` may not be longer.
+        """
+        if len(action) > len('page'):
+            raise ValueError(f"Search session action {action!r} is longer than 'page'")
+        return callback_data('find', action, self.encode())
@@ -0,0 +1,109 @@
+"""Concurrent update processing that keeps each chat's updates in order.
+
+With PTB's default, sequential processing, one slow handler (an admin's
+export, a broadcast being queued) holds up every other user. Plain
+``concurrent_updates`` fixes that but lets two updates of the same chat
+overtake each other, which breaks the ``ConversationHandler`` flows: a
+profile field could be handled in a state the previous update has not
+left yet.
+
+:class:`ChatOrderedUpdateProcessor` runs updates of different chats
+concurrently, up to ``max_concurrent_updates`` at a time, and updates of
+the same chat strictly one after the other in arrival order. The
+Application creates one task per update in the order it takes them off
+the update queue, and each task queues on its chat's FIFO lock before
+its first suspension point, so the lock hands the chat over in that
+order. Updates without a chat (inline queries) are ordered per user;
+updates with neither are not ordered at all.
+
+Handlers that take long should not run inside the update: a chat waits
+for its previous update to finish, so hand long work to
+``context.application.create_task`` as the admin exports and broadcasts do.
+"""
+import asyncio
+import sys
+from collections import Counter
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import Application, BaseUpdateProcessor
+
+
+def backlog(application: Application) -> int:
+    """Updates the Application has accepted and not finished: queued, waiting or running."""
+    return application.update_queue.qsize() + getattr(application.update_processor, 'in_flight', 0)
+
+
+def has_room(application: Application) -> bool:
+    """Whether the backlog is below the update queue's size (always, if it is unbounded)."""
+    capacity = application.update_queue.maxsize
+    return capacity <= 0 or backlog(application) < capacity
+
+
+def ordering_key(update: object) -> Optional[Hashable]:
+    """The chat (or, without a chat, the user) whose updates must stay in order."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return update.effective_user.id
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Process different chats concurrently and each chat's updates in order."""
+
+    def __init__(self, max_concurrent_updates: int):
+        self._limit = max_concurrent_updates
+        super().__init__(max_concurrent_updates)
+        # The base class holds its semaphore around do_process_update, so an
+        # update waiting behind its own chat would take up a slot. Make that
+        # one unbounded and limit the updates that actually run instead.
+        self._semaphore = asyncio.BoundedSemaphore(sys.maxsize)
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._chat_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._chat_updates: Counter = Counter()
+        # Updates taken off the update queue and not finished yet, waiting or running
+        self.in_flight = 0
+
+    @property
+    def max_concurrent_updates(self) -> int:
+        return self._limit
+
+    @property
+    def waiting_chats(self) -> int:
+        """Chats with at least one update in flight."""
+        return len(self._chat_locks)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = ordering_key(update)
+        self.in_flight += 1
+        try:
+            if key is None:
+                async with self._running:
+                    await coroutine
+                return
+
+            lock = self._chat_locks.get(key)
+            if lock is None:
+                lock = self._chat_locks[key] = asyncio.Lock()
+            self._chat_updates[key] += 1
+            try:
+                # Take the chat first so waiting for it never holds a running slot
+                async with lock:
+                    async with self._running:
+                        await coroutine
+            finally:
+                self._chat_updates[key] -= 1
+                if not self._chat_updates[key]:
+                    del self._chat_updates[key]
+                    del self._chat_locks[key]
+        finally:
+            self.in_flight -= 1
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass